@@ -0,0 +1,127 @@
+"""
+Helpers shared by the chat and search functions
+
+Imported by api/chat.py and api/search.py, so it stays as light as they are:
+the openai and supabase SDKs are imported on first use, and nothing from
+utils/ (which loads sentence_transformers) is imported.
+"""
+
+import os
+import time
+import threading
+import concurrent.futures
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Long-lived OpenAI client shared by all requests (keeps its connection pool)
+openai_client = None
+
+def get_openai_client():
+    """Get or create the shared OpenAI client"""
+    global openai_client
+    if openai_client is None:
+        from openai import OpenAI
+        openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    return openai_client
+
+def create_client(supabase_url, supabase_key):
+    """Create a Supabase client"""
+    from supabase import create_client as create_supabase_client
+    return create_supabase_client(supabase_url, supabase_key)
+
+def run_canary(warmup_status, name, call):
+    """Time one canary request and record the result in warmup_status"""
+    start_time = time.time()
+    try:
+        result = call()
+        warmup_status[name] = {"ok": True, "latency_ms": round((time.time() - start_time) * 1000, 1)}
+        return result
+    except Exception as e:
+        warmup_status[name] = {"ok": False, "latency_ms": round((time.time() - start_time) * 1000, 1),
+                               "error": str(e)}
+        return None
+
+class EmbeddingHedger:
+    """
+    Hedged requests for a blocking call with a long latency tail
+    
+    call(fn) runs fn on a thread. If it has not finished after the `percentile`
+    latency of the last `window` successful calls, fn is started a second time
+    and the first successful result wins; the slower call is left to finish in
+    the background. Hedges start after `min_samples` calls and are limited to a
+    `budget` fraction of calls, so a slow backend never gets double the load.
+    """
+    
+    def __init__(self, percentile=95.0, budget=0.1, min_samples=20, window=200, max_workers=16):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embedding")
+        self.lock = threading.Lock()
+        # Metrics
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+    
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None while there are too few samples"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(self.percentile / 100 * len(latencies)))]
+    
+    def _submit(self, fn):
+        start_time = time.monotonic()
+        
+        def record_latency(future):
+            if future.exception() is None:
+                self.latencies.append(time.monotonic() - start_time)
+        
+        future = self.executor.submit(fn)
+        future.add_done_callback(record_latency)
+        return future
+    
+    def _take_hedge(self):
+        with self.lock:
+            # Never more hedges than the budget fraction of calls, this one included
+            if self.fired + 1 > self.budget * self.calls:
+                return False
+            self.fired += 1
+            return True
+    
+    def call(self, fn):
+        with self.lock:
+            self.calls += 1
+        delay = self.hedge_delay()
+        first = self._submit(fn)
+        if delay is None:
+            return first.result()
+        done, _ = concurrent.futures.wait([first], timeout=delay)
+        if done or not self._take_hedge():
+            return first.result()
+        
+        second = self._submit(fn)
+        pending = {first, second}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self.lock:
+                            self.won += 1
+                    return future.result()
+        # Both calls failed: raise the original call's error
+        return first.result()
+    
+    def metrics(self, prefix):
+        """Hedging counters in the Prometheus text format"""
+        lines = []
+        for metric, help_text, value in (
+            ("embedding_calls_total", "Embedding calls", self.calls),
+            ("embedding_hedges_fired_total", "Embedding calls that sent a hedged second request", self.fired),
+            ("embedding_hedges_won_total", "Hedged requests that finished first", self.won),
+        ):
+            lines += [f"# HELP {prefix}_{metric} {help_text}", f"# TYPE {prefix}_{metric} counter",
+                      f"{prefix}_{metric} {value}"]
+        return "\n".join(lines) + "\n"
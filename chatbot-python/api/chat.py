@@ -1,14 +1,18 @@
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 import os
+import re
 import json
 import time
-import openai
-from supabase import create_client, Client
+import asyncio
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from dotenv import load_dotenv
-from anthropic import Anthropic
-from tenacity import retry, wait_exponential, stop_after_attempt
 from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional
+from api._shared import EmbeddingHedger, create_client, get_openai_client, run_canary
 
 app = FastAPI()
 load_dotenv()
@@ -20,15 +24,93 @@ SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY")
 
-# Initialize OpenAI
-openai.api_key = OPENAI_API_KEY
+# The openai, anthropic, supabase and tenacity SDKs (and numpy) are imported on first
+# use, not here: importing them took about half of a serverless cold start (see README.md)
 
-# Initialize anthropic
-anthropic = None if not anthropic_api_key else Anthropic(api_key=anthropic_api_key)
+# Anthropic client - created at startup or on first use
+anthropic = None
 
-# Initialize Supabase client - will be loaded on first request
+# Initialize Supabase client - created at startup, or on first request if that failed
 supabase = None
 
+# Startup warmup: a canary request to each dependency opens its connections
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "true").lower() == "true"
+WARMUP_TIMEOUT = float(os.environ.get("WARMUP_TIMEOUT", "5"))  # Seconds per canary request
+WARMUP_QUERY = "What are large language models?"
+warmup_status = {}  # Dependency name -> {"ok", "latency_ms", "error"}
+warmup_latency_ms = None  # Total warmup time, once warmup has run
+
+# Admission control for LLM calls: at most LLM_MAX_CONCURRENCY calls run at once and
+# at most LLM_MAX_QUEUE requests wait for one, each for up to LLM_QUEUE_TIMEOUT
+# seconds. Other requests get an immediate 503 "busy" response with Retry-After.
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", "5"))
+LLM_RETRY_AFTER = int(os.environ.get("LLM_RETRY_AFTER", "5"))  # Seconds, sent in the Retry-After header
+
+# The LLM SDK calls block, so they run on their own pool of one thread per LLM slot
+llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+
+# LLM providers in failover order ("kind:model,..."); providers without an API key are skipped
+LLM_PROVIDERS = os.environ.get("LLM_PROVIDERS", "anthropic:claude-3-5-haiku-latest,openai:gpt-4o-mini")
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "30"))  # Seconds per provider call
+# A provider's circuit opens when, over its last LLM_BREAKER_WINDOW calls, the error rate
+# or the p95 latency reaches these limits; it stays open for LLM_BREAKER_COOLDOWN seconds
+LLM_BREAKER_WINDOW = int(os.environ.get("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_ERROR_RATE = float(os.environ.get("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_P95_SECONDS = float(os.environ.get("LLM_BREAKER_P95_SECONDS", "15"))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+
+# End-to-end deadline of a chat request: the embedding (with its retries), the Supabase
+# RPC, the wait for an LLM slot and the LLM call each only get the time that is left.
+# Clients can set their own with an X-Request-Deadline: <seconds> header.
+REQUEST_DEADLINE = float(os.environ.get("REQUEST_DEADLINE", "25"))
+REQUEST_DEADLINE_MAX = float(os.environ.get("REQUEST_DEADLINE_MAX", "60"))  # Upper limit for the header
+DEADLINE_STAGES = {
+    "embedding": "query embedding",
+    "retrieval": "course content search",
+    "queue": "wait for a free model slot",
+    "llm": "language model",
+}
+deadline_exceeded = {stage: 0 for stage in DEADLINE_STAGES}  # Requests that ran out of time, by stage
+
+# Adaptive retrieval: RETRIEVAL_CANDIDATES matches are fetched in one RPC, then the
+# top ones are kept up to the largest score gap of at least RETRIEVAL_MIN_GAP (at most
+# RETRIEVAL_MAX_K) and within RETRIEVAL_MAX_TOKENS of content (~4 characters per token)
+RETRIEVAL_CANDIDATES = int(os.environ.get("RETRIEVAL_CANDIDATES", "10"))
+RETRIEVAL_MAX_K = int(os.environ.get("RETRIEVAL_MAX_K", "5"))
+RETRIEVAL_MIN_GAP = float(os.environ.get("RETRIEVAL_MIN_GAP", "0.05"))
+RETRIEVAL_MAX_TOKENS = int(os.environ.get("RETRIEVAL_MAX_TOKENS", "2000"))
+
+# Chunk expansion: retrieve each matched chunk together with its section's first chunk and
+# the CHUNK_EXPANSION_WINDOW continuation chunks on either side of it, in the same RPC
+# (match_course_content_with_context), and merge them into one source per section
+CHUNK_EXPANSION = os.environ.get("CHUNK_EXPANSION", "false").lower() == "true"
+CHUNK_EXPANSION_WINDOW = int(os.environ.get("CHUNK_EXPANSION_WINDOW", "1"))
+CONTINUATION_TITLE = re.compile(r'\s\(part \d+\)$')  # Title suffix of continuation chunks
+
+# Extractive context compression: retrieved sections are cut down to the sentences most
+# similar to the question, with CONTEXT_NEIGHBOURS sentences of context on each side,
+# up to CONTEXT_TOKEN_BUDGET tokens in total. Off by default: it adds an embedding call
+# to every request with a cold sentence cache
+CONTEXT_COMPRESSION = os.environ.get("CONTEXT_COMPRESSION", "false").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "800"))
+CONTEXT_NEIGHBOURS = int(os.environ.get("CONTEXT_NEIGHBOURS", "1"))
+# Compression is optional, so it gets at most CONTEXT_COMPRESSION_TIMEOUT seconds and never
+# the last CONTEXT_COMPRESSION_LLM_RESERVE seconds of the request deadline
+CONTEXT_COMPRESSION_TIMEOUT = float(os.environ.get("CONTEXT_COMPRESSION_TIMEOUT", "2"))
+CONTEXT_COMPRESSION_LLM_RESERVE = float(os.environ.get("CONTEXT_COMPRESSION_LLM_RESERVE", "10"))
+SENTENCE_CACHE_SIZE = int(os.environ.get("SENTENCE_CACHE_SIZE", "5000"))  # Sentence embeddings kept in memory
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(\[])')
+
+# Hedged embedding requests: when an embedding call is slower than the
+# EMBEDDING_HEDGE_PERCENTILE of recent calls, an identical second call is sent and
+# the first to finish wins. At most EMBEDDING_HEDGE_BUDGET of calls send a hedge.
+EMBEDDING_HEDGING = os.environ.get("EMBEDDING_HEDGING", "false").lower() == "true"
+EMBEDDING_HEDGE_PERCENTILE = float(os.environ.get("EMBEDDING_HEDGE_PERCENTILE", "95"))
+EMBEDDING_HEDGE_BUDGET = float(os.environ.get("EMBEDDING_HEDGE_BUDGET", "0.1"))
+EMBEDDING_HEDGE_MIN_SAMPLES = int(os.environ.get("EMBEDDING_HEDGE_MIN_SAMPLES", "20"))  # Calls before hedging starts
+
 # Define Pydantic models for response structure
 class Answer(BaseModel):
     text: str = Field(description="The main text response to the user's question")
@@ -83,9 +165,546 @@ class ChatResponse(BaseModel):
                     data['answer'] = {'text': data['answer']}
         return data
 
+class DeadlineExceeded(Exception):
+    """A request ran out of time; stage names the stage that was running"""
+    
+    def __init__(self, stage):
+        self.stage = stage
+        super().__init__(f"Request deadline exceeded during {stage}")
+
+class Deadline:
+    """
+    Time budget of one request, shared by all of its stages
+    
+    Each stage calls check(stage) for the seconds it may still use, which
+    raises DeadlineExceeded naming that stage once the budget is spent.
+    """
+    
+    def __init__(self, seconds, clock=time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.expires_at = clock() + seconds
+    
+    def remaining(self):
+        return max(0.0, self.expires_at - self.clock())
+    
+    def expired(self):
+        return self.remaining() <= 0
+    
+    def check(self, stage):
+        """Seconds left for the stage; raises DeadlineExceeded if there are none"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(stage)
+        return remaining
+
+def request_deadline(request):
+    """Deadline from the X-Request-Deadline header (seconds), else REQUEST_DEADLINE"""
+    value = request.headers.get("x-request-deadline")
+    if value:
+        try:
+            seconds = float(value)
+            if seconds > 0:
+                return Deadline(min(seconds, REQUEST_DEADLINE_MAX))
+        except ValueError:
+            pass
+        print(f"Ignoring invalid X-Request-Deadline header: {value}")
+    return Deadline(REQUEST_DEADLINE)
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded, deadline-limited wait queue
+
+    acquire() takes a slot if one is free, otherwise waits in FIFO order for up
+    to queue_timeout seconds. It returns False without waiting when max_queue
+    requests are already waiting, and False when the wait times out. Every
+    successful acquire() must be followed by release(), which hands the slot
+    directly to the oldest waiter.
+    """
+    
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+        # Metrics
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self.wait_seconds_total = 0.0
+    
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+    
+    def shed_early(self):
+        """
+        True if a new request would be rejected without waiting (counted as a
+        rejection), so it can be shed before any retrieval work
+        """
+        if self.in_flight >= self.max_concurrent and len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            return True
+        return False
+    
+    async def acquire(self, timeout=None):
+        """
+        Take a slot; returns False if the request should be shed
+
+        timeout shortens the wait below queue_timeout (the request's remaining time).
+        A wait cut short by it is the request running out of time, not load
+        shedding, and is not counted as a rejection.
+        """
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            return False
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start_time = time.time()
+        try:
+            await asyncio.wait([waiter], timeout=self.queue_timeout if timeout is None
+                               else min(self.queue_timeout, timeout))
+        except asyncio.CancelledError:
+            # Client went away: give back a slot that was already handed over
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            raise
+        finally:
+            self.wait_seconds_total += time.time() - start_time
+        
+        if waiter.done():
+            # release() passed its slot to this request
+            self.admitted += 1
+            return True
+        self._waiters.remove(waiter)
+        waiter.cancel()
+        if timeout is None or timeout >= self.queue_timeout:
+            self.rejected["timeout"] += 1
+        return False
+    
+    def release(self):
+        """Free a slot, handing it to the oldest waiting request if there is one"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+    
+    def release_when_done(self, call):
+        """
+        release() once a concurrent.futures call has finished
+        
+        For calls running in a thread pool: a call the request stopped waiting
+        for keeps running, and keeps its slot until it returns.
+        """
+        loop = asyncio.get_running_loop()
+        
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self.release)
+            except RuntimeError:
+                pass  # The loop is closed, so no request is waiting for the slot
+        
+        call.add_done_callback(release)
+    
+    def metrics(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP chat_llm_in_flight LLM calls currently running",
+            "# TYPE chat_llm_in_flight gauge",
+            f"chat_llm_in_flight {self.in_flight}",
+            "# HELP chat_llm_queue_depth Requests waiting for an LLM slot",
+            "# TYPE chat_llm_queue_depth gauge",
+            f"chat_llm_queue_depth {self.queue_depth}",
+            "# HELP chat_llm_admitted_total Requests admitted to an LLM slot",
+            "# TYPE chat_llm_admitted_total counter",
+            f"chat_llm_admitted_total {self.admitted}",
+            "# HELP chat_llm_rejected_total Requests shed with a busy response",
+            "# TYPE chat_llm_rejected_total counter",
+        ]
+        lines += [f'chat_llm_rejected_total{{reason="{reason}"}} {count}' for reason, count in self.rejected.items()]
+        lines += [
+            "# HELP chat_llm_queue_wait_seconds_total Time requests spent waiting for an LLM slot",
+            "# TYPE chat_llm_queue_wait_seconds_total counter",
+            f"chat_llm_queue_wait_seconds_total {self.wait_seconds_total:.6f}",
+            "# HELP chat_llm_max_concurrency Configured LLM concurrency limit",
+            "# TYPE chat_llm_max_concurrency gauge",
+            f"chat_llm_max_concurrency {self.max_concurrent}",
+            "# HELP chat_llm_max_queue Configured wait queue limit",
+            "# TYPE chat_llm_max_queue gauge",
+            f"chat_llm_max_queue {self.max_queue}",
+        ]
+        return "\n".join(lines) + "\n"
+
+admission = AdmissionController(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one LLM provider, on error rate and p95 latency
+
+    The outcomes of the last `window` calls are kept. Once at least `min_calls`
+    are recorded, the breaker opens when the error rate reaches `max_error_rate`
+    or the p95 latency reaches `max_p95_seconds`. An open breaker rejects calls
+    for `cooldown` seconds, then lets one trial call through (half-open): success
+    closes it, failure opens it again.
+    """
+    
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    
+    def __init__(self, window=20, min_calls=5, max_error_rate=0.5, max_p95_seconds=10.0,
+                 cooldown=30.0, clock=time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.max_error_rate = max_error_rate
+        self.max_p95_seconds = max_p95_seconds
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.outcomes = deque(maxlen=window)  # (succeeded, latency seconds)
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+        # Metrics
+        self.calls = 0
+        self.failures = 0
+        self.opened = 0
+    
+    def allow(self):
+        """True if a call may be sent to the provider now"""
+        with self.lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+    
+    def p95_latency(self):
+        latencies = sorted(latency for _, latency in self.outcomes)
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0
+    
+    def error_rate(self):
+        return sum(not ok for ok, _ in self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+    
+    def record(self, succeeded, latency):
+        """Record the outcome of a call and open or close the breaker"""
+        with self.lock:
+            self.calls += 1
+            self.failures += not succeeded
+            self.outcomes.append((succeeded, latency))
+            if self.state == self.HALF_OPEN:
+                if succeeded:
+                    self.state = self.CLOSED
+                    self.outcomes.clear()
+                else:
+                    self._open()
+            elif self.state == self.CLOSED and len(self.outcomes) >= self.min_calls and (
+                    self.error_rate() >= self.max_error_rate or self.p95_latency() >= self.max_p95_seconds):
+                self._open()
+    
+    def cancel(self):
+        """Forget a call let through by allow() whose outcome says nothing about the provider"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.trial_in_flight = False
+    
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+        self.opened += 1
+
+class LLMProvider:
+    """
+    A chat model that answers with the response_formatter tool
+
+    generate() returns the tool input (the structured response as a dict) and
+    raises if the call fails or the model does not follow the contract.
+    """
+    
+    kind = ""
+    
+    def __init__(self, model):
+        self.model = model
+    
+    @property
+    def name(self):
+        return f"{self.kind}:{self.model}"
+    
+    def available(self):
+        """True if the provider is configured (API key set)"""
+        return True
+    
+    def prepare(self):
+        """Import the SDK and create the client ahead of the first call"""
+    
+    def canary(self, timeout):
+        """Warmup request that uses no tokens; raises if the provider is unreachable"""
+        raise NotImplementedError
+    
+    def generate(self, system_prompt, messages, response_schema, max_tokens, timeout):
+        raise NotImplementedError
+
+def parse_tool_input(tool_input):
+    """Tool input as a dict; models sometimes send it as a JSON string"""
+    if isinstance(tool_input, str):
+        try:
+            tool_input = json.loads(tool_input)
+        except json.JSONDecodeError:
+            raise ValueError(f"Invalid response format: {tool_input[:200]}")
+    if not isinstance(tool_input, dict):
+        raise ValueError("Invalid response format")
+    return tool_input
+
+class AnthropicProvider(LLMProvider):
+    """Claude through the Anthropic Messages API with a forced tool call"""
+    
+    kind = "anthropic"
+    
+    def available(self):
+        return bool(anthropic_api_key)
+    
+    def prepare(self):
+        get_anthropic_client()
+    
+    def canary(self, timeout):
+        return get_anthropic_client().models.list(limit=1, timeout=timeout)
+    
+    def generate(self, system_prompt, messages, response_schema, max_tokens, timeout):
+        response = get_anthropic_client().messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            system=system_prompt,
+            messages=messages,
+            tools=[{
+                "name": "response_formatter",
+                "input_schema": response_schema
+            }],
+            tool_choice={
+                "type": "tool",
+                "name": "response_formatter"
+            },
+            timeout=timeout
+        )
+        if (response.content and
+            response.content[0].type == 'tool_use' and
+            response.content[0].name == 'response_formatter'):
+            return parse_tool_input(response.content[0].input)
+        raise ValueError("Could not parse model response")
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions with a forced function call of the same schema"""
+    
+    kind = "openai"
+    
+    def available(self):
+        return bool(OPENAI_API_KEY)
+    
+    def prepare(self):
+        get_openai_client()
+    
+    def canary(self, timeout):
+        return get_openai_client().models.retrieve(self.model, timeout=timeout)
+    
+    def generate(self, system_prompt, messages, response_schema, max_tokens, timeout):
+        response = get_openai_client().chat.completions.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=[{"role": "system", "content": system_prompt}] + messages,
+            tools=[{
+                "type": "function",
+                "function": {"name": "response_formatter", "parameters": response_schema}
+            }],
+            tool_choice={"type": "function", "function": {"name": "response_formatter"}},
+            timeout=timeout
+        )
+        tool_calls = response.choices[0].message.tool_calls if response.choices else None
+        if tool_calls and tool_calls[0].function.name == "response_formatter":
+            return parse_tool_input(tool_calls[0].function.arguments)
+        raise ValueError("Could not parse model response")
+
+LLM_PROVIDER_TYPES = {
+    "anthropic": AnthropicProvider,
+    "openai": OpenAIProvider,
+}
+
+class AllProvidersFailed(Exception):
+    """Every configured provider failed or had its circuit open"""
+
+class ProviderRouter:
+    """
+    Sends each request to the first provider whose circuit breaker allows it
+
+    Providers are tried in order; a failure (error, timeout or a response that
+    breaks the structured-output contract) is recorded and the next provider is
+    tried, so the secondary takes over while the primary's breaker is open.
+    """
+    
+    def __init__(self, providers, breaker_factory=CircuitBreaker):
+        self.providers = providers
+        self.breakers = {provider.name: breaker_factory() for provider in providers}
+    
+    def prepare(self):
+        """Create every provider's client (imports the SDKs)"""
+        for provider in self.providers:
+            try:
+                provider.prepare()
+            except Exception as e:
+                print(f"Error preparing LLM provider {provider.name}: {str(e)}")
+    
+    def generate(self, system_prompt, messages, response_schema, max_tokens=1000, timeout=LLM_TIMEOUT,
+                 deadline=None):
+        """
+        Returns (provider name, structured response dict)
+
+        With a deadline, each call gets at most the request's remaining time and
+        failover stops with DeadlineExceeded("llm") once that is spent.
+        """
+        errors = []
+        for provider in self.providers:
+            call_timeout = timeout if deadline is None else min(timeout, deadline.check("llm"))
+            breaker = self.breakers[provider.name]
+            if not breaker.allow():
+                errors.append(f"{provider.name}: circuit open")
+                continue
+            start_time = time.time()
+            try:
+                result = provider.generate(system_prompt, messages, response_schema, max_tokens, call_timeout)
+            except Exception as e:
+                latency = time.time() - start_time
+                if deadline is not None and deadline.expired():
+                    # A call cut short by the request's deadline only counts against the
+                    # provider if it was already slower than its breaker allows
+                    if latency >= breaker.max_p95_seconds:
+                        breaker.record(False, latency)
+                    else:
+                        breaker.cancel()
+                    print(f"LLM provider {provider.name} ran out of request time: {str(e)}")
+                    raise DeadlineExceeded("llm") from e
+                breaker.record(False, latency)
+                print(f"LLM provider {provider.name} failed: {str(e)}")
+                errors.append(f"{provider.name}: {str(e)}")
+                continue
+            breaker.record(True, time.time() - start_time)
+            return provider.name, result
+        raise AllProvidersFailed("; ".join(errors) or "No LLM providers configured")
+    
+    def metrics(self):
+        """Breaker metrics in the Prometheus text format"""
+        states = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+        lines = [
+            "# HELP chat_llm_provider_state Circuit breaker state (0 closed, 1 half-open, 2 open)",
+            "# TYPE chat_llm_provider_state gauge",
+        ]
+        lines += [f'chat_llm_provider_state{{provider="{name}"}} {states[breaker.state]}'
+                  for name, breaker in self.breakers.items()]
+        for metric, help_text, attribute in (
+            ("chat_llm_provider_calls_total", "Calls sent to the provider", "calls"),
+            ("chat_llm_provider_failures_total", "Failed calls to the provider", "failures"),
+            ("chat_llm_provider_circuit_opened_total", "Times the provider's circuit opened", "opened"),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{provider="{name}"}} {getattr(breaker, attribute)}'
+                      for name, breaker in self.breakers.items()]
+        return "\n".join(lines) + "\n"
+
+def create_router(spec=None):
+    """Router over the providers in spec ("kind:model,..."), skipping unconfigured ones"""
+    providers = []
+    for entry in (spec or LLM_PROVIDERS).split(","):
+        kind, _, model = entry.strip().partition(":")
+        if kind not in LLM_PROVIDER_TYPES or not model:
+            print(f"Ignoring unknown LLM provider: {entry}")
+            continue
+        provider = LLM_PROVIDER_TYPES[kind](model)
+        if provider.available():
+            providers.append(provider)
+    return ProviderRouter(providers, breaker_factory=lambda: CircuitBreaker(
+        window=LLM_BREAKER_WINDOW, max_error_rate=LLM_BREAKER_ERROR_RATE,
+        max_p95_seconds=LLM_BREAKER_P95_SECONDS, cooldown=LLM_BREAKER_COOLDOWN))
+
+router = create_router()
+
+# Hedging for the query embedding, if enabled
+embedding_hedger = EmbeddingHedger(
+    percentile=EMBEDDING_HEDGE_PERCENTILE, budget=EMBEDDING_HEDGE_BUDGET, min_samples=EMBEDDING_HEDGE_MIN_SAMPLES
+) if EMBEDDING_HEDGING else None
+
+def get_anthropic_client():
+    """Get or create the shared Anthropic client (None without an API key)"""
+    global anthropic
+    if anthropic is None and anthropic_api_key:
+        from anthropic import Anthropic
+        anthropic = Anthropic(api_key=anthropic_api_key)
+    return anthropic
+
+async def warmup():
+    """
+    Warm up every dependency with one canary request
+
+    Builds the shared clients and opens their connection pools (TLS handshakes
+    included), so the first user request does not pay for them. A canary
+    embedding is followed by a canary match_course_content RPC (or
+    match_course_content_with_context with CHUNK_EXPANSION). Every router
+    provider gets a canary that uses no tokens (a models call), recorded under
+    its name.
+    """
+    global warmup_latency_ms
+    start_time = time.time()
+
+    def canary_embedding():
+        return get_openai_client().embeddings.create(
+            model=EMBEDDING_MODEL, input=WARMUP_QUERY, timeout=WARMUP_TIMEOUT
+        ).data[0].embedding
+
+    embedding, *_ = await asyncio.gather(
+        asyncio.to_thread(run_canary, warmup_status, "openai", canary_embedding),
+        *(asyncio.to_thread(run_canary, warmup_status, provider.name, partial(provider.canary, WARMUP_TIMEOUT))
+          for provider in router.providers)
+    )
+
+    def canary_rpc():
+        if supabase is None:
+            raise ValueError("Supabase client not initialized")
+        if embedding is None:
+            raise ValueError("skipped, no canary embedding")
+        # The RPC that retrieval uses, so a missing match_course_content_with_context shows up here
+        return supabase.rpc(
+            'match_course_content_with_context' if CHUNK_EXPANSION else 'match_course_content',
+            {'query_embedding': embedding, 'match_threshold': 0.0, 'match_count': 1}
+        ).execute()
+
+    await asyncio.to_thread(run_canary, warmup_status, "supabase", canary_rpc)
+    warmup_latency_ms = round((time.time() - start_time) * 1000, 1)
+
+    print(f"=== Chat Warmup ({warmup_latency_ms:.0f} ms) ===")
+    for name, status in warmup_status.items():
+        print(f"{name}: {'ok' if status['ok'] else 'FAILED'} in {status['latency_ms']} ms"
+              f"{'' if status['ok'] else ' - ' + status['error']}")
+    print("========================")
+
+def ready_providers():
+    """
+    Router providers that can answer: configured and, with warmup, whose canary
+    succeeded. The router fails over, so one is enough for the app to be ready.
+    """
+    return [provider for provider in router.providers
+            if not WARMUP_ON_STARTUP or warmup_status.get(provider.name, {}).get("ok")]
+
 @app.on_event("startup")
 async def startup():
-    """Initialize Supabase client on startup."""
+    """Initialize Supabase client on startup, then warm up the dependencies."""
     global supabase
     try:
         # Log environment variable status (sanitized)
@@ -100,26 +719,269 @@ async def startup():
         print(f"Connected to Supabase: {SUPABASE_URL}")
     except Exception as e:
         print(f"Error initializing Supabase: {str(e)}")
+    
+    try:
+        get_openai_client()
+    except Exception as e:
+        print(f"Error initializing OpenAI: {str(e)}")
+    
+    try:
+        get_anthropic_client()
+    except Exception as e:
+        print(f"Error initializing Anthropic: {str(e)}")
+    
+    if WARMUP_ON_STARTUP:
+        await warmup()
 
 @app.get("/")
 def read_root():
     return {"message": "AI Education Chat API"}
 
-@retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
-def generate_embedding(text):
-    """Generate embedding using OpenAI API with retries."""
+@app.get("/metrics")
+def metrics():
+    """Admission control, LLM provider, deadline and embedding hedging metrics for Prometheus"""
+    lines = [
+        "# HELP chat_deadline_exceeded_total Requests that ran out of their deadline, by stage",
+        "# TYPE chat_deadline_exceeded_total counter",
+    ]
+    lines += [f'chat_deadline_exceeded_total{{stage="{stage}"}} {count}' for stage, count in deadline_exceeded.items()]
+    text = admission.metrics() + router.metrics() + "\n".join(lines) + "\n"
+    if embedding_hedger is not None:
+        text += embedding_hedger.metrics("chat")
+    return PlainTextResponse(text)
+
+def generate_embedding(text, deadline=None):
+    """
+    Generate embedding using OpenAI API with retries.
+    
+    With a deadline, each attempt gets the remaining time as its timeout and
+    retrying stops with DeadlineExceeded("embedding") when the backoff before
+    the next attempt would not leave any time for it. With EMBEDDING_HEDGING,
+    each attempt is a hedged request.
+    """
+    from tenacity import Retrying, wait_exponential, stop_after_attempt
+    backoff = wait_exponential(min=1, max=10)
+    
+    def out_of_time(retry_state):
+        if deadline is not None and backoff(retry_state) >= deadline.remaining():
+            raise DeadlineExceeded("embedding")
+        return False
+    
+    for attempt in Retrying(wait=backoff, stop=stop_after_attempt(3) | out_of_time):
+        with attempt:
+            embed = partial(create_embedding, text, None if deadline is None else deadline.check("embedding"))
+            return embedding_hedger.call(embed) if embedding_hedger is not None else embed()
+
+def create_embedding(text, timeout=None):
+    """Generate embedding using OpenAI API (one attempt)."""
     try:
-        response = openai.embeddings.create(
+        client = get_openai_client()
+        options = {}
+        if timeout is not None:
+            # generate_embedding does the retrying, within the request's deadline
+            client = client.with_options(max_retries=0)
+            options["timeout"] = timeout
+        response = client.embeddings.create(
             model=EMBEDDING_MODEL,
-            input=text
+            input=text,
+            **options
         )
         return response.data[0].embedding
     except Exception as e:
         print(f"Error generating embedding: {str(e)}")
         raise
 
-async def retrieve_relevant_content(query, proficiency_level="Intermediate", num_results=3):
-    """Retrieve relevant content from Supabase based on the query"""
+def estimate_tokens(text):
+    """Approximate token count (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+def choose_k(scores, max_k, min_gap=RETRIEVAL_MIN_GAP):
+    """
+    Number of top results to keep, from the gaps between descending scores
+    
+    Cuts at the largest drop between consecutive scores (including the drop
+    after the max_k-th) when it is at least min_gap: the results above it stand
+    out from the rest. Without such an elbow the scores are flat, as for broad
+    questions, and max_k results are kept.
+    """
+    gaps = [scores[i] - scores[i + 1] for i in range(min(len(scores) - 1, max_k))]
+    if not gaps:
+        return min(len(scores), max_k)
+    elbow = max(range(len(gaps)), key=gaps.__getitem__)
+    return elbow + 1 if gaps[elbow] >= min_gap else min(len(scores), max_k)
+
+def select_sources(sources, max_k=RETRIEVAL_MAX_K, max_tokens=RETRIEVAL_MAX_TOKENS):
+    """
+    Adaptive top-k over deduplicated sources (best first)
+    
+    Keeps the sources above the score elbow, then only as many of them as fit
+    in max_tokens (the best source always; None for no limit). Returns
+    (sources, k, tokens).
+    """
+    k = choose_k([source["relevance_score"] for source in sources], max_k)
+    selected, tokens = cap_tokens(sources[:k], max_tokens)
+    return selected, k, tokens
+
+def cap_tokens(sources, max_tokens=RETRIEVAL_MAX_TOKENS):
+    """
+    The leading sources that fit in max_tokens (the first always; None for no
+    limit). Returns (sources, tokens).
+    """
+    selected, tokens = [], 0
+    for source in sources:
+        cost = estimate_tokens(source["content"])
+        if selected and max_tokens is not None and tokens + cost > max_tokens:
+            break
+        selected.append(source)
+        tokens += cost
+    return selected, tokens
+
+def merge_section_chunks(rows):
+    """
+    Merge match_course_content_with_context rows into one row per section
+    
+    A section's rows (its matched chunks, its first chunk and the continuation
+    chunks next to the matches) are joined in chunk_index order, with "..." where
+    chunks in between were not returned. Sections are scored by their best
+    matched chunk, titled without the " (part N)" suffix, and returned best first.
+    """
+    sections = {}
+    for row in rows:
+        section = sections.setdefault(row["section_id"], {"chunks": {}, "similarity": 0.0})
+        section["chunks"][row.get("chunk_index", 0)] = row
+        if row.get("matched"):
+            section["similarity"] = max(section["similarity"], row.get("similarity", 0.0))
+    
+    merged = []
+    for section in sections.values():
+        indexes = sorted(section["chunks"])
+        first = section["chunks"][indexes[0]]
+        parts = []
+        for previous, index in zip([None] + indexes, indexes):
+            if previous is not None:
+                parts.append("\n\n" if index == previous + 1 else "\n\n...\n\n")
+            parts.append(section["chunks"][index].get("content", ""))
+        merged.append({
+            "content": "".join(parts),
+            "title": CONTINUATION_TITLE.sub("", first.get("title", "Unknown")),
+            "url": first.get("url", "Unknown"),
+            "similarity": section["similarity"]
+        })
+    merged.sort(key=lambda row: row["similarity"], reverse=True)
+    return merged
+
+def split_sentences(text):
+    """Split section text into sentences"""
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+# Course content rarely changes, so sentence embeddings are cached (least recently used out)
+sentence_embeddings = OrderedDict()
+sentence_embeddings_lock = threading.Lock()
+
+def embed_sentences(sentences, timeout=None):
+    """Embeddings of the sentences (float32 arrays), with one batched API call for those not cached"""
+    import numpy as np
+    
+    # Vectors are collected locally: another request's eviction may remove a
+    # cached or newly added sentence while this one is still using it
+    found = {}
+    with sentence_embeddings_lock:
+        for sentence in dict.fromkeys(sentences):
+            if sentence in sentence_embeddings:
+                sentence_embeddings.move_to_end(sentence)
+                found[sentence] = sentence_embeddings[sentence]
+    missing = [sentence for sentence in dict.fromkeys(sentences) if sentence not in found]
+    if missing:
+        client = get_openai_client()
+        options = {}
+        if timeout is not None:
+            client = client.with_options(max_retries=0)
+            options["timeout"] = timeout
+        response = client.embeddings.create(model=EMBEDDING_MODEL, input=missing, **options)
+        for sentence, item in zip(missing, response.data):
+            found[sentence] = np.asarray(item.embedding, dtype=np.float32)
+    with sentence_embeddings_lock:
+        for sentence in missing:
+            sentence_embeddings[sentence] = found[sentence]
+        while len(sentence_embeddings) > SENTENCE_CACHE_SIZE:
+            sentence_embeddings.popitem(last=False)
+    vectors = [found[sentence] for sentence in sentences]
+    return vectors
+
+def compress_context(query_embedding, sources, token_budget=None, neighbours=None, timeout=None):
+    """
+    Extractive compression of the retrieved sources
+    
+    Every sentence is scored by cosine similarity to the query embedding, in one
+    matrix product over all sentences. Sentences are then taken best first, each
+    with `neighbours` sentences on either side, while they fit in token_budget.
+    Each source's best sentence goes first, so every source keeps its evidence.
+    Returns copies of the sources, with the same citation ids, whose content is
+    the kept sentences in their original order ("..." marks left-out text).
+    Sources without any kept sentence are left out. The budget and neighbours
+    default to CONTEXT_TOKEN_BUDGET and CONTEXT_NEIGHBOURS.
+    """
+    import numpy as np
+    
+    token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    neighbours = CONTEXT_NEIGHBOURS if neighbours is None else neighbours
+    sentences = [split_sentences(source["content"]) for source in sources]
+    positions = [(i, j) for i, source_sentences in enumerate(sentences) for j in range(len(source_sentences))]
+    if not positions:
+        return sources
+    
+    vectors = np.vstack(embed_sentences([sentences[i][j] for i, j in positions], timeout))
+    query = np.asarray(query_embedding, dtype=np.float32)
+    scores = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query) + 1e-12)
+    
+    ranked = [int(position) for position in np.argsort(-scores, kind="stable")]
+    best_of_source = {}
+    for position in ranked:
+        best_of_source.setdefault(positions[position][0], position)
+    firsts = set(best_of_source.values())
+    ranked = list(best_of_source.values()) + [position for position in ranked if position not in firsts]
+    
+    kept, used = set(), 0
+    for position in ranked:
+        i, j = positions[position]
+        window = [(i, n) for n in range(max(0, j - neighbours), min(len(sentences[i]), j + neighbours + 1))
+                  if (i, n) not in kept]
+        # One token per sentence for the space or "..." that joins it to the rest
+        cost = sum(estimate_tokens(sentences[i][n]) + 1 for _, n in window)
+        if used + cost > token_budget:
+            # Without its neighbours the sentence itself may still fit
+            window = [(i, j)] if (i, j) not in kept else []
+            cost = estimate_tokens(sentences[i][j]) + 1
+        if window and used + cost <= token_budget:
+            kept.update(window)
+            used += cost
+    
+    compressed = []
+    for i, source in enumerate(sources):
+        indices = sorted(n for k, n in kept if k == i)
+        if not indices:
+            continue
+        text = sentences[i][indices[0]]
+        for previous, n in zip(indices, indices[1:]):
+            text += (" " if n == previous + 1 else " ... ") + sentences[i][n]
+        compressed.append({**source, "content": text})
+    return compressed
+
+async def retrieve_relevant_content(query, proficiency_level="Intermediate", num_results=RETRIEVAL_MAX_K, deadline=None,
+                                    compress=CONTEXT_COMPRESSION, expand=CHUNK_EXPANSION):
+    """
+    Retrieve relevant content from Supabase based on the query
+    
+    One RPC fetches RETRIEVAL_CANDIDATES matches; with expand, the same RPC also
+    returns each match's parent and neighbouring continuation chunks, which are
+    merged into one match per section (merge_section_chunks). select_sources() then keeps
+    up to num_results of them, depending on the score distribution and the
+    RETRIEVAL_MAX_TOKENS budget. With compress, their content is instead
+    reduced to the sentences relevant to the query, within CONTEXT_TOKEN_BUDGET
+    (compress_context). With a deadline, the embedding and the RPC only get the request's remaining
+    time and DeadlineExceeded is raised instead of returning fallback data. Compression
+    only gets its own small budget, and is skipped when the time left is needed for the LLM.
+    """
     global supabase
     
     # Set minimum relevance threshold based on proficiency
@@ -137,29 +999,52 @@ async def retrieve_relevant_content(query, proficiency_level="Intermediate", num
         
         # Generate embedding using OpenAI
         print(f"Generating embedding for query: '{query[:30]}...'")
-        embedding = generate_embedding(query)
+        # In a thread: the call and its retry backoff block, and would stall every
+        # other request on this worker
+        if deadline is None:
+            embedding = await asyncio.to_thread(generate_embedding, query)
+        else:
+            try:
+                embedding = await asyncio.wait_for(asyncio.to_thread(generate_embedding, query, deadline),
+                                                   deadline.check("embedding"))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("embedding")
         print("Successfully generated embedding")
         
         # Search Supabase
-        print("Calling Supabase RPC function 'match_course_content'")
-        response = supabase.rpc(
-            'match_course_content',
-            {
-                'query_embedding': embedding,
-                'match_threshold': relevance_threshold,
-                'match_count': num_results
-            }
-        ).execute()
+        rpc_name = 'match_course_content_with_context' if expand else 'match_course_content'
+        params = {
+            'query_embedding': embedding,
+            'match_threshold': relevance_threshold,
+            'match_count': max(RETRIEVAL_CANDIDATES, num_results)
+        }
+        if expand:
+            params['sibling_window'] = CHUNK_EXPANSION_WINDOW
+        print(f"Calling Supabase RPC function '{rpc_name}'")
+        rpc = supabase.rpc(rpc_name, params)
+        if deadline is None:
+            response = rpc.execute()
+        else:
+            # The Supabase client has no per-call timeout, so stop waiting for the
+            # RPC (in a thread) when the request runs out of time
+            try:
+                response = await asyncio.wait_for(asyncio.to_thread(rpc.execute), deadline.check("retrieval"))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("retrieval")
         
         if hasattr(response, 'error') and response.error:
             print(f"Supabase RPC returned error: {response.error}")
             raise Exception(response.error)
         
         print(f"Supabase returned {len(response.data)} results")
+        rows = response.data
+        if expand:
+            rows = merge_section_chunks(rows)
+            print(f"Chunk expansion: merged {len(response.data)} chunks into {len(rows)} sections")
         
         # Format results for prompt and citations
         sources = []
-        for i, item in enumerate(response.data):
+        for i, item in enumerate(rows):
             sources.append({
                 "id": i + 1,  # 1-based indexing for citations
                 "content": item.get("content", ""),
@@ -169,10 +1054,38 @@ async def retrieve_relevant_content(query, proficiency_level="Intermediate", num
                 "section_title": item.get("title", "")  # Use title as section_title
             })
         
-        # Deduplicate sources before returning them
+        # Deduplicate sources, then pick how many to send from their scores
         deduplicated_sources = deduplicate_citations(sources)
-        print(f"Returning {len(deduplicated_sources)} deduplicated sources")
-        return deduplicated_sources
+        # When compressing, the compression budget limits the tokens instead, unless
+        # compression fails (see below)
+        selected_sources, k, tokens = select_sources(deduplicated_sources, num_results,
+                                                     None if compress else RETRIEVAL_MAX_TOKENS)
+        print(f"Adaptive retrieval: k={len(selected_sources)} (score elbow at {k}) of "
+              f"{len(deduplicated_sources)} deduplicated candidates, ~{tokens} tokens of content")
+        
+        if compress and selected_sources:
+            budget = CONTEXT_COMPRESSION_TIMEOUT
+            if deadline is not None:
+                budget = min(budget, deadline.check("retrieval") - CONTEXT_COMPRESSION_LLM_RESERVE)
+            try:
+                if budget <= 0:
+                    raise TimeoutError("skipped, the remaining time is reserved for the LLM")
+                start_time = time.time()
+                compressed_sources = await asyncio.wait_for(
+                    asyncio.to_thread(compress_context, embedding, selected_sources, timeout=budget), budget
+                )
+                compressed_tokens = sum(estimate_tokens(source["content"]) for source in compressed_sources)
+                print(f"Context compression: ~{tokens} -> ~{compressed_tokens} tokens in "
+                      f"{(time.time() - start_time) * 1000:.0f} ms")
+                selected_sources = compressed_sources
+            except Exception as e:
+                # Whole sections still answer the question, within the usual token cap
+                selected_sources, tokens = cap_tokens(selected_sources, RETRIEVAL_MAX_TOKENS)
+                print(f"Context compression failed, sending {len(selected_sources)} whole sections "
+                      f"(~{tokens} tokens): {str(e) or type(e).__name__}")
+        return selected_sources
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"Error retrieving content: {str(e)}")
         print(f"Exception type: {type(e).__name__}")
@@ -322,6 +1235,9 @@ def format_conversation_history(history):
 async def chat(request: Request):
     """Main chat handler function"""
     
+    # Every stage below only gets the time left until this deadline
+    deadline = request_deadline(request)
+    
     try:
         # Parse request
         data = await request.json()
@@ -333,10 +1249,19 @@ async def chat(request: Request):
         if not message:
             raise HTTPException(status_code=400, detail="Message is required")
         
+        # Shed load before doing any retrieval work if the LLM queue is already full
+        if admission.shed_early():
+            return get_busy_response(conversation_summary)
+        
+        # Import and create the LLM clients in a thread while retrieval waits on
+        # the network, so a cold start does not pay for the imports afterwards
+        providers_ready = asyncio.get_running_loop().run_in_executor(None, router.prepare)
+        
         # Retrieve relevant content
         retrieved_content = await retrieve_relevant_content(
             message, 
-            proficiency_level
+            proficiency_level,
+            deadline=deadline
         )
         
         # Generate system prompt
@@ -354,86 +1279,73 @@ async def chat(request: Request):
         # Get response schema from Pydantic model
         response_schema = ChatResponse.model_json_schema()
         
-        # Generate response with Claude if API key is available
-        if anthropic:
-            # Create messages for Anthropic
+        # Generate response with Claude (or a failover provider) if an API key is available
+        await providers_ready
+        if router.providers:
+            # Create messages for the LLM
             messages = [{"role": "user", "content": message}]
             
             # Add conversation history if available
             if formatted_history and len(formatted_history) > 0:
                 messages = formatted_history + messages
             
+            # Wait for a free LLM slot, or shed load with a fast 503
+            if not await admission.acquire(timeout=deadline.check("queue")):
+                deadline.check("queue")  # Out of time rather than shed?
+                return get_busy_response(conversation_summary)
+            
             try:
-                # Call Anthropic API with Tools
-                response = anthropic.messages.create(
-                    model="claude-3-5-haiku-latest",
-                    max_tokens=1000,
-                    system=system_prompt,
-                    messages=messages,
-                    tools=[{
-                        "name": "response_formatter",
-                        "input_schema": response_schema
-                    }],
-                    tool_choice={
-                        "type": "tool",
-                        "name": "response_formatter"
-                    }
-                )
+                # Call the first available provider, failing over on errors. The SDK
+                # timeouts cover single attempts, so also stop waiting at the deadline.
+                # The slot is freed when the call returns, not when we stop waiting.
+                call = llm_executor.submit(router.generate, system_prompt, messages, response_schema,
+                                           max_tokens=1000, deadline=deadline)
+                admission.release_when_done(call)
+                try:
+                    provider_name, structured_data = await asyncio.wait_for(asyncio.wrap_future(call),
+                                                                            deadline.check("llm"))
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded("llm")
+                print(f"Response generated by {provider_name}")
                 
-                # Extract structured data
-                if (response.content and 
-                    response.content[0].type == 'tool_use' and 
-                    response.content[0].name == 'response_formatter'):
-                    
-                    structured_data = response.content[0].input
-                    
-                    # If it's a string, parse it to dict
-                    if isinstance(structured_data, str):
-                        try:
-                            structured_data = json.loads(structured_data)
-                        except json.JSONDecodeError:
-                            print(f"Error parsing response as JSON: {structured_data}")
-                            return get_fallback_response("Invalid response format", conversation_summary)
-                    
-                    # Check if answer is a JSON string and parse it
-                    if isinstance(structured_data.get("answer"), str):
-                        try:
-                            # Try to parse as JSON
-                            answer_json = json.loads(structured_data["answer"])
-                            if isinstance(answer_json, dict):
-                                structured_data["answer"] = answer_json
-                        except (json.JSONDecodeError, TypeError):
-                            # If it's not valid JSON, create an answer object
-                            structured_data["answer"] = {"text": structured_data["answer"]}
-                    
-                    # Add sources information
-                    source_list = [
-                        {
-                            "id": source["id"],
-                            "title": source["title"],
-                            "url": source["url"],
-                            "section_title": source.get("section_title", ""),
-                            "relevance_score": source.get("relevance_score", 0.0)
-                        }
-                        for source in retrieved_content
-                    ]
-                    structured_data["sources"] = source_list
-                    
-                    # Validate and parse through Pydantic model
+                # Check if answer is a JSON string and parse it
+                if isinstance(structured_data.get("answer"), str):
                     try:
-                        # This will convert any nested JSON strings to Python objects
-                        chat_response = ChatResponse(**structured_data)
-                        # Convert back to dict for JSON response
-                        return chat_response.model_dump()
-                    except Exception as e:
-                        print(f"Error validating response with Pydantic: {str(e)}")
-                        return get_fallback_response(f"Data validation error: {str(e)}", conversation_summary)
-                else:
-                    # Fallback to mock response if extraction fails
-                    return get_fallback_response("Could not parse model response", conversation_summary)
+                        # Try to parse as JSON
+                        answer_json = json.loads(structured_data["answer"])
+                        if isinstance(answer_json, dict):
+                            structured_data["answer"] = answer_json
+                    except (json.JSONDecodeError, TypeError):
+                        # If it's not valid JSON, create an answer object
+                        structured_data["answer"] = {"text": structured_data["answer"]}
+                
+                # Add sources information
+                source_list = [
+                    {
+                        "id": source["id"],
+                        "title": source["title"],
+                        "url": source["url"],
+                        "section_title": source.get("section_title", ""),
+                        "relevance_score": source.get("relevance_score", 0.0)
+                    }
+                    for source in retrieved_content
+                ]
+                structured_data["sources"] = source_list
+                
+                # Validate and parse through Pydantic model
+                try:
+                    # This will convert any nested JSON strings to Python objects
+                    chat_response = ChatResponse(**structured_data)
+                    # Convert back to dict for JSON response
+                    return chat_response.model_dump()
+                except Exception as e:
+                    print(f"Error validating response with Pydantic: {str(e)}")
+                    return get_fallback_response(f"Data validation error: {str(e)}", conversation_summary)
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 error_message = str(e)
-                print(f"Error calling Anthropic API: {error_message}")
+                print(f"Error calling LLM providers: {error_message}")
                 
                 # Check for overloaded error (code 529)
                 if "overloaded_error" in error_message or "529" in error_message:
@@ -451,13 +1363,45 @@ async def chat(request: Request):
                 # For other errors, use the regular fallback
                 return get_fallback_response(f"API error: {error_message}", conversation_summary)
         else:
-            # Return mock response if Anthropic API key is not available
+            # Return mock response if no LLM API key is available
             return get_fallback_response("API key not configured", conversation_summary)
     
+    except DeadlineExceeded as e:
+        print(f"Chat request ran out of its {deadline.seconds:g} s deadline during {e.stage}")
+        return get_deadline_response(e.stage, conversation_summary)
     except Exception as e:
         print(f"Error in chat handler: {str(e)}")
         return get_fallback_response(f"Error: {str(e)}", conversation_summary)
 
+def get_busy_response(conversation_summary=None):
+    """503 response for requests shed by the admission controller"""
+    busy = ChatResponse(
+        answer=Answer(text="The assistant is handling a lot of questions right now. Please try again in a few seconds."),
+        followUpQuestions=[],
+        conversationSummary=conversation_summary or "Conversation about AI education topics.",
+        sources=[]
+    )
+    return JSONResponse(
+        status_code=503,
+        content=busy.model_dump(),
+        headers={"Retry-After": str(LLM_RETRY_AFTER)}
+    )
+
+def get_deadline_response(stage, conversation_summary=None):
+    """504 response naming the stage during which the request's deadline ran out"""
+    deadline_exceeded[stage] += 1
+    timed_out = ChatResponse(
+        answer=Answer(text=f"I couldn't answer in time: the {DEADLINE_STAGES[stage]} took too long. Please try again."),
+        followUpQuestions=[],
+        conversationSummary=conversation_summary or "Conversation about AI education topics.",
+        sources=[]
+    )
+    return JSONResponse(
+        status_code=504,
+        content={**timed_out.model_dump(), "timedOutStage": stage},
+        headers={"X-Deadline-Exceeded": stage}
+    )
+
 def get_fallback_response(reason, conversation_summary=None):
     """Get a fallback response when structured response parsing fails"""
     return ChatResponse(
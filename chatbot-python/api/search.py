@@ -1,11 +1,12 @@
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
 import os
 import json
 import time
-import openai
-from supabase import create_client, Client
+import asyncio
+from functools import partial
 from dotenv import load_dotenv
-from tenacity import retry, wait_exponential, stop_after_attempt
+from api._shared import EmbeddingHedger, create_client, get_openai_client, run_canary
 
 app = FastAPI()
 load_dotenv()
@@ -17,29 +18,97 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 # Initialize OpenAI
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
-openai.api_key = OPENAI_API_KEY
 
-# Initialize clients - will be loaded on first request
+# Initialize clients - created at startup, or on first request if that failed
 supabase = None
 
+# Startup warmup: a canary request to each dependency opens its connections
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "true").lower() == "true"
+WARMUP_TIMEOUT = float(os.environ.get("WARMUP_TIMEOUT", "5"))  # Seconds per canary request
+WARMUP_QUERY = "What are large language models?"
+warmup_status = {}  # Dependency name -> {"ok", "latency_ms", "error"}
+warmup_latency_ms = None  # Total warmup time, once warmup has run
+
+# Hedged embedding requests (see "Hedged Embedding Requests" in README.md)
+EMBEDDING_HEDGING = os.environ.get("EMBEDDING_HEDGING", "false").lower() == "true"
+EMBEDDING_HEDGE_PERCENTILE = float(os.environ.get("EMBEDDING_HEDGE_PERCENTILE", "95"))
+EMBEDDING_HEDGE_BUDGET = float(os.environ.get("EMBEDDING_HEDGE_BUDGET", "0.1"))
+EMBEDDING_HEDGE_MIN_SAMPLES = int(os.environ.get("EMBEDDING_HEDGE_MIN_SAMPLES", "20"))
+
+# The openai, supabase and tenacity SDKs are imported on first use, not here,
+# to keep serverless cold starts short (see README.md)
+
+# Hedging for the query embedding, if enabled
+embedding_hedger = EmbeddingHedger(
+    percentile=EMBEDDING_HEDGE_PERCENTILE, budget=EMBEDDING_HEDGE_BUDGET, min_samples=EMBEDDING_HEDGE_MIN_SAMPLES
+) if EMBEDDING_HEDGING else None
+
+async def warmup():
+    """Warm up the OpenAI and Supabase connections with a canary embedding and RPC"""
+    global warmup_latency_ms
+    start_time = time.time()
+
+    embedding = await asyncio.to_thread(run_canary, warmup_status, "openai", lambda: get_openai_client().embeddings.create(
+        model=EMBEDDING_MODEL, input=WARMUP_QUERY, timeout=WARMUP_TIMEOUT
+    ).data[0].embedding)
+
+    def canary_rpc():
+        if supabase is None:
+            raise ValueError("Supabase client not initialized")
+        if embedding is None:
+            raise ValueError("skipped, no canary embedding")
+        return supabase.rpc(
+            'match_course_content',
+            {'query_embedding': embedding, 'match_threshold': 0.0, 'match_count': 1}
+        ).execute()
+
+    await asyncio.to_thread(run_canary, warmup_status, "supabase", canary_rpc)
+    warmup_latency_ms = round((time.time() - start_time) * 1000, 1)
+
+    print(f"=== Search Warmup ({warmup_latency_ms:.0f} ms) ===")
+    for name, status in warmup_status.items():
+        print(f"{name}: {'ok' if status['ok'] else 'FAILED'} in {status['latency_ms']} ms"
+              f"{'' if status['ok'] else ' - ' + status['error']}")
+    print("========================")
+
 @app.on_event("startup")
 async def startup():
-    """Initialize Supabase client on startup."""
+    """Initialize the Supabase and OpenAI clients on startup, then warm them up."""
     global supabase
     try:
         supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
     except Exception as e:
         print(f"Error initializing Supabase: {str(e)}")
+    
+    try:
+        get_openai_client()
+    except Exception as e:
+        print(f"Error initializing OpenAI: {str(e)}")
+    
+    if WARMUP_ON_STARTUP:
+        await warmup()
 
 @app.get("/")
 def read_root():
     return {"message": "AI Education Search API"}
 
-@retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
+@app.get("/metrics")
+def metrics():
+    """Embedding hedging metrics for Prometheus"""
+    return PlainTextResponse(embedding_hedger.metrics("search") if embedding_hedger is not None else "")
+
 def generate_embedding(text):
-    """Generate embedding using OpenAI API with retries."""
+    """Generate embedding using OpenAI API with retries (each attempt hedged if EMBEDDING_HEDGING)."""
+    from tenacity import Retrying, wait_exponential, stop_after_attempt
+    for attempt in Retrying(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3)):
+        with attempt:
+            embed = partial(create_embedding, text)
+            return embedding_hedger.call(embed) if embedding_hedger is not None else embed()
+
+def create_embedding(text):
+    """Generate embedding using OpenAI API (one attempt)."""
     try:
-        response = openai.embeddings.create(
+        response = get_openai_client().embeddings.create(
             model=EMBEDDING_MODEL,
             input=text
         )
@@ -73,7 +142,8 @@ async def search(request: Request):
     # Generate embedding using OpenAI
     try:
         start_time = time.time()
-        embedding = generate_embedding(query)
+        # In a thread: the call, its retry backoff and the hedger's wait all block
+        embedding = await asyncio.to_thread(generate_embedding, query)
         print(f"Embedding generated in {time.time() - start_time:.2f} seconds")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate embedding: {str(e)}")
@@ -0,0 +1,74 @@
+"""
+Throughput benchmark for the API server
+
+Sends GET requests over a fixed number of concurrent keep-alive connections for a
+fixed time and reports requests/second and latency percentiles. The client is a
+minimal HTTP/1.1 client on asyncio streams, so it uses far less CPU than the
+server it measures. Start the server in the mode to measure first, e.g.:
+
+    python server.py                                  # development (reload)
+    python server.py --production --workers 4         # production
+    python benchmark_server.py --url http://localhost:3000/api/chat/ --concurrency 64 --duration 10
+"""
+
+import time
+import asyncio
+import argparse
+import statistics
+from urllib.parse import urlsplit
+
+async def connection(host, port, path, deadline, latencies, errors):
+    """Send requests one after another on one keep-alive connection until the deadline"""
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n".encode()
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if status_line.split()[1:2] == [b"200"]:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status_line.strip())
+    except (ConnectionError, asyncio.IncompleteReadError, IndexError) as e:
+        errors.append(type(e).__name__)
+    finally:
+        writer.close()
+
+async def run(url, concurrency, duration):
+    parts = urlsplit(url)
+    host, port, path = parts.hostname, parts.port or 80, parts.path or "/"
+
+    # Warm up, then measure
+    await asyncio.gather(*[connection(host, port, path, time.perf_counter() + 1, [], [])
+                           for _ in range(concurrency)])
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[connection(host, port, path, start + duration, latencies, errors)
+                           for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        print(f"No successful requests ({len(errors)} errors)")
+        return
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{url}: {len(latencies) / elapsed:,.0f} requests/s, "
+          f"p50 {quantiles[49] * 1000:.1f} ms, p99 {quantiles[98] * 1000:.1f} ms, "
+          f"{len(latencies)} ok, {len(errors)} errors, {concurrency} connections, {elapsed:.1f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure API server throughput")
+    parser.add_argument("--url", default="http://localhost:3000/api/chat/", help="URL to GET")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent connections (default: 64)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run (default: 10)")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.duration))
@@ -0,0 +1,111 @@
+"""
+Context compression eval
+
+Runs every question of the eval set through retrieval twice, with whole sections
+and with extractive compression, and reports the prompt's input tokens and the
+latency of each variant. Tokens are counted with Anthropic's token counting
+endpoint when ANTHROPIC_API_KEY is set, otherwise estimated at ~4 characters per
+token. Needs OPENAI_API_KEY, SUPABASE_URL and SUPABASE_KEY:
+
+    python eval_compression.py                     # input tokens and retrieval latency
+    python eval_compression.py --generate          # also time the LLM call for each prompt
+    python eval_compression.py --budget 600        # try another CONTEXT_TOKEN_BUDGET
+"""
+
+import time
+import asyncio
+import argparse
+import statistics
+from api import chat
+
+# Questions across the course pages, from narrow to broad
+EVAL_QUESTIONS = [
+    "What is a large language model?",
+    "How does temperature affect an LLM's output?",
+    "What is the difference between zero-shot and few-shot prompting?",
+    "What is chain-of-thought prompting?",
+    "What makes an LLM application an agent?",
+    "How do agents use memory?",
+    "What problem does the Model Context Protocol solve?",
+    "What are MCP tools, resources and prompts?",
+    "How do I choose between open-source and hosted models?",
+    "What does Amazon Bedrock provide?",
+    "What are the limitations of LLMs?",
+    "How would I build a production-grade AI application end to end?",
+]
+
+def count_tokens(system_prompt, question):
+    """Input tokens of the prompt, and whether they were counted or estimated"""
+    client = chat.get_anthropic_client()
+    if client is not None:
+        model = next((provider.model for provider in chat.router.providers if provider.kind == "anthropic"),
+                     "claude-3-5-haiku-latest")
+        result = client.messages.count_tokens(model=model, system=system_prompt,
+                                              messages=[{"role": "user", "content": question}])
+        return result.input_tokens, "counted"
+    return chat.estimate_tokens(system_prompt) + chat.estimate_tokens(question), "estimated"
+
+async def evaluate(question, generate):
+    """Tokens and latencies of one question, without and with compression"""
+    result = {}
+    for variant, compress in (("before", False), ("after", True)):
+        start = time.perf_counter()
+        sources = await chat.retrieve_relevant_content(question, compress=compress)
+        retrieval_ms = (time.perf_counter() - start) * 1000
+        system_prompt = chat.generate_prompt(question, "Intermediate", [], "", sources)
+        tokens, method = count_tokens(system_prompt, question)
+        llm_ms = None
+        if generate:
+            start = time.perf_counter()
+            await asyncio.to_thread(chat.router.generate, system_prompt, [{"role": "user", "content": question}],
+                                    chat.ChatResponse.model_json_schema())
+            llm_ms = (time.perf_counter() - start) * 1000
+        result[variant] = {"tokens": tokens, "method": method, "retrieval_ms": retrieval_ms, "llm_ms": llm_ms,
+                           "sources": [source["id"] for source in sources]}
+    return result
+
+def print_report(results, generate):
+    """Per-question table and medians"""
+    header = f"{'question':<50} {'tokens':>15} {'retrieval ms':>15}"
+    if generate:
+        header += f" {'LLM ms':>15}"
+    print(header)
+    for question, result in results:
+        before, after = result["before"], result["after"]
+        line = (f"{question[:50]:<50} {before['tokens']:>6} -> {after['tokens']:<6}"
+                f" {before['retrieval_ms']:>6.0f} -> {after['retrieval_ms']:<6.0f}")
+        if generate:
+            line += f" {before['llm_ms']:>6.0f} -> {after['llm_ms']:<6.0f}"
+        print(line)
+
+    def median(variant, key):
+        return statistics.median(result[variant][key] for _, result in results)
+
+    before_tokens, after_tokens = median("before", "tokens"), median("after", "tokens")
+    print(f"\nMedian input tokens ({results[0][1]['before']['method']}): {before_tokens:.0f} -> {after_tokens:.0f} "
+          f"({(1 - after_tokens / before_tokens) * 100:.0f}% fewer)")
+    print(f"Median retrieval latency: {median('before', 'retrieval_ms'):.0f} ms -> "
+          f"{median('after', 'retrieval_ms'):.0f} ms")
+    if generate:
+        print(f"Median LLM latency: {median('before', 'llm_ms'):.0f} ms -> {median('after', 'llm_ms'):.0f} ms")
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description="Compare prompts with and without context compression")
+    arg_parser.add_argument("--generate", action="store_true", help="Also time the LLM call for each prompt")
+    arg_parser.add_argument("--budget", type=int, default=chat.CONTEXT_TOKEN_BUDGET,
+                            help=f"Context token budget (default {chat.CONTEXT_TOKEN_BUDGET})")
+    args = arg_parser.parse_args()
+
+    # Without these, retrieval silently returns fallback data and the numbers mean nothing
+    missing = [name for name in ("OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_KEY") if not getattr(chat, name)]
+    if missing:
+        raise SystemExit(f"Set {', '.join(missing)} to run the eval")
+
+    chat.CONTEXT_TOKEN_BUDGET = args.budget
+    results = []
+    for question in EVAL_QUESTIONS:
+        results.append((question, await evaluate(question, args.generate)))
+    print_report(results, args.generate)
+
+if __name__ == "__main__":
+    asyncio.run(main())
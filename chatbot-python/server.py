@@ -1,14 +1,24 @@
 import os
+import sys
+import asyncio
+import argparse
+import importlib.util
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from api.chat import app as chat_app
-from api.search import app as search_app
+from api import chat, search
 
 # Load environment variables
 load_dotenv()
 
+# Production mode settings (see "Production Server" in README.md)
+SERVER_MODE = os.getenv("SERVER_MODE", "development")
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY")  # Worker processes in production (default: one per CPU)
+KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", 75))  # Longer than a load balancer's 60 s idle timeout
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", 30))  # Seconds in-flight requests get on SIGTERM
+ACCESS_LOG = os.getenv("ACCESS_LOG", "false").lower() == "true"  # Per-request access log in production
+
 # Create main app
 app = FastAPI(title="AI Education API")
 
@@ -23,23 +33,139 @@ app.add_middleware(
 )
 
 # Mount sub-applications
-app.mount("/api/chat", chat_app)
-app.mount("/api/search", search_app)
+app.mount("/api/chat", chat.app)
+app.mount("/api/search", search.app)
+
+def self_check():
+    """
+    Check configuration and the clients created at startup
+
+    Returns a dict of check name -> (passed, detail).
+    """
+    return {
+        "OPENAI_API_KEY": (bool(chat.OPENAI_API_KEY), "set" if chat.OPENAI_API_KEY else "missing"),
+        "SUPABASE_URL": (bool(chat.SUPABASE_URL), "set" if chat.SUPABASE_URL else "missing"),
+        "SUPABASE_KEY": (bool(chat.SUPABASE_KEY), "set" if chat.SUPABASE_KEY else "missing"),
+        "LLM providers": (bool(chat.router.providers),
+                          ", ".join(provider.name for provider in chat.router.providers)
+                          or "none configured, chat returns fallback responses"),
+        "chat Supabase client": (chat.supabase is not None, "connected" if chat.supabase is not None else "not initialized"),
+        "search Supabase client": (search.supabase is not None, "connected" if search.supabase is not None else "not initialized"),
+    }
+
+def print_self_check(checks):
+    """Print the self-check results; returns True if every check passed"""
+    print(f"=== Startup Self-Check (pid {os.getpid()}) ===")
+    for name, (passed, detail) in checks.items():
+        print(f"{'OK  ' if passed else 'FAIL'} {name}: {detail}")
+    print("=" * 40)
+    return all(passed for passed, _ in checks.values())
+
+@app.on_event("startup")
+async def startup():
+    """Initialize the sub-apps' clients once per worker process, then self-check."""
+    # Starlette does not run startup handlers of mounted apps, so without this their
+    # clients would only be created lazily by the first request
+    await chat.app.router.startup()
+    await search.app.router.startup()
+    print_self_check(self_check())
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Run the sub-apps' shutdown handlers when the worker stops."""
+    await chat.app.router.shutdown()
+    await search.app.router.shutdown()
 
 # Root endpoint
 @app.get("/")
 def read_root():
     return {"message": "AI Education API", "version": "1.0.0"}
 
+@app.get("/health/live")
+def liveness():
+    """Liveness probe: the worker process is up and serving requests"""
+    return {"status": "alive", "pid": os.getpid()}
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    """
+    Readiness probe: the self-check passes and the warmup canaries succeeded
+
+    Every canary must succeed except the LLM providers', where one is enough
+    because the chat router fails over to it. Returns 503 until then, with the
+    status and warmup latency of each dependency.
+    """
+    checks = self_check()
+    apps = {}
+    for name, module in (("chat", chat), ("search", search)):
+        apps[name] = {
+            "warmup_enabled": module.WARMUP_ON_STARTUP,
+            "warmup_latency_ms": module.warmup_latency_ms,
+            "dependencies": module.warmup_status,
+        }
+    llm_providers = {provider.name for provider in chat.router.providers}
+    ready_providers = [provider.name for provider in chat.ready_providers()]
+    apps["chat"]["llm_providers_ready"] = ready_providers
+    ready = all(passed for passed, _ in checks.values()) and bool(ready_providers) and all(
+        not module.WARMUP_ON_STARTUP
+        or (module.warmup_latency_ms is not None
+            and all(status["ok"] for name, status in module.warmup_status.items()
+                    if module is not chat or name not in llm_providers))
+        for module in (chat, search)
+    )
+    response.status_code = 200 if ready else 503
+    return {
+        "status": "ready" if ready else "not ready",
+        "pid": os.getpid(),
+        "checks": {name: {"ok": passed, "detail": detail} for name, (passed, detail) in checks.items()},
+        "apps": apps,
+    }
+
+def production_options(workers=None):
+    """uvicorn.run options for production: workers, uvloop/httptools, no reload"""
+    workers = workers or int(WEB_CONCURRENCY or os.cpu_count() or 1)
+    # uvloop and httptools are C implementations of the event loop and HTTP parser;
+    # fall back to asyncio and h11 where they are not installed (e.g. Windows)
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return {
+        "workers": workers,
+        "loop": loop,
+        "http": http,
+        "reload": False,
+        "timeout_keep_alive": KEEP_ALIVE_TIMEOUT,
+        "timeout_graceful_shutdown": GRACEFUL_SHUTDOWN_TIMEOUT,
+        "access_log": ACCESS_LOG,
+    }
+
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Run the AI Education API server")
+    arg_parser.add_argument("--production", action="store_true", default=SERVER_MODE == "production",
+                            help="Production mode: multiple workers, uvloop/httptools, no reload (or SERVER_MODE=production)")
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="Worker processes in production mode (default: WEB_CONCURRENCY or one per CPU)")
+    arg_parser.add_argument("--check", action="store_true",
+                            help="Run the startup self-check and exit (status 1 if any check fails)")
+    args = arg_parser.parse_args()
+
+    if args.check:
+        asyncio.run(startup())
+        sys.exit(0 if all(passed for passed, _ in self_check().values()) else 1)
+
     # Get configuration from environment variables
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 3000))
-    
-    # Run the server
-    uvicorn.run(
-        "server:app",
-        host=host,
-        port=port,
-        reload=True  # Enable auto-reload during development
-    ) 
\ No newline at end of file
+
+    if args.production:
+        options = production_options(args.workers)
+        print(f"Starting production server: {options['workers']} worker(s), "
+              f"{options['loop']} event loop, {options['http']} HTTP parser")
+        uvicorn.run("server:app", host=host, port=port, **options)
+    else:
+        # Run the server
+        uvicorn.run(
+            "server:app",
+            host=host,
+            port=port,
+            reload=True  # Enable auto-reload during development
+        )
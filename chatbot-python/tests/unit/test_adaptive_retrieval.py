@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Adaptive Retrieval Tests
+
+This module tests how retrieve_relevant_content picks the number of sources
+for the prompt: a score-gap (elbow) cutoff over an over-fetched candidate pool,
+capped by a token budget for the retrieved content.
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+from unittest import mock
+
+# Add the parent directory to the path so we can import the API modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from api import chat
+from api.chat import choose_k, select_sources, estimate_tokens
+
+
+def make_sources(scores, words=10):
+    return [{"id": i + 1, "content": "word " * words, "title": f"Section {i}", "url": f"pages/page.html#s{i}",
+             "relevance_score": score, "section_title": f"Section {i}"} for i, score in enumerate(scores)]
+
+
+class FakeSupabase:
+    """Returns canned match_course_content rows and records the RPC parameters."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def rpc(self, name, params):
+        self.params = params
+        return mock.Mock(execute=mock.Mock(return_value=mock.Mock(data=self.rows, error=None)))
+
+
+class TestChooseK(unittest.TestCase):
+    """Test suite for the score-gap cutoff."""
+
+    def test_clear_winner_keeps_one(self):
+        """A single strong match followed by a big drop keeps just that match."""
+        self.assertEqual(choose_k([0.82, 0.61, 0.60, 0.58], max_k=5), 1)
+
+    def test_elbow_after_several(self):
+        """The cut is at the largest drop, not the first one."""
+        self.assertEqual(choose_k([0.80, 0.78, 0.77, 0.60, 0.59], max_k=5), 3)
+
+    def test_flat_scores_keep_max_k(self):
+        """A broad question with no elbow gets max_k results."""
+        self.assertEqual(choose_k([0.70, 0.69, 0.67, 0.66, 0.65, 0.64, 0.63], max_k=5), 5)
+
+    def test_drop_after_max_k(self):
+        """A drop right after the max_k-th result keeps max_k."""
+        self.assertEqual(choose_k([0.80, 0.74, 0.73, 0.72, 0.71, 0.50], max_k=5), 5)
+
+    def test_few_candidates(self):
+        """With fewer than two candidates there is no gap to cut at."""
+        self.assertEqual(choose_k([], max_k=5), 0)
+        self.assertEqual(choose_k([0.9], max_k=5), 1)
+
+
+class TestSelectSources(unittest.TestCase):
+    """Test suite for the token budget."""
+
+    def test_token_budget_caps_sources(self):
+        """Sources are added best first until the next would exceed the budget."""
+        sources = make_sources([0.70, 0.69, 0.68, 0.67], words=100)  # 125 tokens each
+        selected, k, tokens = select_sources(sources, max_k=5, max_tokens=300)
+        self.assertEqual(k, 4)
+        self.assertEqual([source["id"] for source in selected], [1, 2])
+        self.assertEqual(tokens, 2 * estimate_tokens("word " * 100))
+
+    def test_best_source_always_kept(self):
+        """The best source is kept even if it alone exceeds the budget."""
+        selected, _, _ = select_sources(make_sources([0.9], words=1000), max_k=5, max_tokens=100)
+        self.assertEqual(len(selected), 1)
+
+
+class TestRetrieveRelevantContent(unittest.TestCase):
+    """Test suite for adaptive retrieval in retrieve_relevant_content."""
+
+    def test_over_fetches_once_and_cuts_at_elbow(self):
+        """One RPC fetches the candidate pool; only sources above the elbow reach the prompt."""
+        rows = [{"content": f"Content {i}", "title": f"T{i}", "url": f"pages/llm.html#s{i}", "similarity": score}
+                for i, score in enumerate([0.83, 0.81, 0.62, 0.61, 0.60, 0.58, 0.57, 0.55])]
+        supabase = FakeSupabase(rows)
+        with mock.patch.object(chat, "supabase", supabase), \
+                mock.patch.object(chat, "generate_embedding", return_value=[0.1, 0.2]):
+            sources = asyncio.run(chat.retrieve_relevant_content("What is an LLM?", compress=False))
+        self.assertEqual(supabase.params["match_count"], chat.RETRIEVAL_CANDIDATES)
+        self.assertEqual([source["title"] for source in sources], ["T0", "T1"])
+        self.assertEqual([source["id"] for source in sources], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Admission Control Tests
+
+This module tests the AdmissionController that bounds concurrent LLM calls and
+the queue waiting for them, and the 503 "busy" response of the chat handler.
+"""
+
+import unittest
+import asyncio
+import json
+import time
+import sys
+import os
+from unittest import mock
+
+# Add the parent directory to the path so we can import the API modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from api import chat
+from api.chat import AdmissionController
+
+
+class FakeRequest:
+    """Stands in for the FastAPI request of the chat handler."""
+
+    headers = {}
+
+    async def json(self):
+        return {"message": "What is an LLM?", "conversationSummary": "Summary so far."}
+
+
+class SlowMessages:
+    """Anthropic messages API stub that blocks for a fixed time, then fails."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def create(self, **kwargs):
+        time.sleep(self.seconds)
+        raise RuntimeError("stub")
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Test suite for the admission controller."""
+
+    def test_admits_up_to_limit_then_queues_fifo(self):
+        """Released slots go to waiters in arrival order."""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=2, max_queue=5, queue_timeout=1)
+            self.assertTrue(await controller.acquire())
+            self.assertTrue(await controller.acquire())
+            order = []
+
+            async def waiter(name):
+                self.assertTrue(await controller.acquire())
+                order.append(name)
+
+            tasks = [asyncio.create_task(waiter(name)) for name in ("first", "second")]
+            await asyncio.sleep(0)
+            self.assertEqual(controller.queue_depth, 2)
+            controller.release()
+            controller.release()
+            await asyncio.gather(*tasks)
+            self.assertEqual(order, ["first", "second"])
+            self.assertEqual(controller.in_flight, 2)
+            self.assertEqual(controller.admitted, 4)
+
+        asyncio.run(scenario())
+
+    def test_rejects_when_queue_full(self):
+        """A full queue rejects immediately instead of waiting."""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=10)
+            await controller.acquire()
+            queued = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            start = time.time()
+            self.assertTrue(controller.shed_early())
+            self.assertFalse(await controller.acquire())
+            self.assertLess(time.time() - start, 0.1)
+            self.assertEqual(controller.rejected["queue_full"], 2)
+            controller.release()
+            self.assertTrue(await queued)
+
+        asyncio.run(scenario())
+
+    def test_wait_deadline(self):
+        """A request that waits longer than the queue timeout is rejected."""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=0.05)
+            await controller.acquire()
+            self.assertFalse(await controller.acquire())
+            self.assertEqual(controller.rejected["timeout"], 1)
+            self.assertEqual(controller.queue_depth, 0)
+            # The timed-out waiter must not receive the slot
+            controller.release()
+            self.assertEqual(controller.in_flight, 0)
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_leaves_queue(self):
+        """A cancelled request (client disconnect) does not hold a place or a slot."""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=10)
+            await controller.acquire()
+            waiting = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertEqual(controller.queue_depth, 0)
+            controller.release()
+            self.assertEqual(controller.in_flight, 0)
+
+        asyncio.run(scenario())
+
+    def test_metrics(self):
+        """Metrics are exported in the Prometheus text format."""
+        controller = AdmissionController(max_concurrent=3, max_queue=4, queue_timeout=1)
+        controller.rejected["queue_full"] = 7
+        text = controller.metrics()
+        self.assertIn("chat_llm_queue_depth 0", text)
+        self.assertIn('chat_llm_rejected_total{reason="queue_full"} 7', text)
+        self.assertIn("chat_llm_max_concurrency 3", text)
+
+
+class TestBusyResponse(unittest.TestCase):
+    """Test suite for load shedding in the chat handler."""
+
+    def run_chat(self, controller, llm_seconds, requests):
+        """Run concurrent chat requests against a slow LLM stub."""
+        async def no_retrieval(*args, **kwargs):
+            return []
+
+        client = mock.Mock(messages=SlowMessages(llm_seconds))
+        with mock.patch.object(chat, "admission", controller), \
+                mock.patch.object(chat, "retrieve_relevant_content", no_retrieval), \
+                mock.patch.object(chat, "get_anthropic_client", return_value=client):
+            async def scenario():
+                return await asyncio.gather(*[chat.chat(FakeRequest()) for _ in range(requests)])
+            return asyncio.run(scenario())
+
+    def test_overload_returns_fast_503_with_retry_after(self):
+        """Requests beyond the slots and queue get a 503 ChatResponse with Retry-After."""
+        controller = AdmissionController(max_concurrent=2, max_queue=2, queue_timeout=5)
+        responses = self.run_chat(controller, llm_seconds=0.1, requests=8)
+
+        busy = [r for r in responses if getattr(r, "status_code", 200) == 503]
+        self.assertEqual(len(busy), 4)
+        self.assertEqual(busy[0].headers["Retry-After"], str(chat.LLM_RETRY_AFTER))
+        body = json.loads(busy[0].body)
+        self.assertIn("try again", body["answer"]["text"])
+        self.assertEqual(body["conversationSummary"], "Summary so far.")
+        self.assertEqual(controller.admitted, 4)
+        self.assertEqual(controller.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
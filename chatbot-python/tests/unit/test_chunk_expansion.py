@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Chunk Expansion Tests
+
+This module tests retrieval with CHUNK_EXPANSION: a single
+match_course_content_with_context RPC returns matched chunks with their parent
+and neighbouring continuation chunks, and merge_section_chunks joins them into
+one source per section.
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+from unittest import mock
+
+# Add the parent directory to the path so we can import the API modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from api import chat
+from api.chat import merge_section_chunks
+
+
+def chunk(section_id, chunk_index, similarity, matched=False, title="Agents"):
+    return {"id": f"{section_id}-{chunk_index}", "section_id": section_id, "chunk_index": chunk_index,
+            "title": title + (f" (part {chunk_index + 1})" if chunk_index else ""),
+            "content": f"{section_id} chunk {chunk_index}.", "url": f"pages/{section_id}.html#s",
+            "content_type": "section", "similarity": similarity, "matched": matched}
+
+
+class FakeSupabase:
+    """Returns canned RPC rows and records every RPC call."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return mock.Mock(execute=mock.Mock(return_value=mock.Mock(data=self.rows, error=None)))
+
+
+class TestMergeSectionChunks(unittest.TestCase):
+    """Test suite for merging a section's chunks into one source."""
+
+    def test_chunks_are_joined_in_order(self):
+        """Rows arrive best match first; the section reads in chunk order, from its parent."""
+        rows = [chunk("a", 2, 0.8, matched=True), chunk("a", 0, 0.8), chunk("a", 1, 0.8), chunk("a", 3, 0.8)]
+        merged = merge_section_chunks(rows)
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(merged[0]["content"], "a chunk 0.\n\na chunk 1.\n\na chunk 2.\n\na chunk 3.")
+        self.assertEqual(merged[0]["title"], "Agents")
+        self.assertEqual(merged[0]["url"], "pages/a.html#s")
+
+    def test_missing_chunks_are_marked(self):
+        """Chunks between the parent and the match's window are elided with an ellipsis."""
+        rows = [chunk("a", 5, 0.8, matched=True), chunk("a", 0, 0.8), chunk("a", 4, 0.8)]
+        self.assertEqual(merge_section_chunks(rows)[0]["content"], "a chunk 0.\n\n...\n\na chunk 4.\n\na chunk 5.")
+
+    def test_sections_scored_by_best_match(self):
+        """A section's score is its best matched chunk; sections come back best first."""
+        rows = [chunk("a", 0, 0.7, matched=True), chunk("a", 1, 0.7),
+                chunk("b", 0, 0.6, matched=True), chunk("b", 3, 0.9, matched=True), chunk("b", 2, 0.9)]
+        merged = merge_section_chunks(rows)
+        self.assertEqual([section["url"] for section in merged], ["pages/b.html#s", "pages/a.html#s"])
+        self.assertEqual([section["similarity"] for section in merged], [0.9, 0.7])
+
+
+class TestRetrievalWithExpansion(unittest.TestCase):
+    """Test suite for chunk expansion inside retrieve_relevant_content."""
+
+    def retrieve(self, rows, expand):
+        supabase = FakeSupabase(rows)
+        with mock.patch.object(chat, "supabase", supabase), \
+                mock.patch.object(chat, "generate_embedding", return_value=[0.1, 0.2]):
+            sources = asyncio.run(chat.retrieve_relevant_content("What is an agent?", compress=False,
+                                                                  expand=expand))
+        return supabase, sources
+
+    def test_one_rpc_returns_section_context(self):
+        """The expanded RPC is called once and each section becomes one source."""
+        rows = [chunk("a", 1, 0.82, matched=True), chunk("a", 0, 0.82), chunk("a", 2, 0.82),
+                chunk("b", 0, 0.80, matched=True, title="Memory")]
+        supabase, sources = self.retrieve(rows, expand=True)
+        self.assertEqual(len(supabase.calls), 1)
+        name, params = supabase.calls[0]
+        self.assertEqual(name, "match_course_content_with_context")
+        self.assertEqual(params["sibling_window"], chat.CHUNK_EXPANSION_WINDOW)
+        self.assertEqual([source["title"] for source in sources], ["Agents", "Memory"])
+        self.assertEqual(sources[0]["content"], "a chunk 0.\n\na chunk 1.\n\na chunk 2.")
+        self.assertEqual([source["id"] for source in sources], [1, 2])
+
+    def test_disabled_uses_plain_rpc(self):
+        """Without expansion, retrieval calls match_course_content as before."""
+        rows = [{"content": "Content", "title": "T0", "url": "pages/llm.html#s0", "similarity": 0.8}]
+        supabase, sources = self.retrieve(rows, expand=False)
+        self.assertEqual(supabase.calls[0][0], "match_course_content")
+        self.assertNotIn("sibling_window", supabase.calls[0][1])
+        self.assertEqual(sources[0]["content"], "Content")
+
+
+if __name__ == '__main__':
+    unittest.main()
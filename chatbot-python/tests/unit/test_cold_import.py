@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Cold Import Tests
+
+This module checks that the serverless entry points import quickly: the SDKs
+used by requests (openai, anthropic, supabase, tenacity, numpy) and utils/'s
+sentence_transformers must not be imported at module import time, and a cold `import api.chat` must stay within a time
+budget (COLD_IMPORT_BUDGET_MS, default 1500 ms).
+"""
+
+import unittest
+import subprocess
+import json
+import sys
+import os
+
+CHATBOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+COLD_IMPORT_BUDGET_MS = float(os.environ.get("COLD_IMPORT_BUDGET_MS", "1500"))
+LAZY_MODULES = ["openai", "anthropic", "supabase", "tenacity", "numpy", "sentence_transformers"]
+
+
+def cold_import(module):
+    """Import module in a fresh interpreter; returns (milliseconds, lazy modules loaded)."""
+    script = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = (time.perf_counter() - start) * 1000\n"
+        f"print(json.dumps([elapsed, [m for m in {LAZY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], cwd=CHATBOT_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+    return elapsed, loaded
+
+
+class TestColdImport(unittest.TestCase):
+    """Test suite for cold-start import cost of the API modules."""
+
+    def test_sdks_are_imported_lazily(self):
+        """Importing the API modules does not import the request SDKs."""
+        for module in ("api._shared", "api.chat", "api.search"):
+            _, loaded = cold_import(module)
+            self.assertEqual(loaded, [], f"{module} imports {loaded} at import time")
+
+    def test_chat_cold_import_within_budget(self):
+        """A cold import of api.chat stays within the budget (best of 3 runs)."""
+        elapsed = min(cold_import("api.chat")[0] for _ in range(3))
+        self.assertLessEqual(elapsed, COLD_IMPORT_BUDGET_MS,
+                             f"Cold import of api.chat took {elapsed:.0f} ms "
+                             f"(budget {COLD_IMPORT_BUDGET_MS:.0f} ms)")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Context Compression Tests
+
+This module tests the extractive compression of retrieved sections: sentence
+splitting, cosine scoring against the query embedding, neighbour windows within
+a token budget, preserved citation ids, and the sentence embedding cache.
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+import time
+from unittest import mock
+
+# Add the parent directory to the path so we can import the API modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from api import chat
+from api.chat import split_sentences, compress_context, estimate_tokens
+
+QUERY = [1.0, 0.0, 0.0]
+RELEVANT, RELATED, OFF_TOPIC = [0.9, 0.1, 0.0], [0.6, 0.8, 0.0], [0.0, 0.0, 1.0]
+
+
+def fake_embeddings(vectors):
+    """embed_sentences stand-in: vectors maps a sentence prefix to its embedding."""
+    def embed(sentences, timeout=None):
+        return [next(vector for prefix, vector in vectors.items() if sentence.startswith(prefix))
+                for sentence in sentences]
+    return embed
+
+
+def source(source_id, *sentences):
+    return {"id": source_id, "content": " ".join(sentences), "title": f"Source {source_id}",
+            "url": f"pages/llm.html#s{source_id}", "relevance_score": 0.8, "section_title": ""}
+
+
+class FakeEmbeddingsAPI:
+    """OpenAI client stub that records each batch of inputs."""
+
+    def __init__(self):
+        self.batches = []
+        self.embeddings = self
+
+    def create(self, model, input):
+        self.batches.append(list(input))
+        return mock.Mock(data=[mock.Mock(embedding=[float(len(text)), 1.0]) for text in input])
+
+
+class TestSplitSentences(unittest.TestCase):
+    """Test suite for sentence splitting of extracted section text."""
+
+    def test_splits_on_sentence_boundaries(self):
+        """Sentence-ending punctuation followed by a capital, digit or bracket splits."""
+        text = "LLMs predict tokens. They use transformers! Why? Because (mostly) attention works."
+        self.assertEqual(split_sentences(text), ["LLMs predict tokens.", "They use transformers!", "Why?",
+                                                 "Because (mostly) attention works."])
+
+    def test_keeps_abbreviations_and_numbers_together(self):
+        """Lower-case continuations and decimals are not sentence starts."""
+        self.assertEqual(split_sentences("Models e.g. transformers score 0.9 on it."),
+                         ["Models e.g. transformers score 0.9 on it."])
+
+
+class TestCompressContext(unittest.TestCase):
+    """Test suite for compress_context."""
+
+    def compress(self, sources, vectors, **options):
+        with mock.patch.object(chat, "embed_sentences", fake_embeddings(vectors)):
+            return compress_context(QUERY, sources, **options)
+
+    def test_keeps_best_sentences_with_neighbours(self):
+        """The most similar sentence is kept with one neighbour on each side, in order."""
+        sources = [source(1, "Off one.", "Off two.", "Neighbour before.", "Answer here.", "Neighbour after.",
+                          "Off three.")]
+        vectors = {"Off": OFF_TOPIC, "Neighbour": RELATED, "Answer": RELEVANT}
+        compressed = self.compress(sources, vectors, token_budget=15, neighbours=1)
+        self.assertEqual(compressed[0]["content"], "Neighbour before. Answer here. Neighbour after.")
+
+    def test_gaps_are_marked(self):
+        """Kept sentences that are not adjacent are joined with an ellipsis."""
+        sources = [source(1, "Answer one.", "Off one.", "Off two.", "Answer two.")]
+        vectors = {"Off": OFF_TOPIC, "Answer": RELEVANT}
+        compressed = self.compress(sources, vectors, token_budget=8, neighbours=0)
+        self.assertEqual(compressed[0]["content"], "Answer one. ... Answer two.")
+
+    def test_token_budget_and_citation_ids(self):
+        """The budget holds, each source keeps its best sentence and its citation id."""
+        sources = [source(1, "Answer one.", "Off " + "filler " * 40 + "end."),
+                   source(3, "Off " + "filler " * 40 + "end.", "Related point.")]
+        vectors = {"Off": OFF_TOPIC, "Answer": RELEVANT, "Related": RELATED}
+        compressed = self.compress(sources, vectors, token_budget=40, neighbours=1)
+        self.assertEqual([item["id"] for item in compressed], [1, 3])
+        self.assertEqual([item["content"] for item in compressed], ["Answer one.", "Related point."])
+        self.assertLessEqual(sum(estimate_tokens(item["content"]) for item in compressed), 40)
+        self.assertEqual(compressed[0]["url"], sources[0]["url"])
+
+    def test_source_without_room_is_dropped(self):
+        """With the budget spent, remaining sources are left out rather than renumbered."""
+        sources = [source(1, "Answer one."), source(2, "Off " + "filler " * 40 + "end.")]
+        compressed = self.compress(sources, {"Off": OFF_TOPIC, "Answer": RELEVANT}, token_budget=10)
+        self.assertEqual([item["id"] for item in compressed], [1])
+
+
+class TestSentenceEmbeddingCache(unittest.TestCase):
+    """Test suite for batched, cached sentence embeddings."""
+
+    def test_only_new_sentences_are_embedded_in_one_batch(self):
+        """Cached and repeated sentences are not sent again."""
+        api = FakeEmbeddingsAPI()
+        with mock.patch.object(chat, "get_openai_client", return_value=api), \
+                mock.patch.object(chat, "sentence_embeddings", chat.OrderedDict()):
+            first = chat.embed_sentences(["A.", "Bb.", "A."])
+            second = chat.embed_sentences(["Bb.", "Ccc."])
+        self.assertEqual(api.batches, [["A.", "Bb."], ["Ccc."]])
+        self.assertIs(first[0], first[2])
+        self.assertIs(second[0], first[1])
+
+    def test_cache_is_bounded(self):
+        """The least recently used sentences are evicted beyond SENTENCE_CACHE_SIZE."""
+        api = FakeEmbeddingsAPI()
+        with mock.patch.object(chat, "get_openai_client", return_value=api), \
+                mock.patch.object(chat, "sentence_embeddings", chat.OrderedDict()), \
+                mock.patch.object(chat, "SENTENCE_CACHE_SIZE", 2):
+            chat.embed_sentences(["A.", "B.", "C."])
+            self.assertEqual(list(chat.sentence_embeddings), ["B.", "C."])
+
+    def test_concurrent_eviction_does_not_lose_sentences(self):
+        """Sentences evicted by another request during the API call are still returned."""
+        api = FakeEmbeddingsAPI()
+        cache = chat.OrderedDict()
+        create = api.create
+
+        def create_then_evict(model, input):
+            cache.clear()  # Another request's eviction while this call is in flight
+            return create(model, input)
+
+        api.create = create_then_evict
+        with mock.patch.object(chat, "get_openai_client", return_value=api), \
+                mock.patch.object(chat, "sentence_embeddings", cache):
+            cached = chat.embed_sentences(["A."])[0]
+            vectors = chat.embed_sentences(["A.", "Bb."])
+        self.assertIs(vectors[0], cached)
+        self.assertEqual(len(vectors), 2)
+
+class TestRetrievalWithCompression(unittest.TestCase):
+    """Test suite for compression inside retrieve_relevant_content."""
+
+    def retrieve(self, embed, rows=None, deadline=None):
+        rows = rows or [{"content": "Off one. Answer here. Off two.", "title": "T0", "url": "pages/llm.html#s0",
+                         "similarity": 0.8}]
+        supabase = mock.Mock()
+        supabase.rpc.return_value.execute.return_value = mock.Mock(data=rows, error=None)
+
+        async def timed():
+            start = time.monotonic()
+            sources = await chat.retrieve_relevant_content("What is an LLM?", compress=True, deadline=deadline)
+            self.elapsed = time.monotonic() - start
+            return sources
+
+        with mock.patch.object(chat, "supabase", supabase), \
+                mock.patch.object(chat, "generate_embedding", return_value=QUERY), \
+                mock.patch.object(chat, "embed_sentences", embed):
+            return asyncio.run(timed())
+
+    def test_sources_are_compressed(self):
+        """Retrieved sections reach the prompt compressed, with their citation ids."""
+        sources = self.retrieve(fake_embeddings({"Off": OFF_TOPIC, "Answer": RELEVANT}))
+        self.assertEqual(sources[0]["id"], 1)
+        self.assertIn("Answer here.", sources[0]["content"])
+
+    def test_failure_sends_whole_sections(self):
+        """If the sentence embeddings fail, retrieval still returns the sections."""
+        def failing(sentences, timeout=None):
+            raise ConnectionError("connection reset")
+        sources = self.retrieve(failing)
+        self.assertEqual(sources[0]["content"], "Off one. Answer here. Off two.")
+
+    def test_failure_keeps_token_cap(self):
+        """Whole sections sent after a failure still fit in RETRIEVAL_MAX_TOKENS."""
+        def failing(sentences, timeout=None):
+            raise ConnectionError("connection reset")
+        rows = [{"content": "Long section. " * 300, "title": f"T{i}", "url": f"pages/llm.html#s{i}",
+                 "similarity": 0.8 - i * 0.01} for i in range(5)]  # ~1050 tokens each
+        with mock.patch.object(chat, "RETRIEVAL_MAX_TOKENS", 2000):
+            sources = self.retrieve(failing, rows)
+        self.assertEqual(len(sources), 1)
+
+    def test_slow_compression_falls_back_within_its_budget(self):
+        """A hanging sentence embedding call costs at most CONTEXT_COMPRESSION_TIMEOUT."""
+        def hanging(sentences, timeout=None):
+            time.sleep(1)
+            return {}
+        with mock.patch.object(chat, "CONTEXT_COMPRESSION_TIMEOUT", 0.1), \
+                mock.patch.object(chat, "CONTEXT_COMPRESSION_LLM_RESERVE", 1):
+            sources = self.retrieve(hanging, deadline=chat.Deadline(30))
+        self.assertLess(self.elapsed, 0.8)
+        self.assertEqual(sources[0]["content"], "Off one. Answer here. Off two.")
+
+    def test_skipped_when_time_is_reserved_for_llm(self):
+        """With less time left than the LLM reserve, compression is not attempted."""
+        embed = mock.Mock()
+        with mock.patch.object(chat, "CONTEXT_COMPRESSION_LLM_RESERVE", 10):
+            sources = self.retrieve(embed, deadline=chat.Deadline(5))
+        embed.assert_not_called()
+        self.assertEqual(sources[0]["content"], "Off one. Answer here. Off two.")
+
+
+if __name__ == '__main__':
+    unittest.main()
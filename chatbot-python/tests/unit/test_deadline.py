@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Request Deadline Tests
+
+This module tests that a chat request's deadline (X-Request-Deadline header or
+REQUEST_DEADLINE) is propagated to every stage: embedding retries stop when the
+budget is spent, slow Supabase RPCs, LLM queue waits and LLM calls are cut off,
+and the 504 response names the stage that timed out.
+"""
+
+import unittest
+import asyncio
+import json
+import time
+import sys
+import os
+from unittest import mock
+
+# Add the parent directory to the path so we can import the API modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from api import chat
+from api.chat import AdmissionController, CircuitBreaker, Deadline, DeadlineExceeded, LLMProvider, ProviderRouter
+
+
+class FakeRequest:
+    """Chat request with an optional X-Request-Deadline header."""
+
+    def __init__(self, deadline=None):
+        self.headers = {"x-request-deadline": deadline} if deadline else {}
+
+    async def json(self):
+        return {"message": "What is an LLM?", "conversationSummary": "Summary so far."}
+
+
+class FailingEmbeddings:
+    """OpenAI client stub whose embedding calls always fail."""
+
+    def __init__(self):
+        self.calls = []
+        self.embeddings = self
+
+    def with_options(self, **options):
+        self.options = options
+        return self
+
+    def create(self, model, input, timeout=None):
+        self.calls.append(timeout)
+        raise ConnectionError("connection reset")
+
+
+class SlowSupabase:
+    """Supabase client stub whose RPC takes `seconds` to return."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def rpc(self, name, params):
+        def execute():
+            time.sleep(self.seconds)
+            return mock.Mock(data=[], error=None)
+        return mock.Mock(execute=execute)
+
+
+class SlowProvider(LLMProvider):
+    """Provider that sleeps, then fails (or answers)."""
+
+    kind = "slow"
+
+    def __init__(self, model, latency, fail=False):
+        super().__init__(model)
+        self.latency = latency
+        self.fail = fail
+        self.timeouts = []
+
+    def generate(self, system_prompt, messages, response_schema, max_tokens, timeout):
+        self.timeouts.append(timeout)
+        time.sleep(self.latency)
+        if self.fail:
+            raise TimeoutError("request timed out")
+        return {"answer": {"text": "late answer"}, "followUpQuestions": [], "conversationSummary": ""}
+
+
+async def no_retrieval(*args, **kwargs):
+    return []
+
+
+def make_router(provider):
+    return ProviderRouter([provider], breaker_factory=lambda: CircuitBreaker(min_calls=1, max_p95_seconds=10.0))
+
+
+class TestDeadline(unittest.TestCase):
+    """Test suite for the Deadline budget and the header."""
+
+    def test_check_names_stage(self):
+        """check() returns the time left, then raises naming the stage."""
+        deadline = Deadline(0.05)
+        self.assertGreater(deadline.check("embedding"), 0)
+        time.sleep(0.06)
+        with self.assertRaises(DeadlineExceeded) as raised:
+            deadline.check("retrieval")
+        self.assertEqual(raised.exception.stage, "retrieval")
+
+    def test_header_overrides_config(self):
+        """The header sets the budget, capped at REQUEST_DEADLINE_MAX; invalid values are ignored."""
+        self.assertEqual(chat.request_deadline(FakeRequest("3.5")).seconds, 3.5)
+        self.assertEqual(chat.request_deadline(FakeRequest("9999")).seconds, chat.REQUEST_DEADLINE_MAX)
+        self.assertEqual(chat.request_deadline(FakeRequest("soon")).seconds, chat.REQUEST_DEADLINE)
+        self.assertEqual(chat.request_deadline(FakeRequest()).seconds, chat.REQUEST_DEADLINE)
+
+
+class TestStageBudgets(unittest.TestCase):
+    """Test suite for each stage getting only the remaining budget."""
+
+    def test_embedding_retries_stop_at_deadline(self):
+        """No backoff is slept that would outlast the deadline, and attempts get the remaining time."""
+        client = FailingEmbeddings()
+        with mock.patch.object(chat, "get_openai_client", return_value=client):
+            start = time.time()
+            with self.assertRaises(DeadlineExceeded) as raised:
+                chat.generate_embedding("question", Deadline(0.5))
+        self.assertEqual(raised.exception.stage, "embedding")
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(len(client.calls), 1)
+        self.assertLessEqual(client.calls[0], 0.5)
+        # The SDK's own retries would not respect the deadline
+        self.assertEqual(client.options, {"max_retries": 0})
+
+    def test_slow_embedding_does_not_block_the_loop(self):
+        """The embedding runs in a thread, so other requests keep running, and is cut off at the deadline."""
+        def slow_embedding(text, deadline=None):
+            time.sleep(0.5)
+            return [0.1]
+
+        async def scenario():
+            ticks = []
+
+            async def other_request():
+                while True:
+                    ticks.append(time.time())
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(other_request())
+            start = time.time()
+            response = await chat.chat(FakeRequest("0.2"))
+            elapsed = time.time() - start
+            task.cancel()
+            return response, elapsed, len(ticks)
+
+        with mock.patch.object(chat, "generate_embedding", slow_embedding), \
+                mock.patch.object(chat, "supabase", SlowSupabase(0)):
+            response, elapsed, ticks = asyncio.run(scenario())
+        self.assertLess(elapsed, 0.45)
+        self.assertEqual(response.headers["X-Deadline-Exceeded"], "embedding")
+        self.assertGreater(ticks, 5)
+
+    def test_slow_rpc_times_out_as_retrieval(self):
+        """A slow RPC is abandoned at the deadline and the 504 response names retrieval."""
+        embeddings = mock.Mock()
+        embeddings.with_options.return_value = embeddings
+        embeddings.embeddings.create.return_value = mock.Mock(data=[mock.Mock(embedding=[0.1])])
+        with mock.patch.object(chat, "get_openai_client", return_value=embeddings), \
+                mock.patch.object(chat, "supabase", SlowSupabase(0.5)):
+            async def scenario():
+                # Timed inside the loop: asyncio.run() waits for the abandoned RPC thread
+                start = time.time()
+                return await chat.chat(FakeRequest("0.2")), time.time() - start
+            response, elapsed = asyncio.run(scenario())
+        self.assertLess(elapsed, 0.45)
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.headers["X-Deadline-Exceeded"], "retrieval")
+        body = json.loads(response.body)
+        self.assertEqual(body["timedOutStage"], "retrieval")
+        self.assertIn("course content search", body["answer"]["text"])
+        self.assertEqual(body["conversationSummary"], "Summary so far.")
+
+    def test_queue_wait_limited_by_deadline(self):
+        """A request waiting for an LLM slot gives up at its deadline, not the queue timeout."""
+        controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=5)
+        router = make_router(SlowProvider("model", latency=0))
+
+        async def scenario():
+            await controller.acquire()
+            return await chat.chat(FakeRequest("0.1"))
+
+        with mock.patch.object(chat, "admission", controller), mock.patch.object(chat, "router", router), \
+                mock.patch.object(chat, "retrieve_relevant_content", no_retrieval):
+            start = time.time()
+            response = asyncio.run(scenario())
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(response.headers["X-Deadline-Exceeded"], "queue")
+        # Running out of time is not load shedding
+        self.assertEqual(controller.rejected["timeout"], 0)
+
+    def test_slow_llm_times_out_as_llm(self):
+        """The LLM call gets the remaining time as its timeout and is cut off at the deadline."""
+        provider = SlowProvider("model", latency=0.5)
+        with mock.patch.object(chat, "router", make_router(provider)), \
+                mock.patch.object(chat, "retrieve_relevant_content", no_retrieval):
+            start = time.time()
+            response = asyncio.run(chat.chat(FakeRequest("0.2")))
+        self.assertLess(time.time() - start, 0.45)
+        self.assertEqual(json.loads(response.body)["timedOutStage"], "llm")
+        self.assertLessEqual(provider.timeouts[0], 0.2)
+
+    def test_abandoned_llm_call_keeps_its_slot(self):
+        """A timed-out LLM call still running in its thread holds its slot until it returns."""
+        controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=5)
+        router = make_router(SlowProvider("model", latency=0.3))
+
+        async def scenario():
+            response = await chat.chat(FakeRequest("0.1"))
+            in_flight = controller.in_flight
+            await asyncio.sleep(0.4)
+            return response, in_flight, controller.in_flight
+
+        with mock.patch.object(chat, "admission", controller), mock.patch.object(chat, "router", router), \
+                mock.patch.object(chat, "retrieve_relevant_content", no_retrieval):
+            response, during, after = asyncio.run(scenario())
+        self.assertEqual(response.headers["X-Deadline-Exceeded"], "llm")
+        self.assertEqual((during, after), (1, 0))
+
+    def test_call_cut_short_by_deadline_does_not_trip_breaker(self):
+        """A provider that fails because the request ran out of time is not blamed for it."""
+        provider = SlowProvider("model", latency=0.06, fail=True)
+        router = make_router(provider)
+        with self.assertRaises(DeadlineExceeded) as raised:
+            router.generate("system", [], {}, timeout=30, deadline=Deadline(0.05))
+        self.assertEqual(raised.exception.stage, "llm")
+        self.assertEqual(router.breakers["slow:model"].calls, 0)
+        self.assertEqual(router.breakers["slow:model"].state, CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
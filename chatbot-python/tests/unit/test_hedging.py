@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Hedged Embedding Request Tests
+
+This module tests the EmbeddingHedger used by generate_embedding: a second
+request is sent once the first is slower than the configured percentile of
+recent latency, the first result wins, hedges stay within their budget, and
+the fired/won counters are exported.
+"""
+
+import unittest
+import asyncio
+import threading
+import time
+import sys
+import os
+from unittest import mock
+
+# Add the parent directory to the path so we can import the API modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from api import chat, search
+from api._shared import EmbeddingHedger
+
+
+class ScriptedCall:
+    """Blocking call whose n-th invocation sleeps latencies[n] (last value repeats), then returns n."""
+
+    def __init__(self, latencies, failures=()):
+        self.latencies = latencies
+        self.failures = failures
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            n = self.count
+            self.count += 1
+        time.sleep(self.latencies[min(n, len(self.latencies) - 1)])
+        if n in self.failures:
+            raise ConnectionError(f"call {n} failed")
+        return n
+
+
+def primed_hedger(**options):
+    """Hedger that has seen 10 calls of 10 ms."""
+    hedger = EmbeddingHedger(min_samples=10, **options)
+    hedger.latencies.extend([0.01] * 10)
+    hedger.calls = 10
+    return hedger
+
+
+class TestEmbeddingHedger(unittest.TestCase):
+    """Test suite for hedged requests."""
+
+    def test_no_hedge_before_min_samples(self):
+        """Without enough latency samples there is no hedge delay."""
+        hedger = EmbeddingHedger(min_samples=5)
+        call = ScriptedCall([0.05])
+        self.assertEqual(hedger.call(call), 0)
+        self.assertIsNone(hedger.hedge_delay())
+        self.assertEqual((hedger.calls, hedger.fired), (1, 0))
+
+    def test_fast_call_is_not_hedged(self):
+        """A call that finishes within the percentile latency sends one request."""
+        hedger = primed_hedger()
+        call = ScriptedCall([0.0])
+        self.assertEqual(hedger.call(call), 0)
+        self.assertEqual(call.count, 1)
+        self.assertEqual(hedger.fired, 0)
+
+    def test_slow_call_is_hedged_and_hedge_wins(self):
+        """A tail-latency call is overtaken by the hedge."""
+        hedger = primed_hedger(budget=0.5)
+        call = ScriptedCall([0.5, 0.0])
+        start = time.time()
+        self.assertEqual(hedger.call(call), 1)
+        self.assertLess(time.time() - start, 0.25)
+        self.assertEqual((hedger.fired, hedger.won), (1, 1))
+
+    def test_original_can_still_win(self):
+        """If the original call finishes first after the hedge was sent, it wins."""
+        hedger = primed_hedger(budget=0.5)
+        self.assertEqual(hedger.call(ScriptedCall([0.05, 0.5])), 0)
+        self.assertEqual((hedger.fired, hedger.won), (1, 0))
+
+    def test_budget_caps_hedges(self):
+        """Hedges stop once they reach the budget fraction of calls."""
+        hedger = primed_hedger(budget=0.1)
+        for _ in range(3):
+            hedger.call(ScriptedCall([0.05, 0.0]))
+        # 11 calls allow one hedge, 12 and 13 calls still only one
+        self.assertEqual(hedger.calls, 13)
+        self.assertEqual(hedger.fired, 1)
+
+    def test_failed_call_falls_back_to_other(self):
+        """The first successful result wins; an error only surfaces if both fail."""
+        hedger = primed_hedger(budget=1.0)
+        self.assertEqual(hedger.call(ScriptedCall([0.05, 0.1], failures={0})), 1)
+        with self.assertRaisesRegex(ConnectionError, "call 0 failed"):
+            hedger.call(ScriptedCall([0.05, 0.0], failures={0, 1}))
+
+    def test_metrics(self):
+        """Fired and won hedges are exported in the Prometheus text format."""
+        hedger = primed_hedger(budget=0.5)
+        hedger.call(ScriptedCall([0.5, 0.0]))
+        text = hedger.metrics("chat")
+        self.assertIn("chat_embedding_hedges_fired_total 1", text)
+        self.assertIn("chat_embedding_hedges_won_total 1", text)
+        self.assertIn("chat_embedding_calls_total 11", text)
+
+
+class TestHedgedGenerateEmbedding(unittest.TestCase):
+    """Test suite for hedging inside generate_embedding."""
+
+    def test_chat_and_search_use_hedger(self):
+        """With hedging enabled, the embedding call goes through the hedger."""
+        client = mock.Mock()
+        client.embeddings.create.return_value = mock.Mock(data=[mock.Mock(embedding=[0.1, 0.2])])
+        for module in (chat, search):
+            hedger = EmbeddingHedger()
+            with mock.patch.object(module, "embedding_hedger", hedger), \
+                    mock.patch.object(module, "get_openai_client", return_value=client):
+                self.assertEqual(module.generate_embedding("question"), [0.1, 0.2])
+            self.assertEqual(hedger.calls, 1)
+            self.assertEqual(len(hedger.latencies), 1)
+
+    def test_search_waits_for_embedding_off_the_event_loop(self):
+        """The hedger blocks while it waits, so the search handler runs it in a thread."""
+        class FakeRequest:
+            async def json(self):
+                return {"query": "What is an LLM?"}
+
+        def slow_embedding(text):
+            time.sleep(0.2)
+            return [0.1, 0.2]
+
+        supabase = mock.Mock()
+        supabase.rpc.return_value.execute.return_value = mock.Mock(data=[], error=None)
+
+        async def scenario():
+            ticks = []
+
+            async def other_request():
+                while True:
+                    ticks.append(time.time())
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(other_request())
+            result = await search.search(FakeRequest())
+            task.cancel()
+            return result, len(ticks)
+
+        with mock.patch.object(search, "generate_embedding", slow_embedding), \
+                mock.patch.object(search, "supabase", supabase):
+            result, ticks = asyncio.run(scenario())
+        self.assertEqual(result["count"], 0)
+        self.assertGreater(ticks, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
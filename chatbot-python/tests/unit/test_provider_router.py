@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+LLM Provider Router Tests
+
+This module tests the circuit breakers and failover of the ProviderRouter with
+local stub providers that inject latency and errors, and the OpenAI provider's
+structured-output contract against a fake client.
+"""
+
+import unittest
+import asyncio
+import json
+import time
+import sys
+import os
+from unittest import mock
+
+# Add the parent directory to the path so we can import the API modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from api import chat
+from api.chat import CircuitBreaker, LLMProvider, OpenAIProvider, ProviderRouter, AllProvidersFailed
+
+STRUCTURED_RESPONSE = {
+    "answer": {"text": "LLMs are language models [1]."},
+    "followUpQuestions": ["What is a transformer?"],
+    "conversationSummary": "The student asked about LLMs."
+}
+
+
+class StubProvider(LLMProvider):
+    """
+    Local provider that injects latency and errors
+
+    failures: number of leading calls that fail (or "always"); latency: seconds
+    each call sleeps before answering.
+    """
+
+    kind = "stub"
+
+    def __init__(self, model, failures=0, latency=0.0, error="overloaded_error (529)"):
+        super().__init__(model)
+        self.failures = failures
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+
+    def generate(self, system_prompt, messages, response_schema, max_tokens, timeout):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.failures == "always" or self.calls <= self.failures:
+            raise RuntimeError(self.error)
+        return dict(STRUCTURED_RESPONSE, answer={"text": f"Answer from {self.model}"})
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_router(*providers, clock=None, **breaker_options):
+    options = dict(window=10, min_calls=4, max_error_rate=0.5, max_p95_seconds=1.0, cooldown=30.0)
+    options.update(breaker_options)
+    if clock:
+        options["clock"] = clock
+    return ProviderRouter(list(providers), breaker_factory=lambda: CircuitBreaker(**options))
+
+
+class TestProviderRouter(unittest.TestCase):
+    """Test suite for failover and circuit breaking."""
+
+    def generate(self, router):
+        return router.generate("system", [{"role": "user", "content": "hi"}], {}, max_tokens=100, timeout=1)
+
+    def test_primary_answers_when_healthy(self):
+        """The first provider handles requests while it succeeds."""
+        primary, secondary = StubProvider("primary"), StubProvider("secondary")
+        name, result = self.generate(make_router(primary, secondary))
+        self.assertEqual(name, "stub:primary")
+        self.assertEqual(result["answer"]["text"], "Answer from primary")
+        self.assertEqual(secondary.calls, 0)
+
+    def test_fails_over_on_error(self):
+        """A failing call is retried on the next provider."""
+        primary, secondary = StubProvider("primary", failures=1), StubProvider("secondary")
+        name, _ = self.generate(make_router(primary, secondary))
+        self.assertEqual(name, "stub:secondary")
+        self.assertEqual(primary.calls, 1)
+
+    def test_error_rate_opens_circuit(self):
+        """After enough failures the primary is skipped without being called."""
+        primary, secondary = StubProvider("primary", failures="always"), StubProvider("secondary")
+        router = make_router(primary, secondary)
+        for _ in range(4):
+            self.generate(router)
+        self.assertEqual(router.breakers["stub:primary"].state, CircuitBreaker.OPEN)
+        self.generate(router)
+        self.assertEqual(primary.calls, 4)
+        self.assertEqual(secondary.calls, 5)
+
+    def test_p95_latency_opens_circuit(self):
+        """A slow provider is taken out of rotation even if it succeeds."""
+        primary, secondary = StubProvider("primary", latency=0.02), StubProvider("secondary")
+        router = make_router(primary, secondary, max_p95_seconds=0.01)
+        for _ in range(4):
+            self.assertEqual(self.generate(router)[0], "stub:primary")
+        self.assertEqual(router.breakers["stub:primary"].state, CircuitBreaker.OPEN)
+        self.assertEqual(self.generate(router)[0], "stub:secondary")
+
+    def test_half_open_trial_closes_circuit(self):
+        """After the cooldown one trial call is allowed; success closes the circuit."""
+        clock = FakeClock()
+        primary, secondary = StubProvider("primary", failures=4), StubProvider("secondary")
+        router = make_router(primary, secondary, clock=clock)
+        for _ in range(4):
+            self.generate(router)
+        self.assertEqual(router.breakers["stub:primary"].state, CircuitBreaker.OPEN)
+
+        clock.now += 29
+        self.assertEqual(self.generate(router)[0], "stub:secondary")
+        clock.now += 1
+        self.assertEqual(self.generate(router)[0], "stub:primary")
+        self.assertEqual(router.breakers["stub:primary"].state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens_circuit(self):
+        """A failed half-open trial opens the circuit for another cooldown."""
+        clock = FakeClock()
+        primary, secondary = StubProvider("primary", failures="always"), StubProvider("secondary")
+        router = make_router(primary, secondary, clock=clock)
+        for _ in range(4):
+            self.generate(router)
+        clock.now += 30
+        self.generate(router)
+        breaker = router.breakers["stub:primary"]
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.opened, 2)
+        self.assertEqual(primary.calls, 5)
+
+    def test_all_providers_failed(self):
+        """When every provider fails, the errors of all of them are reported."""
+        router = make_router(StubProvider("a", failures="always"), StubProvider("b", failures="always", error="timeout"))
+        with self.assertRaises(AllProvidersFailed) as raised:
+            self.generate(router)
+        self.assertIn("stub:a: overloaded_error (529)", str(raised.exception))
+        self.assertIn("stub:b: timeout", str(raised.exception))
+
+    def test_metrics(self):
+        """Breaker state and counters are exported per provider."""
+        router = make_router(StubProvider("primary", failures=1), StubProvider("secondary"))
+        self.generate(router)
+        text = router.metrics()
+        self.assertIn('chat_llm_provider_state{provider="stub:primary"} 0', text)
+        self.assertIn('chat_llm_provider_failures_total{provider="stub:primary"} 1', text)
+        self.assertIn('chat_llm_provider_calls_total{provider="stub:secondary"} 1', text)
+
+
+class TestOpenAIProvider(unittest.TestCase):
+    """Test suite for the OpenAI structured-output contract."""
+
+    def fake_client(self, arguments, name="response_formatter"):
+        tool_call = mock.Mock()
+        tool_call.function.name = name
+        tool_call.function.arguments = arguments
+        message = mock.Mock(tool_calls=[tool_call])
+        client = mock.Mock()
+        client.chat.completions.create.return_value = mock.Mock(choices=[mock.Mock(message=message)])
+        return client
+
+    def test_parses_function_arguments(self):
+        """The forced function call's JSON arguments become the structured response."""
+        client = self.fake_client(json.dumps(STRUCTURED_RESPONSE))
+        with mock.patch.object(chat, "get_openai_client", return_value=client):
+            result = OpenAIProvider("gpt-4o-mini").generate("system", [{"role": "user", "content": "hi"}],
+                                                           {"type": "object"}, 100, 5)
+        self.assertEqual(result, STRUCTURED_RESPONSE)
+        kwargs = client.chat.completions.create.call_args.kwargs
+        self.assertEqual(kwargs["messages"][0], {"role": "system", "content": "system"})
+        self.assertEqual(kwargs["tool_choice"]["function"]["name"], "response_formatter")
+        self.assertEqual(kwargs["tools"][0]["function"]["parameters"], {"type": "object"})
+
+    def test_invalid_arguments_raise(self):
+        """A response that breaks the contract fails the call (so the router fails over)."""
+        with mock.patch.object(chat, "get_openai_client", return_value=self.fake_client("not json")):
+            with self.assertRaises(ValueError):
+                OpenAIProvider("gpt-4o-mini").generate("system", [], {}, 100, 5)
+
+
+class TestChatFailover(unittest.TestCase):
+    """Test suite for the chat handler with a failing primary provider."""
+
+    def test_chat_answers_from_secondary(self):
+        """The student gets the secondary model's answer, not the fallback response."""
+        class FakeRequest:
+            headers = {}
+
+            async def json(self):
+                return {"message": "What is an LLM?"}
+
+        async def no_retrieval(*args, **kwargs):
+            return []
+
+        router = make_router(StubProvider("primary", failures="always"), StubProvider("secondary"))
+        with mock.patch.object(chat, "router", router), \
+                mock.patch.object(chat, "retrieve_relevant_content", no_retrieval):
+            response = asyncio.run(chat.chat(FakeRequest()))
+        self.assertEqual(response["answer"]["text"], "Answer from secondary")
+        self.assertEqual(response["followUpQuestions"], ["What is a transformer?"])
+
+
+if __name__ == '__main__':
+    unittest.main()
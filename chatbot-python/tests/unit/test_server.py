@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Server Startup Tests
+
+This module tests the production launch options of server.py and that the root
+app initializes the mounted sub-apps' clients at startup.
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+from unittest import mock
+
+# Add the parent directory to the path so we can import the server module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+import server
+from api import _shared, chat, search
+from fastapi import Response
+
+
+class FakeEmbeddings:
+    """Stands in for client.embeddings of the OpenAI SDK."""
+
+    def create(self, model, input, timeout=None):
+        return mock.Mock(data=[mock.Mock(embedding=[0.1, 0.2, 0.3])])
+
+
+class FakeSupabase:
+    """Records RPC calls; fails them when error is set."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        if self.error:
+            raise self.error
+        return mock.Mock(execute=mock.Mock(return_value=mock.Mock(data=[], error=None)))
+
+
+class CanaryProvider(chat.LLMProvider):
+    """LLM provider whose warmup canary succeeds or fails."""
+
+    kind = "fake"
+
+    def __init__(self, model, error=None):
+        super().__init__(model)
+        self.error = error
+
+    def canary(self, timeout):
+        if self.error:
+            raise self.error
+
+
+class TestProductionOptions(unittest.TestCase):
+    """Test suite for the production uvicorn options."""
+
+    def test_no_reload_and_worker_count(self):
+        """Production mode never reloads and uses the requested workers."""
+        options = server.production_options(workers=3)
+        self.assertFalse(options["reload"])
+        self.assertEqual(options["workers"], 3)
+        self.assertEqual(options["timeout_keep_alive"], server.KEEP_ALIVE_TIMEOUT)
+        self.assertEqual(options["timeout_graceful_shutdown"], server.GRACEFUL_SHUTDOWN_TIMEOUT)
+
+    def test_default_workers(self):
+        """Without --workers, WEB_CONCURRENCY or the CPU count decides."""
+        with mock.patch.object(server, "WEB_CONCURRENCY", "5"):
+            self.assertEqual(server.production_options()["workers"], 5)
+        with mock.patch.object(server, "WEB_CONCURRENCY", None), mock.patch("os.cpu_count", return_value=2):
+            self.assertEqual(server.production_options()["workers"], 2)
+
+    def test_falls_back_without_uvloop_and_httptools(self):
+        """asyncio and h11 are used when the C implementations are missing."""
+        with mock.patch("importlib.util.find_spec", return_value=None):
+            options = server.production_options(workers=1)
+        self.assertEqual(options["loop"], "asyncio")
+        self.assertEqual(options["http"], "h11")
+
+
+class TestStartup(unittest.TestCase):
+    """Test suite for eager client initialization at startup."""
+
+    def test_startup_initializes_sub_app_clients(self):
+        """The root app runs the mounted apps' startup handlers."""
+        fake_client = object()
+        with mock.patch.object(chat, "supabase", None), mock.patch.object(search, "supabase", None), \
+                mock.patch.object(chat, "create_client", return_value=fake_client), \
+                mock.patch.object(search, "create_client", return_value=fake_client), \
+                mock.patch.object(chat, "WARMUP_ON_STARTUP", False), mock.patch.object(search, "WARMUP_ON_STARTUP", False):
+            asyncio.run(server.startup())
+            self.assertIs(chat.supabase, fake_client)
+            self.assertIs(search.supabase, fake_client)
+
+    def test_self_check_reports_missing_clients(self):
+        """Clients that failed to initialize fail the self-check."""
+        with mock.patch.object(chat, "supabase", None), mock.patch.object(search, "supabase", object()):
+            checks = server.self_check()
+        self.assertFalse(checks["chat Supabase client"][0])
+        self.assertTrue(checks["search Supabase client"][0])
+
+    def test_self_check_needs_a_provider_not_anthropic(self):
+        """An OpenAI-only LLM_PROVIDERS passes; no configured provider fails."""
+        with mock.patch.object(chat, "router", chat.ProviderRouter([CanaryProvider("secondary")])):
+            checks = server.self_check()
+        self.assertNotIn("ANTHROPIC_API_KEY", checks)
+        self.assertTrue(checks["LLM providers"][0])
+        with mock.patch.object(chat, "router", chat.ProviderRouter([])):
+            self.assertFalse(server.self_check()["LLM providers"][0])
+
+
+
+class TestWarmupAndReadiness(unittest.TestCase):
+    """Test suite for the startup warmup canaries and the health endpoints."""
+
+    def warm_up(self, supabase, providers=None):
+        """Run both warmups against fake clients; returns the readiness response."""
+        if providers is None:
+            providers = [CanaryProvider("primary"), CanaryProvider("secondary")]
+        openai_client = mock.Mock(embeddings=FakeEmbeddings())
+        patches = [
+            mock.patch.object(_shared, "openai_client", openai_client),
+            mock.patch.object(chat, "supabase", supabase),
+            mock.patch.object(search, "supabase", supabase),
+            mock.patch.object(chat, "router", chat.ProviderRouter(providers)),
+            mock.patch.object(chat, "warmup_status", {}),
+            mock.patch.object(search, "warmup_status", {}),
+            mock.patch.object(chat, "OPENAI_API_KEY", "key"),
+            mock.patch.object(chat, "SUPABASE_URL", "url"),
+            mock.patch.object(chat, "SUPABASE_KEY", "key"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        asyncio.run(chat.warmup())
+        asyncio.run(search.warmup())
+        response = Response()
+        return response, server.readiness(response)
+
+    def test_ready_after_successful_canaries(self):
+        """Every dependency passes its canary, so the worker is ready."""
+        supabase = FakeSupabase()
+        response, body = self.warm_up(supabase)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body["status"], "ready")
+        self.assertEqual(set(body["apps"]["chat"]["dependencies"]),
+                         {"openai", "supabase", "fake:primary", "fake:secondary"})
+        self.assertIsNotNone(body["apps"]["search"]["warmup_latency_ms"])
+        # The canary RPC searches with the canary embedding
+        self.assertEqual(supabase.calls[0][0], "match_course_content")
+        self.assertEqual(supabase.calls[0][1]["query_embedding"], [0.1, 0.2, 0.3])
+
+    def test_not_ready_when_a_canary_fails(self):
+        """A failing dependency makes readiness return 503 with its error."""
+        response, body = self.warm_up(FakeSupabase(error=ConnectionError("connection refused")))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(body["status"], "not ready")
+        status = body["apps"]["chat"]["dependencies"]["supabase"]
+        self.assertFalse(status["ok"])
+        self.assertIn("connection refused", status["error"])
+
+    def test_ready_with_one_llm_provider_down(self):
+        """The router fails over, so one LLM provider with a good canary is enough."""
+        providers = [CanaryProvider("primary", error=ConnectionError("overloaded")), CanaryProvider("secondary")]
+        response, body = self.warm_up(FakeSupabase(), providers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body["apps"]["chat"]["llm_providers_ready"], ["fake:secondary"])
+        self.assertFalse(body["apps"]["chat"]["dependencies"]["fake:primary"]["ok"])
+
+    def test_not_ready_when_every_llm_provider_fails(self):
+        """Without a reachable LLM provider the worker is not ready."""
+        providers = [CanaryProvider("primary", error=ConnectionError("overloaded"))]
+        response, body = self.warm_up(FakeSupabase(), providers)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(body["apps"]["chat"]["llm_providers_ready"], [])
+
+    def test_liveness(self):
+        """Liveness does not depend on the warmup."""
+        self.assertEqual(server.liveness()["status"], "alive")
+
+
+if __name__ == '__main__':
+    unittest.main()
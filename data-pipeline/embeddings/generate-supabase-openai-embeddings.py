@@ -141,11 +141,18 @@ class SupabaseClient:
                 part_id TEXT,
                 module_id TEXT,
                 parent_id UUID,
+                chunk_index INT DEFAULT 0,
                 importance REAL DEFAULT 0.7,
                 embedding VECTOR(1536)
             );
             """,
             
+            # Position of a chunk within its section (tables created before it was added)
+            """
+            ALTER TABLE course_content ADD COLUMN IF NOT EXISTS chunk_index INT DEFAULT 0;
+            CREATE INDEX IF NOT EXISTS course_content_parent_id_idx ON course_content (parent_id);
+            """,
+            
             # Links table
             """
             CREATE TABLE IF NOT EXISTS content_links (
@@ -190,6 +197,70 @@ class SupabaseClient:
                 LIMIT match_count;
             END;
             $$;
+            """,
+            
+            # Similarity search returning each match with its parent and neighbouring continuation chunks
+            """
+            CREATE OR REPLACE FUNCTION match_course_content_with_context(
+                query_embedding VECTOR(1536),
+                match_threshold FLOAT DEFAULT 0.5,
+                match_count INT DEFAULT 5,
+                sibling_window INT DEFAULT 1
+            )
+            RETURNS TABLE (
+                id UUID,
+                title TEXT,
+                content TEXT,
+                url TEXT,
+                content_type TEXT,
+                similarity FLOAT,
+                section_id UUID,
+                chunk_index INT,
+                matched BOOLEAN
+            )
+            LANGUAGE plpgsql
+            AS $$
+            BEGIN
+                RETURN QUERY
+                WITH matches AS (
+                    SELECT
+                        cc.id AS match_id,
+                        COALESCE(cc.parent_id, cc.id) AS match_section_id,
+                        cc.chunk_index AS match_chunk_index,
+                        1 - (cc.embedding <=> query_embedding) AS match_similarity
+                    FROM course_content cc
+                    WHERE 1 - (cc.embedding <=> query_embedding) > match_threshold
+                    ORDER BY cc.embedding <=> query_embedding
+                    LIMIT match_count
+                ),
+                context AS (
+                    -- A chunk next to several matches is returned once, for its best match
+                    SELECT DISTINCT ON (cc.id)
+                        cc.id AS context_id,
+                        m.match_section_id,
+                        m.match_similarity,
+                        cc.id = m.match_id AS is_match
+                    FROM matches m
+                    JOIN course_content cc
+                        ON COALESCE(cc.parent_id, cc.id) = m.match_section_id
+                        AND (cc.parent_id IS NULL OR abs(cc.chunk_index - m.match_chunk_index) <= sibling_window)
+                    ORDER BY cc.id, cc.id = m.match_id DESC, m.match_similarity DESC
+                )
+                SELECT
+                    cc.id,
+                    cc.title,
+                    cc.content,
+                    cc.url,
+                    cc.content_type,
+                    ctx.match_similarity,
+                    ctx.match_section_id,
+                    cc.chunk_index,
+                    ctx.is_match
+                FROM context ctx
+                JOIN course_content cc ON cc.id = ctx.context_id
+                ORDER BY ctx.match_similarity DESC, ctx.match_section_id, cc.chunk_index;
+            END;
+            $$;
             """
         ]
         
@@ -357,15 +428,40 @@ def chunk_text(text: str, max_tokens: int = MAX_TOKENS) -> List[str]:
         
     return chunks
 
+def iter_sections(input_file: Path):
+    """
+    Stream (page, section) pairs from structured content.
+    
+    Supports both outputs of extract-structured-content.py: .jsonl files
+    ({"metadata"}, {"page"} and {"section"} records, one per line) are read
+    line by line so memory stays flat as the course grows; monolithic .json
+    files are loaded in one go for compatibility.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        if input_file.suffix == ".jsonl":
+            page = {}
+            for line in f:
+                if not line.strip():
+                    continue
+                (record_type, record), = json.loads(line).items()
+                if record_type == "page":
+                    page = record
+                elif record_type == "section":
+                    yield page, record
+        else:
+            data = json.load(f)
+            for page in data.get("pages", []):
+                for section in page.get("sections", []):
+                    yield page, section
+
 def process_structured_content(input_file: Path, embedding_generator: OpenAIEmbeddingGenerator, supabase: SupabaseClient, setup_db: bool = False, clear_data: bool = False):
-    """Process structured content, generate embeddings, and store in Supabase."""
-    # Read input file
+    """
+    Process structured content, generate embeddings, and store in Supabase.
+    
+    Sections are streamed from the input file and embedded/stored in batches,
+    so only one batch of chunks is held in memory at a time.
+    """
     print(f"Reading structured content from {input_file}")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        
-    pages = data.get("pages", [])
-    print(f"Found {len(pages)} pages to process")
     
     # Setup database if needed
     if setup_db:
@@ -375,108 +471,106 @@ def process_structured_content(input_file: Path, embedding_generator: OpenAIEmbe
     if clear_data:
         supabase.clear_existing_data()
     
-    # Process pages and sections
+    # Pending chunks for the current batch
     content_items = []
     content_links = []
-    all_texts = []
-    id_to_index_map = {}
+    stats = {"pages": 0, "chunks": 0, "links": 0, "chars": 0}
+    batch_size = 50  # Smaller batch size for Supabase
+    
+    def flush():
+        """Embed and store the pending chunks, then clear them."""
+        if not content_items:
+            return
+        embeddings = embedding_generator.generate_embeddings([item["content"] for item in content_items])
+        for item, embedding in zip(content_items, embeddings):
+            item["embedding"] = embedding
+        # Content must be stored before the links that reference it. A flush can hold
+        # more than batch_size rows (whole sections are kept together), so store in
+        # batch_size slices to keep each insert small
+        for i in range(0, len(content_items), batch_size):
+            supabase.store_content_batch(content_items[i:i+batch_size])
+        for i in range(0, len(content_links), batch_size):
+            supabase.store_links_batch(content_links[i:i+batch_size])
+        stats["chunks"] += len(content_items)
+        stats["links"] += len(content_links)
+        content_items.clear()
+        content_links.clear()
     
     print("Using section-level chunking strategy for improved context retention")
     
-    # First pass: collect all sections for embedding generation
-    for page in pages:
-        page_id = page.get("id", str(uuid.uuid4()))
-        sections = page.get("sections", [])
+    current_page_id = None
+    for page, section in iter_sections(input_file):
+        if page.get("id") != current_page_id:
+            current_page_id = page.get("id")
+            stats["pages"] += 1
+            print(f"Processing page: {page.get('title', 'Untitled')}")
         
-        print(f"Processing page: {page.get('title', 'Untitled')} with {len(sections)} sections")
+        section_content = section.get("content", "")
         
-        for section in sections:
-            section_content = section.get("content", "")
-            section_id = section.get("id", str(uuid.uuid4()))
-            
-            if not section_content:
-                print(f"  Skipping empty section: {section.get('title', 'Untitled')}")
-                continue
-            
-            print(f"  Processing section: {section.get('title', 'Untitled')} ({len(section_content)} chars)")
-            
-            # Try to keep each section as a single chunk if possible
-            # Only split if it exceeds the token limit
-            chunks = chunk_text(section_content)
-            print(f"    Split into {len(chunks)} chunks")
+        if not section_content:
+            print(f"  Skipping empty section: {section.get('title', 'Untitled')}")
+            continue
+        
+        print(f"  Processing section: {section.get('title', 'Untitled')} ({len(section_content)} chars)")
+        
+        # Try to keep each section as a single chunk if possible
+        # Only split if it exceeds the token limit
+        chunks = chunk_text(section_content)
+        print(f"    Split into {len(chunks)} chunks")
+        
+        # Create a parent item for the first chunk to maintain the section relationship
+        parent_chunk_id = str(uuid.uuid4())
+        
+        for i, chunk in enumerate(chunks):
+            # Generate a unique ID for this chunk
+            chunk_id = parent_chunk_id if i == 0 else str(uuid.uuid4())
+            stats["chars"] += len(chunk)
             
-            # Create a parent item for the first chunk to maintain the section relationship
-            parent_chunk_id = str(uuid.uuid4())
+            # Prepare content item (embedding is added when the batch is flushed)
+            content_items.append({
+                "id": chunk_id,
+                "title": section.get("title", "") + (f" (part {i+1})" if len(chunks) > 1 and i > 0 else ""),
+                "content": chunk,
+                "url": section.get("url", ""),
+                "content_type": section.get("type", ""),
+                "part_id": page.get("part_id", ""),
+                "module_id": page.get("module_id", ""),
+                # Only set parent_id for continuation chunks, not the first chunk
+                "parent_id": parent_chunk_id if i > 0 else None,  
+                "chunk_index": i,
+                "importance": section.get("importance", 0.7) * (1.0 if i == 0 else 0.9)  # Slightly lower importance for continuation chunks
+            })
             
-            for i, chunk in enumerate(chunks):
-                # Generate a unique ID for this chunk
-                chunk_id = parent_chunk_id if i == 0 else str(uuid.uuid4())
-                
-                # Store the text and its index
-                all_texts.append(chunk)
-                id_to_index_map[chunk_id] = len(all_texts) - 1
-                
-                # Prepare content item (without embedding for now)
-                content_items.append({
-                    "id": chunk_id,
-                    "title": section.get("title", "") + (f" (part {i+1})" if len(chunks) > 1 and i > 0 else ""),
-                    "content": chunk,
-                    "url": section.get("url", ""),
-                    "content_type": section.get("type", ""),
-                    "part_id": page.get("part_id", ""),
-                    "module_id": page.get("module_id", ""),
-                    # Only set parent_id for continuation chunks, not the first chunk
-                    "parent_id": parent_chunk_id if i > 0 else None,  
-                    "importance": section.get("importance", 0.7) * (1.0 if i == 0 else 0.9)  # Slightly lower importance for continuation chunks
-                })
-                
-                # Process links if available - only attach to the primary chunk
-                if i == 0:  # Only add links to the first chunk of a section
-                    links = section.get("links", [])
-                    for link in links:
-                        link_id = str(uuid.uuid4())
-                        content_links.append({
-                            "id": link_id,
-                            "content_id": chunk_id,
-                            "link_text": link.get("text", ""),
-                            "url": link.get("url", ""),
-                            "is_internal": link.get("is_internal", False),
-                            "is_reference": link.get("is_reference", False)
-                        })
-    
-    print(f"Collected {len(all_texts)} text chunks for embedding")
-    print(f"  Average chunk size: {sum(len(text) for text in all_texts) / len(all_texts):.1f} chars")
-    
-    # Generate embeddings for all texts
-    embeddings = embedding_generator.generate_embeddings(all_texts)
-    print(f"Generated {len(embeddings)} embeddings")
-    
-    # Add embeddings to content items
-    for item in content_items:
-        item_id = item["id"]
-        if item_id in id_to_index_map:
-            index = id_to_index_map[item_id]
-            if index < len(embeddings):
-                item["embedding"] = embeddings[index]
-    
-    # Store content in batches (Supabase has insertion limits)
-    batch_size = 50  # Smaller batch size for Supabase
-    for i in range(0, len(content_items), batch_size):
-        batch = content_items[i:i+batch_size]
-        supabase.store_content_batch(batch)
+            # Process links if available - only attach to the primary chunk
+            if i == 0:  # Only add links to the first chunk of a section
+                links = section.get("links", [])
+                for link in links:
+                    link_id = str(uuid.uuid4())
+                    content_links.append({
+                        "id": link_id,
+                        "content_id": chunk_id,
+                        "link_text": link.get("text", ""),
+                        "url": link.get("url", ""),
+                        "is_internal": link.get("is_internal", False),
+                        "is_reference": link.get("is_reference", False)
+                    })
+        
+        # Flush after whole sections so a section's chunks and links stay together
+        if len(content_items) >= batch_size:
+            flush()
     
-    # Store links in batches
-    for i in range(0, len(content_links), batch_size):
-        batch = content_links[i:i+batch_size]
-        supabase.store_links_batch(batch)
+    flush()
     
-    print(f"Processing complete. Stored {len(content_items)} content items and {len(content_links)} links.")
+    if stats["chunks"]:
+        print(f"  Average chunk size: {stats['chars'] / stats['chunks']:.1f} chars")
+    print(f"Processing complete. Processed {stats['pages']} pages and stored "
+          f"{stats['chunks']} content items and {stats['links']} links.")
 
 def main():
     """Main entry point with argument parsing."""
     parser = argparse.ArgumentParser(description="Generate OpenAI embeddings and store in Supabase")
     parser.add_argument("--input", "-i", type=str, default=str(INPUT_FILE),
-                        help=f"Input JSON file (default: {INPUT_FILE})")
+                        help=f"Input .json or .jsonl file from extract-structured-content.py (default: {INPUT_FILE})")
     parser.add_argument("--setup-db", action="store_true",
                         help="Set up database schema")
     parser.add_argument("--clear-data", action="store_true",
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Extraction Benchmark
+
+This script generates a synthetic course site with thousands of module pages
+(module-nav buttons, sections, links, footers and scripts similar to the real
+pages/*.html) and times extract-structured-content.py over it:
+1. Raw parse time of each HTML parser backend (synthetic and real pages)
+2. Full extraction with each parser backend and worker count
+
+Usage:
+    python benchmark-extraction.py --pages 2000 --workers 1,2,4,8 --parsers html.parser,lxml
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import importlib.util
+from pathlib import Path
+
+EXTRACTOR_FILE = Path(__file__).resolve().parent / "extract-structured-content.py"
+
+WORDS = (
+    "model prompt agent token context embedding retrieval memory tool cycle "
+    "reasoning language vector search protocol server client transport layer "
+    "attention transformer decoder training inference latency evaluation"
+).split()
+
+def load_extractor():
+    """Load the extractor script as a module (its file name is not importable)."""
+    spec = importlib.util.spec_from_file_location("extract_structured_content", EXTRACTOR_FILE)
+    module = importlib.util.module_from_spec(spec)
+    # Register before executing so worker processes can unpickle its functions
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def random_sentence(rng, length=14):
+    """Build a random sentence from the course vocabulary."""
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + "."
+
+def generate_page(rng, page_number, sections_per_page, paragraphs_per_section):
+    """Generate the HTML for one synthetic module page."""
+    section_ids = [f"topic-{page_number}-{i}" for i in range(sections_per_page)]
+    nav_buttons = "\n".join(
+        f'<button class="module-nav-btn" data-section="{section_id}">Topic {i + 1}</button>'
+        for i, section_id in enumerate(section_ids)
+    )
+
+    sections = []
+    for i, section_id in enumerate(section_ids):
+        paragraphs = "\n".join(
+            f"<p>{random_sentence(rng)} {random_sentence(rng)} "
+            f'<a href="module-{rng.randrange(page_number + 1)}.html#{section_id}">see also</a> '
+            f'<a href="https://example.com/ref/{page_number}/{i}">reference</a></p>'
+            for _ in range(paragraphs_per_section)
+        )
+        sections.append(
+            f'<section id="{section_id}" class="module-section">\n'
+            f"<h2>Topic {i + 1}</h2>\n{paragraphs}\n"
+            f"<ul><li>{random_sentence(rng, 6)}</li><li>{random_sentence(rng, 6)}</li></ul>\n"
+            f"</section>"
+        )
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>Synthetic Module {page_number}</title>
+<style>body {{ font-family: sans-serif; }}</style>
+</head>
+<body>
+<nav class="course-nav"><a href="../index.html">Home</a></nav>
+<div class="module-nav">
+{nav_buttons}
+</div>
+<main class="content-inner">
+{chr(10).join(sections)}
+</main>
+<footer class="site-footer"><p>AI Education</p></footer>
+<script>console.log("page {page_number}");</script>
+</body>
+</html>
+"""
+
+def generate_site(root, num_pages, sections_per_page, paragraphs_per_section, seed=42):
+    """Write the synthetic pages into root/pages, spread over a few subdirectories."""
+    rng = random.Random(seed)
+    pages_dir = root / "pages"
+    for page_number in range(num_pages):
+        # Nest some pages to exercise the recursive directory walk
+        subdir = pages_dir / f"part-{page_number % 4}" if page_number % 3 == 0 else pages_dir
+        subdir.mkdir(parents=True, exist_ok=True)
+        html = generate_page(rng, page_number, sections_per_page, paragraphs_per_section)
+        (subdir / f"module-{page_number}.html").write_text(html, encoding="utf-8")
+    return pages_dir
+
+def time_parsing(extractor, html_files, parser):
+    """Parse every file once with the given backend and return the elapsed seconds."""
+    documents = [f.read_text(encoding="utf-8") for f in html_files]
+    start = time.perf_counter()
+    for html in documents:
+        extractor.parse_html(html, parser)
+    return time.perf_counter() - start
+
+def time_extraction(extractor, pages_dir, workers, parser):
+    """Run process_directory once and return (seconds, pages)."""
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            start = time.perf_counter()
+            pages = extractor.process_directory(pages_dir, "pages", workers=workers, parser=parser)
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    return elapsed, pages
+
+def page_signature(pages):
+    """Order-sensitive fingerprint of the extracted content (ignoring random UUIDs)."""
+    return [
+        (page["url"], [(section["id"], section["content"], len(section["links"])) for section in page["sections"]])
+        for page in pages
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML extraction across parser backends and worker counts")
+    parser.add_argument("--pages", type=int, default=2000, help="Number of synthetic pages (default: 2000)")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per page (default: 8)")
+    parser.add_argument("--paragraphs", type=int, default=6, help="Paragraphs per section (default: 6)")
+    parser.add_argument("--workers", type=str, default=f"1,2,4,{os.cpu_count() or 1}",
+                        help="Comma-separated worker counts to time (default: 1,2,4,<cpus>)")
+    parser.add_argument("--parsers", type=str, default="html.parser,lxml",
+                        help="Comma-separated parser backends to time (default: html.parser,lxml)")
+    args = parser.parse_args()
+
+    worker_counts = sorted({int(w) for w in args.workers.split(",") if w.strip()})
+    extractor = load_extractor()
+    parsers = [p.strip() for p in args.parsers.split(",") if p.strip()]
+    for name in parsers:
+        if name not in extractor.PARSERS:
+            parser.error(f"unknown parser backend: {name} (choose from {', '.join(extractor.PARSERS)})")
+    real_pages = sorted(extractor.PAGES_DIR.glob("*.html")) + [extractor.INDEX_FILE]
+
+    with tempfile.TemporaryDirectory(prefix="extraction-bench-") as tmp:
+        print(f"Generating {args.pages} synthetic pages...")
+        pages_dir = generate_site(Path(tmp), args.pages, args.sections, args.paragraphs)
+        site_size = sum(f.stat().st_size for f in pages_dir.rglob("*.html"))
+        print(f"Site size: {site_size / 1024 / 1024:.1f} MB")
+        print(f"CPUs available: {os.cpu_count()}\n")
+
+        synthetic_pages = sorted(pages_dir.rglob("*.html"))
+        print("Parse time per backend (parse only, no extraction):")
+        print(f"{'parser':>12} {'synthetic (s)':>14} {'real pages (ms)':>16}")
+        for name in parsers:
+            synthetic = time_parsing(extractor, synthetic_pages, name)
+            real = time_parsing(extractor, real_pages, name)
+            print(f"{name:>12} {synthetic:>14.2f} {real * 1000:>16.1f}")
+
+        print("\nFull extraction:")
+        baseline = None
+        reference = None
+        print(f"{'parser':>12} {'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+        for name in parsers:
+            for workers in worker_counts:
+                elapsed, pages = time_extraction(extractor, pages_dir, workers, name)
+                signature = page_signature(pages)
+                if reference is None:
+                    reference = signature
+                elif signature != reference:
+                    print(f"ERROR: output with parser {name} and {workers} workers differs from the first run")
+                    sys.exit(1)
+                baseline = baseline or elapsed
+                print(f"{name:>12} {workers:>8} {elapsed:>9.2f} {len(pages) / elapsed:>9.1f} {baseline / elapsed:>7.2f}x")
+
+        total_sections = sum(len(page["sections"]) for page in pages)
+        print(f"\nExtracted {len(pages)} pages / {total_sections} sections; "
+              f"output identical across parsers and worker counts.")
+
+if __name__ == "__main__":
+    main()
@@ -15,11 +15,21 @@ import os
 import json
 import re
 import uuid
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from dotenv import load_dotenv
 
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:  # The lxml backend is optional
+    lxml = None
+
 # Load environment variables
 load_dotenv()
 
@@ -29,16 +39,8 @@ PAGES_DIR = ROOT_DIR / "pages"
 INDEX_FILE = ROOT_DIR / "index.html"
 OUTPUT_DIR = ROOT_DIR / "data-pipeline" / "data"
 OUTPUT_FILE = OUTPUT_DIR / "structured-content.json"
-
-# Print paths for debugging
-print(f"ROOT_DIR: {ROOT_DIR}")
-print(f"PAGES_DIR: {PAGES_DIR}")
-print(f"INDEX_FILE: {INDEX_FILE}")
-print(f"OUTPUT_DIR: {OUTPUT_DIR}")
-print(f"OUTPUT_FILE: {OUTPUT_FILE}")
-
-# Ensure output directory exists
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+JSONL_OUTPUT_FILE = OUTPUT_DIR / "structured-content.jsonl"
+MANIFEST_FILE = OUTPUT_DIR / "extraction-manifest.json"
 
 # Elements to ignore after extracting their information (navigation, footers, etc.)
 IGNORE_SELECTORS = [
@@ -69,6 +71,122 @@ CONTENT_TYPES = {
     "SUBSECTION": "subsection"
 }
 
+# HTML parser backends selectable with --parser
+PARSERS = ["html.parser", "lxml"]
+DEFAULT_PARSER = "html.parser"
+
+# Tags whose text BeautifulSoup's get_text() leaves out
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+def _iter_text(element):
+    """Yield the text of an lxml element the way BeautifulSoup's get_text() does."""
+    if element.text:
+        yield element.text
+    for child in element:
+        # Comments and processing instructions have a non-string tag
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            yield from _iter_text(child)
+        if child.tail:
+            yield child.tail
+
+class LxmlNode:
+    """
+    Minimal BeautifulSoup-compatible wrapper around an lxml.html element.
+    
+    Only the part of the bs4 API used by this script is implemented, so the
+    extraction functions below run unchanged on either parser backend.
+    """
+    _selectors = {}
+    
+    def __init__(self, element):
+        self._element = element
+    
+    @property
+    def name(self):
+        return self._element.tag
+    
+    @property
+    def parent(self):
+        parent = self._element.getparent()
+        return LxmlNode(parent) if parent is not None else None
+    
+    @property
+    def string(self):
+        """Single text child, following single-child tags like bs4's .string."""
+        children = list(self._element)
+        if not children:
+            return self._element.text
+        if len(children) == 1 and not self._element.text and not children[0].tail:
+            return LxmlNode(children[0]).string
+        return None
+    
+    def get(self, key, default=None):
+        return self._element.get(key, default)
+    
+    def get_text(self):
+        return "".join(_iter_text(self._element))
+    
+    def find_all(self, name, attrs=None):
+        names = [name] if isinstance(name, str) else name
+        required = [key for key, value in (attrs or {}).items() if value is True]
+        return [
+            LxmlNode(element) for element in self._element.iterdescendants(*names)
+            if all(element.get(key) is not None for key in required)
+        ]
+    
+    def find(self, name=None, id=None):
+        if id is not None:
+            matches = self._element.xpath('.//*[@id=$id]', id=id)
+            return LxmlNode(matches[0]) if matches else None
+        element = next(self._element.iterdescendants(*([name] if isinstance(name, str) else name)), None)
+        return LxmlNode(element) if element is not None else None
+    
+    def select(self, selector):
+        if selector not in self._selectors:
+            self._selectors[selector] = CSSSelector(selector, translator='html')
+        # CSS selectors match descendants only, never the element itself
+        return [LxmlNode(element) for element in self._selectors[selector](self._element)
+                if element is not self._element]
+    
+    def select_one(self, selector):
+        matches = self.select(selector)
+        return matches[0] if matches else None
+    
+    def decompose(self):
+        self._element.drop_tree()
+
+class LxmlDocument(LxmlNode):
+    """Document-level wrapper; like a BeautifulSoup object, the <html> root is searchable."""
+    
+    @property
+    def title(self):
+        element = next(self._element.iter('title'), None)
+        return LxmlNode(element) if element is not None else None
+    
+    def select(self, selector):
+        if selector not in self._selectors:
+            self._selectors[selector] = CSSSelector(selector, translator='html')
+        return [LxmlNode(element) for element in self._selectors[selector](self._element)]
+    
+    def find(self, name=None, id=None):
+        # Unlike an element, the document also matches the <html> root itself
+        if id is not None and self._element.get('id') == id:
+            return LxmlNode(self._element)
+        return super().find(name, id)
+
+def parse_html(html_content, parser=DEFAULT_PARSER):
+    """
+    Parse an HTML document with the selected backend.
+    
+    'html.parser' returns a BeautifulSoup object; 'lxml' parses with lxml.html
+    (C, much faster) and returns an LxmlDocument exposing the same API.
+    """
+    if parser == "lxml":
+        if lxml is None:
+            raise ImportError("The lxml parser backend requires the lxml and cssselect packages")
+        return LxmlDocument(lxml.html.document_fromstring(html_content))
+    return BeautifulSoup(html_content, parser)
+
 def clean_text(text):
     """Clean up text by removing extra whitespace, etc."""
     if not text:
@@ -169,22 +287,27 @@ def extract_links(element, base_url):
     return links
 
 def extract_sections(soup, url, content_type):
-    """Extract sections from the page based on module-nav and section IDs."""
+    """
+    Extract sections from the page based on module-nav and section IDs.
+
+    Note: ignored elements (navigation, footers, scripts) are removed from
+    `soup` in place once the nav sections have been read, so callers should
+    pull any other metadata they need from the soup beforehand.
+    """
     sections = []
     
     # First, extract section IDs from module-nav
     nav_sections = extract_nav_sections(soup, url)
-    nav_section_ids = {section["id"] for section in nav_sections}
+    # Keep nav order (deduplicated) so the section order is stable across runs
+    nav_section_ids = list(dict.fromkeys(section["id"] for section in nav_sections))
     
     # Create a mapping of section ID to nav title
     nav_titles = {section["id"]: section["title"] for section in nav_sections}
     
-    # Clone the soup to keep original for later
-    soup_copy = BeautifulSoup(str(soup), 'html.parser')
-    
-    # Remove elements we want to ignore
+    # Remove elements we want to ignore. The nav sections have already been
+    # read, so we prune the parsed tree in place instead of re-parsing a copy.
     for selector in IGNORE_SELECTORS:
-        for element in soup_copy.select(selector):
+        for element in soup.select(selector):
             element.decompose()
     
     # Process each section with an ID from navigation
@@ -192,7 +315,7 @@ def extract_sections(soup, url, content_type):
     
     # Find all sections with IDs matching nav_section_ids
     for section_id in nav_section_ids:
-        section_elem = soup_copy.find(id=section_id)
+        section_elem = soup.find(id=section_id)
         if section_elem:
             # Get section title from navigation or from first heading
             section_title = nav_titles.get(section_id)
@@ -219,11 +342,11 @@ def extract_sections(soup, url, content_type):
     
     # If no sections were found from nav, try finding module-section elements
     if not sections:
-        module_sections = soup_copy.select('.module-section')
+        module_sections = soup.select('.module-section')
         
         # If no module-section found, try content-inner or main content
         if not module_sections:
-            main_content = soup_copy.select_one('.content-inner, main, #content-inner, .content, body')
+            main_content = soup.select_one('.content-inner, main, #content-inner, .content, body')
             if main_content:
                 module_sections = [main_content]
         
@@ -266,7 +389,7 @@ def extract_sections(soup, url, content_type):
     # If we still don't have any sections, try to process the whole page
     if not sections:
         print(f"Warning: No sections found in {url}, processing as a single section")
-        page_content = clean_text(soup_copy.get_text())
+        page_content = clean_text(soup.get_text())
         if page_content:
             sections.append({
                 "id": "page-content",
@@ -274,7 +397,7 @@ def extract_sections(soup, url, content_type):
                 "content": page_content,
                 "type": CONTENT_TYPES["SECTION"],
                 "importance": 0.7,
-                "links": extract_links(soup_copy, url),
+                "links": extract_links(soup, url),
                 "url": url
             })
     
@@ -297,13 +420,13 @@ def extract_sections(soup, url, content_type):
     
     return sections
 
-def process_html_file(file_path, relative_url):
+def process_html_file(file_path, relative_url, parser=DEFAULT_PARSER):
     """Process a single HTML file and extract structured content."""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             html_content = f.read()
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content, parser)
         
         # Extract basic metadata
         title = clean_text(soup.title.string) if soup.title else os.path.basename(file_path)
@@ -333,30 +456,202 @@ def process_html_file(file_path, relative_url):
         print(f"Error processing {file_path}: {e}")
         return None
 
-def process_directory(directory, url_prefix):
-    """Process all HTML files in a directory and its subdirectories."""
-    pages = []
+def _process_html_file_task(task):
+    """Unpack a (file_path, relative_url, parser) task for use with executor.map."""
+    return process_html_file(*task)
+
+def collect_html_files(directory, url_prefix):
+    """
+    Collect (file_path, relative_url) pairs for all HTML files in a directory
+    and its subdirectories, in a stable sorted order.
+    """
+    files = []
     
     if not directory.exists() or not directory.is_dir():
         print(f"Directory doesn't exist: {directory}")
-        return pages
+        return files
         
-    # Process HTML files in this directory
-    for html_file in directory.glob("*.html"):
-        relative_url = f"{url_prefix}/{html_file.name}"
-        print(f"Processing {html_file}")
-        page = process_html_file(html_file, relative_url)
-        if page:
-            pages.append(page)
+    # HTML files in this directory
+    for html_file in sorted(directory.glob("*.html")):
+        files.append((html_file, f"{url_prefix}/{html_file.name}"))
             
-    # Process subdirectories
-    for subdir in directory.iterdir():
+    # Subdirectories
+    for subdir in sorted(directory.iterdir()):
         if subdir.is_dir() and not subdir.name.startswith('.'):
-            subdir_name = subdir.name
-            subdir_pages = process_directory(subdir, f"{url_prefix}/{subdir_name}")
-            pages.extend(subdir_pages)
+            files.extend(collect_html_files(subdir, f"{url_prefix}/{subdir.name}"))
             
-    return pages
+    return files
+
+def process_html_files(files, workers=1, parser=DEFAULT_PARSER):
+    """
+    Process a list of (file_path, relative_url) pairs.
+    
+    With workers > 1 the files are parsed in a process pool. Results are
+    returned in the same order as `files`, so the output does not depend on
+    which worker finishes first. Files that fail to parse are dropped.
+    """
+    tasks = [(html_file, relative_url, parser) for html_file, relative_url in files]
+    
+    if workers > 1 and len(files) > 1:
+        print(f"Processing {len(files)} files with {workers} workers")
+        # Hand out several files per task to keep IPC overhead low
+        chunksize = max(1, len(files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_process_html_file_task, tasks, chunksize=chunksize))
+    else:
+        results = []
+        for html_file, relative_url in files:
+            print(f"Processing {html_file}")
+            results.append(process_html_file(html_file, relative_url, parser))
+            
+    return [page for page in results if page]
+
+def process_directory(directory, url_prefix, workers=1, parser=DEFAULT_PARSER):
+    """Process all HTML files in a directory and its subdirectories."""
+    return process_html_files(collect_html_files(directory, url_prefix), workers, parser)
+
+def hash_file(file_path):
+    """SHA-256 of a file's contents."""
+    return hashlib.sha256(Path(file_path).read_bytes()).hexdigest()
+
+def section_fingerprint(section):
+    """
+    Hash of the extracted content of a section. Random link UUIDs and the
+    parent_id assigned after extraction are left out so that re-extracting an
+    unchanged section gives the same fingerprint.
+    """
+    stable = {key: value for key, value in section.items() if key not in ("links", "parent_id")}
+    stable["links"] = [{key: value for key, value in link.items() if key != "id"} for link in section.get("links", [])]
+    return hashlib.sha256(json.dumps(stable, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def write_structured_content(pages, metadata, output_file, output_format="json"):
+    """
+    Write the extracted pages.
+    
+    "json" writes one indented document {"pages": [...], "metadata": {...}}.
+    "jsonl" writes one compact record per line: a {"metadata": ...} line
+    first, then for each page a {"page": ...} line (without its sections)
+    followed by one {"section": ...} line per section.
+    """
+    with open(output_file, 'w', encoding='utf-8') as f:
+        if output_format == "jsonl":
+            f.write(json.dumps({"metadata": metadata}, ensure_ascii=False) + "\n")
+            for page in pages:
+                page_record = {key: value for key, value in page.items() if key != "sections"}
+                f.write(json.dumps({"page": page_record}, ensure_ascii=False) + "\n")
+                for section in page["sections"]:
+                    f.write(json.dumps({"section": section}, ensure_ascii=False) + "\n")
+        else:
+            json.dump({"pages": pages, "metadata": metadata}, f, indent=2, ensure_ascii=False)
+
+def iter_structured_content(input_file):
+    """
+    Stream (record_type, record) pairs from structured content in either format.
+    
+    record_type is "metadata", "page" (without sections) or "section"; a
+    page's sections follow it. .jsonl files are read one line at a time, so
+    memory use does not grow with the size of the course. Monolithic .json
+    files are still supported but have to be loaded in full.
+    """
+    input_file = Path(input_file)
+    with open(input_file, 'r', encoding='utf-8') as f:
+        if input_file.suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    (record_type, record), = json.loads(line).items()
+                    yield record_type, record
+        else:
+            data = json.load(f)
+            yield "metadata", data.get("metadata", {})
+            for page in data.get("pages", []):
+                yield "page", {key: value for key, value in page.items() if key != "sections"}
+                for section in page.get("sections", []):
+                    yield "section", section
+
+def load_structured_content(input_file):
+    """Load structured content in either format as (pages, metadata)."""
+    pages, metadata = [], {}
+    for record_type, record in iter_structured_content(input_file):
+        if record_type == "metadata":
+            metadata = record
+        elif record_type == "page":
+            pages.append({**record, "sections": []})
+        elif record_type == "section":
+            pages[-1]["sections"].append(record)
+    return pages, metadata
+
+def load_previous_run(output_file=OUTPUT_FILE):
+    """
+    Load the previous output and manifest for an incremental run.
+    
+    Returns (pages_by_url, manifest), or (None, None) when either file is
+    missing or unreadable, or the manifest was written by a different version
+    of this script (whose output cannot be reused).
+    """
+    if not output_file.exists() or not MANIFEST_FILE.exists():
+        return None, None
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("extractor_hash") != hash_file(__file__):
+            print("Extractor changed since the last run, re-extracting everything")
+            return None, None
+        if manifest.get("output_file") != output_file.name:
+            print(f"Last run wrote {manifest.get('output_file')}, re-extracting everything")
+            return None, None
+        previous_pages, _ = load_structured_content(output_file)
+        return {page["url"]: page for page in previous_pages}, manifest
+    except Exception as e:
+        print(f"Could not load previous extraction ({e}), re-extracting everything")
+        return None, None
+
+def plan_extraction(files, previous_pages, manifest):
+    """
+    Split files into those that must be (re-)extracted and those whose
+    previous output can be reused.
+    
+    A file is unchanged when its size and mtime match the manifest, or, if
+    only the mtime moved, its content hash still matches. Returns
+    (to_extract, file_entries, added, changed, deleted), where file_entries
+    maps each URL to its current {path, sha256, mtime, size}.
+    """
+    previous_files = manifest.get("files", {}) if manifest else {}
+    to_extract, file_entries, added, changed = [], {}, [], []
+    
+    for file_path, relative_url in files:
+        stat = file_path.stat()
+        entry = {
+            "path": str(file_path.relative_to(ROOT_DIR)) if file_path.is_relative_to(ROOT_DIR) else str(file_path),
+            "mtime": stat.st_mtime,
+            "size": stat.st_size
+        }
+        previous = previous_files.get(relative_url)
+        reusable = previous is not None and previous_pages is not None and relative_url in previous_pages
+        
+        if reusable and previous["size"] == entry["size"] and previous["mtime"] == entry["mtime"]:
+            entry["sha256"] = previous["sha256"]
+        else:
+            entry["sha256"] = hash_file(file_path)
+            if not reusable or previous["sha256"] != entry["sha256"]:
+                to_extract.append((file_path, relative_url))
+                (changed if previous is not None else added).append(relative_url)
+        file_entries[relative_url] = entry
+    
+    deleted = sorted(url for url in previous_files if url not in file_entries)
+    return to_extract, file_entries, added, changed, deleted
+
+def diff_sections(url, previous_sections, current_sections):
+    """List added, changed and deleted sections of a page from their fingerprints."""
+    changes = []
+    for section_id, section in current_sections.items():
+        if section_id not in previous_sections:
+            changes.append({"page": url, "section_id": section_id, "url": section["url"], "change": "added"})
+        elif previous_sections[section_id]["fingerprint"] != section["fingerprint"]:
+            changes.append({"page": url, "section_id": section_id, "url": section["url"], "change": "changed"})
+    for section_id, section in previous_sections.items():
+        if section_id not in current_sections:
+            changes.append({"page": url, "section_id": section_id, "url": section["url"], "change": "deleted"})
+    return changes
 
 def extract_parent_child_relationships(pages):
     """Create parent-child relationships between pages and sections."""
@@ -414,46 +709,131 @@ def extract_parent_child_relationships(pages):
     
     return pages
 
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Extract structured content from the course HTML files")
+    parser.add_argument("--workers", "-w", type=int, default=1,
+                        help="Number of worker processes for parsing pages (default: 1, 0 = one per CPU)")
+    parser.add_argument("--parser", "-p", choices=PARSERS, default=DEFAULT_PARSER,
+                        help=f"HTML parser backend (default: {DEFAULT_PARSER}; lxml is much faster)")
+    parser.add_argument("--format", "-f", choices=["json", "jsonl"], default="json",
+                        help=f"Output format: json ({OUTPUT_FILE.name}) or jsonl, one record per line "
+                             f"({JSONL_OUTPUT_FILE.name}) (default: json)")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-extract every page instead of only pages changed since the last run")
+    return parser.parse_args()
+
 def main():
     """Main function to process all HTML files and generate JSON."""
-    all_pages = []
+    args = parse_args()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    output_file = JSONL_OUTPUT_FILE if args.format == "jsonl" else OUTPUT_FILE
+    
+    # Print paths for debugging
+    print(f"ROOT_DIR: {ROOT_DIR}")
+    print(f"PAGES_DIR: {PAGES_DIR}")
+    print(f"INDEX_FILE: {INDEX_FILE}")
+    print(f"OUTPUT_DIR: {OUTPUT_DIR}")
+    print(f"OUTPUT_FILE: {output_file}")
+    print(f"HTML parser: {args.parser}")
     
-    # Process index.html
+    # Ensure output directory exists
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    
+    # Collect index.html and all HTML files in the pages directory
+    files = []
     if INDEX_FILE.exists():
-        print(f"Processing {INDEX_FILE}")
-        index_page = process_html_file(INDEX_FILE, "index.html")
-        if index_page:
-            all_pages.append(index_page)
+        files.append((INDEX_FILE, "index.html"))
     else:
         print("Warning: index.html not found")
-    
-    # Process all HTML files in pages directory
     if PAGES_DIR.exists():
-        print(f"Processing pages directory: {PAGES_DIR}")
-        pages_content = process_directory(PAGES_DIR, "pages")
-        all_pages.extend(pages_content)
+        files.extend(collect_html_files(PAGES_DIR, "pages"))
     else:
         print(f"Warning: Pages directory not found: {PAGES_DIR}")
     
+    # Only re-extract pages that were added or changed since the last run
+    previous_pages, manifest = (None, None) if args.full else load_previous_run(output_file)
+    mode = "incremental" if manifest else "full"
+    to_extract, file_entries, added, changed, deleted = plan_extraction(files, previous_pages, manifest)
+    print(f"Extraction mode: {mode} ({len(to_extract)} to extract, "
+          f"{len(files) - len(to_extract)} unchanged, {len(deleted)} deleted)")
+    
+    extracted = {page["url"]: page for page in process_html_files(to_extract, workers, args.parser)}
+    extract_urls = {relative_url for _, relative_url in to_extract}
+    
+    # Merge in file order: fresh pages where re-extracted, previous pages verbatim otherwise
+    previous_files = manifest.get("files", {}) if manifest else {}
+    all_pages = []
+    for file_path, relative_url in files:
+        if relative_url in extracted:
+            page = extracted[relative_url]
+            # Keep page ids stable across runs so section parent_ids don't churn
+            if previous_pages and relative_url in previous_pages:
+                page["id"] = previous_pages[relative_url]["id"]
+            all_pages.append(page)
+        elif relative_url not in extract_urls:
+            all_pages.append(previous_pages[relative_url])
+        elif relative_url in previous_files and relative_url in previous_pages:
+            # Re-extraction failed; keep the previous page rather than dropping its sections,
+            # and its old manifest entry, whose stale hash makes the next run retry
+            print(f"Warning: keeping the previous extraction of {relative_url}")
+            all_pages.append(previous_pages[relative_url])
+            file_entries[relative_url] = dict(previous_files[relative_url])
+        else:
+            # Extraction of a new page failed; leave it out of the manifest so the next run retries
+            file_entries.pop(relative_url, None)
+    
     # Extract parent-child relationships
     all_pages = extract_parent_child_relationships(all_pages)
     
-    # Create output JSON
-    output = {
-        "pages": all_pages,
-        "metadata": {
-            "total_pages": len(all_pages),
-            "total_sections": sum(len(page["sections"]) for page in all_pages),
-            "extraction_date": str(Path(__file__).stat().st_mtime)
+    # Record per-section fingerprints and work out which sections changed
+    changed_sections = []
+    for page in all_pages:
+        sections = {
+            section["id"]: {"url": section["url"], "fingerprint": section_fingerprint(section)}
+            for section in page["sections"]
         }
-    }
+        file_entries[page["url"]]["page_id"] = page["id"]
+        file_entries[page["url"]]["sections"] = sections
+        previous_sections = previous_files.get(page["url"], {}).get("sections", {})
+        changed_sections.extend(diff_sections(page["url"], previous_sections, sections))
+    for url in deleted:
+        changed_sections.extend(diff_sections(url, previous_files[url].get("sections", {}), {}))
+    
+    extraction_date = datetime.now().isoformat()
     
     # Save to file
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    metadata = {
+        "total_pages": len(all_pages),
+        "total_sections": sum(len(page["sections"]) for page in all_pages),
+        "extraction_date": extraction_date
+    }
+    write_structured_content(all_pages, metadata, output_file, args.format)
+    
+    # Save the manifest; last_run lists what changed for downstream embedding
+    new_manifest = {
+        "extractor_hash": hash_file(__file__),
+        "output_file": output_file.name,
+        "extraction_date": extraction_date,
+        "files": file_entries,
+        "last_run": {
+            "mode": mode,
+            "added": added,
+            "changed": changed,
+            "deleted": deleted,
+            "unchanged": len(files) - len(to_extract),
+            "changed_sections": changed_sections
+        }
+    }
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(new_manifest, f, indent=2, ensure_ascii=False)
     
-    print(f"\nExtraction complete! Processed {len(all_pages)} pages.")
-    print(f"Output saved to {OUTPUT_FILE}")
+    print(f"\nExtraction complete! Processed {len(all_pages)} pages "
+          f"({len(extracted)} extracted, {len(all_pages) - len(extracted)} reused).")
+    print(f"Output saved to {output_file}")
+    print(f"Manifest saved to {MANIFEST_FILE}")
+    print(f"Pages added: {len(added)}, changed: {len(changed)}, deleted: {len(deleted)}")
+    print(f"Sections added/changed/deleted: {len(changed_sections)}")
     
     # Print some stats
     total_sections = sum(len(page["sections"]) for page in all_pages)
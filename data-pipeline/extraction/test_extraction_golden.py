@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Golden-File Tests for Content Extraction
+
+This module checks that every HTML parser backend of extract-structured-content.py
+produces exactly the sections and links recorded in golden/structured-content.golden.json
+for the real index.html and pages/*.html.
+
+Run the tests:
+    python -m pytest test_extraction_golden.py
+
+Regenerate the golden file after intentionally changing the pages or the extractor
+(always generated with the reference html.parser backend):
+    python test_extraction_golden.py --update
+"""
+
+import io
+import sys
+import json
+import unittest
+import contextlib
+import importlib.util
+from pathlib import Path
+
+EXTRACTION_DIR = Path(__file__).resolve().parent
+EXTRACTOR_FILE = EXTRACTION_DIR / "extract-structured-content.py"
+GOLDEN_FILE = EXTRACTION_DIR / "golden" / "structured-content.golden.json"
+
+def load_extractor():
+    """Load the extractor script as a module (its file name is not importable)."""
+    spec = importlib.util.spec_from_file_location("extract_structured_content", EXTRACTOR_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+extractor = load_extractor()
+
+def normalize_page(page):
+    """Drop the random UUIDs so pages can be compared across runs."""
+    return {
+        "title": page["title"],
+        "url": page["url"],
+        "type": page["type"],
+        "module_id": page["module_id"],
+        "sections": [
+            {
+                **{key: value for key, value in section.items() if key != "links"},
+                "links": [{key: value for key, value in link.items() if key != "id"} for link in section["links"]],
+            }
+            for section in page["sections"]
+        ],
+    }
+
+def extract_pages(parser):
+    """Extract index.html and pages/ with the given backend, keyed by URL."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        pages = [extractor.process_html_file(extractor.INDEX_FILE, "index.html", parser)]
+        pages += extractor.process_directory(extractor.PAGES_DIR, "pages", parser=parser)
+    return {page["url"]: normalize_page(page) for page in pages}
+
+class TestExtractionGolden(unittest.TestCase):
+    """Compare each parser backend against the golden extraction output."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(GOLDEN_FILE, "r", encoding="utf-8") as f:
+            cls.golden = json.load(f)
+
+    def assert_matches_golden(self, parser):
+        pages = extract_pages(parser)
+        self.assertEqual(sorted(pages), sorted(self.golden), "Extracted page set differs from golden file")
+        for url, expected in self.golden.items():
+            with self.subTest(parser=parser, page=url):
+                actual = pages[url]
+                self.assertEqual(
+                    [section["id"] for section in actual["sections"]],
+                    [section["id"] for section in expected["sections"]],
+                    "Section ids or order differ",
+                )
+                self.assertEqual(actual, expected)
+
+    def test_html_parser_matches_golden(self):
+        """The reference BeautifulSoup html.parser backend reproduces the golden file."""
+        self.assert_matches_golden("html.parser")
+
+    @unittest.skipIf(extractor.lxml is None, "lxml/cssselect not installed")
+    def test_lxml_matches_golden(self):
+        """The lxml backend produces identical sections and links."""
+        self.assert_matches_golden("lxml")
+
+def update_golden():
+    """Regenerate the golden file from the html.parser backend."""
+    pages = extract_pages("html.parser")
+    GOLDEN_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(GOLDEN_FILE, "w", encoding="utf-8") as f:
+        json.dump(pages, f, indent=2, ensure_ascii=False)
+    print(f"Wrote {len(pages)} pages to {GOLDEN_FILE}")
+
+if __name__ == "__main__":
+    if "--update" in sys.argv:
+        update_golden()
+    else:
+        unittest.main()
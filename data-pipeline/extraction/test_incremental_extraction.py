@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Incremental Extraction Tests
+
+This module runs extract-structured-content.py end to end on a copy of two course
+pages and checks what an incremental run keeps when a changed page fails to parse.
+
+Run the tests:
+    python -m pytest test_incremental_extraction.py
+"""
+
+import io
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import contextlib
+from pathlib import Path
+from unittest import mock
+
+from test_extraction_golden import extractor
+
+PAGES = ["agents.html", "llm.html"]
+
+class TestIncrementalExtraction(unittest.TestCase):
+    """Run main() twice on a temporary tree: a full run, then an incremental one."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        (self.root / "pages").mkdir()
+        for name in PAGES:
+            shutil.copy(extractor.PAGES_DIR / name, self.root / "pages" / name)
+        output_dir = self.root / "data"
+        paths = {
+            "ROOT_DIR": self.root,
+            "PAGES_DIR": self.root / "pages",
+            "INDEX_FILE": self.root / "index.html",
+            "OUTPUT_DIR": output_dir,
+            "OUTPUT_FILE": output_dir / "structured-content.json",
+            "JSONL_OUTPUT_FILE": output_dir / "structured-content.jsonl",
+            "MANIFEST_FILE": output_dir / "extraction-manifest.json",
+        }
+        for name, path in paths.items():
+            patcher = mock.patch.object(extractor, name, path)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_extraction(self):
+        with mock.patch.object(sys, "argv", ["extract-structured-content.py"]), \
+                contextlib.redirect_stdout(io.StringIO()):
+            extractor.main()
+        pages, _ = extractor.load_structured_content(extractor.OUTPUT_FILE)
+        with open(extractor.MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return {page["url"]: page for page in pages}, manifest
+
+    def test_failed_reextraction_keeps_previous_page(self):
+        """A changed page that fails to parse keeps its previous sections, and is retried next run."""
+        first_pages, first_manifest = self.run_extraction()
+        changed = self.root / "pages" / "llm.html"
+        changed.write_text(changed.read_text(encoding="utf-8") + "\n<!-- edited -->\n", encoding="utf-8")
+
+        with mock.patch.object(extractor, "parse_html", side_effect=ValueError("broken markup")):
+            pages, manifest = self.run_extraction()
+        self.assertEqual(pages["pages/llm.html"], first_pages["pages/llm.html"])
+        self.assertEqual(manifest["files"]["pages/llm.html"]["sha256"],
+                         first_manifest["files"]["pages/llm.html"]["sha256"])
+        self.assertEqual(manifest["last_run"]["changed"], ["pages/llm.html"])
+        self.assertEqual(manifest["last_run"]["changed_sections"], [])
+
+        pages, manifest = self.run_extraction()
+        self.assertEqual(manifest["last_run"]["changed"], ["pages/llm.html"])
+        self.assertEqual(manifest["files"]["pages/llm.html"]["sha256"], extractor.hash_file(changed))
+        self.assertEqual(pages["pages/llm.html"]["id"], first_pages["pages/llm.html"]["id"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,7 @@ CREATE EXTENSION IF NOT EXISTS vector;
 DROP TABLE IF EXISTS content_links;
 DROP TABLE IF EXISTS course_content;
 DROP FUNCTION IF EXISTS match_course_content;
+DROP FUNCTION IF EXISTS match_course_content_with_context;
 
 -- Create course_content table with 1536 dimensions for OpenAI embeddings
 CREATE TABLE IF NOT EXISTS course_content (
@@ -19,6 +20,7 @@ CREATE TABLE IF NOT EXISTS course_content (
     part_id TEXT,
     module_id TEXT,
     parent_id UUID,
+    chunk_index INT DEFAULT 0,
     importance REAL DEFAULT 0.7,
     embedding VECTOR(1536)
 );
@@ -65,12 +67,82 @@ BEGIN
 END;
 $$;
 
+-- Similarity search that also returns each match's section context in the same call:
+-- the section's first chunk (the parent) and the continuation chunks within
+-- sibling_window of the match. A section's chunks share section_id, the first
+-- chunk's id, and are ordered by chunk_index. Context rows carry the similarity of
+-- the match they were added for; matched is true for the matches themselves.
+CREATE OR REPLACE FUNCTION match_course_content_with_context(
+    query_embedding VECTOR(1536),
+    match_threshold FLOAT DEFAULT 0.5,
+    match_count INT DEFAULT 5,
+    sibling_window INT DEFAULT 1
+)
+RETURNS TABLE (
+    id UUID,
+    title TEXT,
+    content TEXT,
+    url TEXT,
+    content_type TEXT,
+    similarity FLOAT,
+    section_id UUID,
+    chunk_index INT,
+    matched BOOLEAN
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH matches AS (
+        SELECT
+            cc.id AS match_id,
+            COALESCE(cc.parent_id, cc.id) AS match_section_id,
+            cc.chunk_index AS match_chunk_index,
+            1 - (cc.embedding <=> query_embedding) AS match_similarity
+        FROM course_content cc
+        WHERE 1 - (cc.embedding <=> query_embedding) > match_threshold
+        ORDER BY cc.embedding <=> query_embedding
+        LIMIT match_count
+    ),
+    context AS (
+        -- A chunk next to several matches is returned once, for its best match
+        SELECT DISTINCT ON (cc.id)
+            cc.id AS context_id,
+            m.match_section_id,
+            m.match_similarity,
+            cc.id = m.match_id AS is_match
+        FROM matches m
+        JOIN course_content cc
+            ON COALESCE(cc.parent_id, cc.id) = m.match_section_id
+            AND (cc.parent_id IS NULL OR abs(cc.chunk_index - m.match_chunk_index) <= sibling_window)
+        ORDER BY cc.id, cc.id = m.match_id DESC, m.match_similarity DESC
+    )
+    SELECT
+        cc.id,
+        cc.title,
+        cc.content,
+        cc.url,
+        cc.content_type,
+        ctx.match_similarity,
+        ctx.match_section_id,
+        cc.chunk_index,
+        ctx.is_match
+    FROM context ctx
+    JOIN course_content cc ON cc.id = ctx.context_id
+    ORDER BY ctx.match_similarity DESC, ctx.match_section_id, cc.chunk_index;
+END;
+$$;
+
 -- Create index for faster search
 CREATE INDEX IF NOT EXISTS course_content_embedding_idx ON course_content 
 USING ivfflat (embedding vector_cosine_ops)
 WITH (lists = 100);
 
+-- Index for looking up a section's continuation chunks
+CREATE INDEX IF NOT EXISTS course_content_parent_id_idx ON course_content (parent_id);
+
 -- Grant access to the Supabase service role
 GRANT ALL ON TABLE course_content TO service_role;
 GRANT ALL ON TABLE content_links TO service_role;
-GRANT EXECUTE ON FUNCTION match_course_content TO service_role; 
\ No newline at end of file
+GRANT EXECUTE ON FUNCTION match_course_content TO service_role;
+GRANT EXECUTE ON FUNCTION match_course_content_with_context TO service_role;
\ No newline at end of file
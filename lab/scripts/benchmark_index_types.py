@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Recall vs Latency Benchmark for the MCP Server's FAISS Index Types
+
+Builds every index type of mcp_course_content_server.py (with the server's own
+build_index) over synthetic clustered embeddings, then measures recall@k against
+exact flat search and single-query latency while sweeping efSearch (HNSW) and
+nprobe (IVF, IVF-PQ). No AWS calls are made.
+
+Usage:
+    python benchmark_index_types.py --sizes 10000,100000 --dim 256
+    python benchmark_index_types.py --sizes 1000000 --dim 256 --index-types flat,ivf,ivfpq
+"""
+
+import io
+import time
+import argparse
+import contextlib
+import logging
+
+import numpy as np
+import faiss
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import mcp_course_content_server as server
+
+EF_SEARCH_VALUES = [16, 32, 64, 128, 256]
+NPROBE_VALUES = [1, 4, 16, 64, 256]
+
+def synthetic_embeddings(num_vectors: int, dimension: int, num_topics: int = 200, latent_dim: int = 32,
+                         seed: int = 0) -> np.ndarray:
+    """
+    Clustered unit vectors, a rough stand-in for text embeddings: points lie near a
+    low-dimensional subspace (latent_dim) and chunks about the same topic are close
+    together. Generated in blocks to keep peak memory at one copy of the matrix.
+    """
+    # The projection and topics are fixed (seed 0) so corpus and queries share them
+    structure = np.random.default_rng(0)
+    projection = structure.standard_normal((latent_dim, dimension)).astype(np.float32) / float(np.sqrt(latent_dim))
+    topics = structure.standard_normal((num_topics, latent_dim)).astype(np.float32)
+    
+    rng = np.random.default_rng(seed)
+    matrix = np.empty((num_vectors, dimension), dtype=np.float32)
+    for start in range(0, num_vectors, 100_000):
+        rows = min(100_000, num_vectors - start)
+        latent = topics[rng.integers(num_topics, size=rows)]
+        latent += rng.standard_normal((rows, latent_dim)).astype(np.float32) * 0.5
+        block = latent @ projection
+        block += rng.standard_normal((rows, dimension)).astype(np.float32) * float(0.1 / np.sqrt(dimension))
+        faiss.normalize_L2(block)
+        matrix[start:start + rows] = block
+    return matrix
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the true top-k neighbours that were returned"""
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+def time_queries(index, queries: np.ndarray, k: int, params) -> tuple:
+    """Search one query at a time, like the server does; returns (ids, p50 ms, p95 ms)"""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, found = index.search(queries[i:i + 1], k, params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids[i] = found[0]
+    return ids, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+def benchmark_size(num_vectors: int, dimension: int, index_types, num_queries: int, k: int):
+    """Build each index type over one corpus and print its recall/latency curve"""
+    print(f"\n=== {num_vectors:,} vectors x {dimension} dims, {num_queries} queries, recall@{k} ===")
+    corpus = synthetic_embeddings(num_vectors, dimension)
+    # Queries come from the same distribution but are not in the corpus
+    queries = synthetic_embeddings(num_queries, dimension, seed=1)
+
+    flat = faiss.IndexFlatIP(dimension)
+    flat.add(corpus)
+    truth, flat_p50, flat_p95 = time_queries(flat, queries, k, None)
+    print(f"{'index':>6} {'param':>12} {'build s':>8} {'MB':>8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+    print(f"{'flat':>6} {'-':>12} {0.0:>8.1f} {flat.ntotal * dimension * 4 / 2**20:>8.0f} "
+          f"{1.0:>7.3f} {flat_p50:>8.3f} {flat_p95:>8.3f} {1.0:>7.1f}x")
+    del flat
+
+    for index_type in index_types:
+        if index_type == "flat":
+            continue
+        start = time.perf_counter()
+        index = server.build_index(corpus, index_type)
+        build_seconds = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 2**20
+
+        if index_type == "hnsw":
+            sweep = [("efSearch", value, server.search_parameters(index, ef_search=value)) for value in EF_SEARCH_VALUES]
+        else:
+            sweep = [("nprobe", value, server.search_parameters(index, nprobe=value))
+                     for value in NPROBE_VALUES if value <= index.nlist]
+
+        for name, value, params in sweep:
+            found, p50, p95 = time_queries(index, queries, k, params)
+            print(f"{index_type:>6} {f'{name}={value}':>12} {build_seconds:>8.1f} {size_mb:>8.0f} "
+                  f"{recall_at_k(found, truth):>7.3f} {p50:>8.3f} {p95:>8.3f} {flat_p50 / p50:>7.1f}x")
+        del index
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of the MCP server's FAISS index types")
+    parser.add_argument("--sizes", type=str, default="10000,100000",
+                        help="Comma-separated corpus sizes (default: 10000,100000; up to 1000000)")
+    parser.add_argument("--dim", type=int, default=256,
+                        help="Embedding dimension (Titan v2 supports 256, 512, 1024; default: 256)")
+    parser.add_argument("--index-types", type=str, default="hnsw,ivf,ivfpq",
+                        help="Comma-separated index types to compare with flat (default: hnsw,ivf,ivfpq)")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries (default: 200)")
+    parser.add_argument("-k", type=int, default=10, help="Neighbours per query (default: 10)")
+    args = parser.parse_args()
+
+    index_types = [t.strip() for t in args.index_types.split(",") if t.strip()]
+    for index_type in index_types:
+        if index_type not in server.INDEX_TYPES or index_type == "auto":
+            parser.error(f"unknown index type: {index_type}")
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        benchmark_size(size, args.dim, index_types, args.queries, args.k)
+
+if __name__ == "__main__":
+    main()
@@ -2,40 +2,177 @@
 # This notebook creates embeddings from course HTML files for use in the Module 3 Agent Lab
 
 import os
+import sys
 import json
-import boto3
+import time
+import random
+import hashlib
+import argparse
+import threading
+import contextlib
 import numpy as np
 from bs4 import BeautifulSoup
 import html2text
 from datetime import datetime
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Tuple
+
+from embedding_providers import PROVIDERS, DEFAULT_PROVIDER, TITAN_V2_DIMENSIONS, EmbeddingProvider, create_provider
+
+try:
+    import lxml.html
+except ImportError:  # The lxml parser backend is optional
+    lxml = None
+
+try:
+    import faiss
+except ImportError:  # Only needed to write the persisted search index
+    faiss = None
 
 # Configuration. Update these paths to your course directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 LAB_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, os.pardir))
 COURSE_DIR = os.path.abspath(os.path.join(LAB_DIR, os.pardir))
 OUTPUT_FILE = os.path.join(LAB_DIR, "embeddings", "course_embeddings.json")
+# JSON Lines output: one {"metadata": ...} line, then one {"chunk": ...} line per chunk
+JSONL_OUTPUT_FILE = os.path.join(LAB_DIR, "embeddings", "course_embeddings.jsonl")
+# Binary output: the embedding matrix in a .npy sidecar (memory-mappable by the MCP server)
+# plus slim JSON Lines metadata with the chunks' text but no embeddings
+NPY_OUTPUT_FILE = os.path.join(LAB_DIR, "embeddings", "course_embeddings.npy")
+NPY_METADATA_FILE = os.path.join(LAB_DIR, "embeddings", "course_embeddings.meta.jsonl")
+OUTPUT_FILES = {
+    "json": OUTPUT_FILE,
+    "jsonl": JSONL_OUTPUT_FILE,
+    "npy": NPY_METADATA_FILE,
+}
+OUTPUT_FORMATS = list(OUTPUT_FILES)
+# Serialized FAISS index and its chunk metadata, memory-mapped by the MCP server at startup
+INDEX_FILE = os.path.join(LAB_DIR, "embeddings", "course_index.faiss")
+INDEX_METADATA_FILE = os.path.join(LAB_DIR, "embeddings", "course_index.meta.jsonl")
+EMBEDDING_DTYPES = ["float32", "float16"]
 AWS_REGION = "us-west-2"  # Update if using different region
 EMBEDDING_MODEL = "amazon.titan-embed-text-v2:0"
+# Titan v2 returns 256, 512 or 1024 dimensions, already normalized to unit length;
+# 256 dimensions are a quarter of the size and about as good for retrieval
+EMBEDDING_DIMENSIONS = int(os.environ.get("EMBEDDING_DIMENSIONS", "1024"))
+# "bedrock" (needs AWS credentials) or "hashing" (deterministic, offline)
+EMBEDDING_PROVIDER = os.environ.get("EMBEDDING_PROVIDER", DEFAULT_PROVIDER)
+# Chunks embedded concurrently, and retries (with exponential backoff and jitter)
+# when Bedrock throttles or the connection drops
+EMBEDDING_WORKERS = int(os.environ.get("EMBEDDING_WORKERS", "8"))
+MAX_RETRIES = 6
+RETRY_BASE_DELAY = 0.5  # Seconds before the first retry, doubled for each further one
+RETRY_MAX_DELAY = 20.0
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+    "ModelNotReadyException", "InternalServerException", "RequestTimeout",
+}
+RETRYABLE_ERROR_TYPES = {"EndpointConnectionError", "ConnectTimeoutError", "ReadTimeoutError", "ConnectionClosedError"}
+# Embeddings of finished chunks, one JSON line each, so an interrupted run resumes
+CHECKPOINT_FILE = os.path.join(LAB_DIR, "embeddings", "course_embeddings.checkpoint.jsonl")
+# "lxml" gives identical chunks; parsing the course pages takes ~25 ms instead of ~570 ms
+HTML_PARSERS = ["html.parser", "lxml"]
+HTML_PARSER = os.environ.get("HTML_PARSER", "html.parser")
 
 print("🚀 Course Content Embeddings Generator")
 print("=" * 50)
 
-# Setup AWS Bedrock client
-try:
-    bedrock_client = boto3.client("bedrock-runtime", region_name=AWS_REGION)
-    print(f"✅ Connected to AWS Bedrock in {AWS_REGION}")
-except Exception as e:
-    print(f"❌ Failed to connect to AWS Bedrock: {e}")
-    print("Please ensure your AWS credentials are configured correctly")
-    exit(1)
+# Embedding providers are created on first use, so chunking and the offline
+# provider work without AWS credentials
+_providers: Dict[Tuple[str, int], EmbeddingProvider] = {}
+
+def get_provider(name: str = EMBEDDING_PROVIDER, max_pool_connections: int = EMBEDDING_WORKERS,
+                 dimensions: int = EMBEDDING_DIMENSIONS) -> Optional[EmbeddingProvider]:
+    """
+    Create (once) and return the named embedding provider
+    
+    Returns:
+        The provider, or None if it could not be created
+    """
+    key = (name, dimensions)
+    if key not in _providers:
+        try:
+            if name == "bedrock":
+                # At least one pooled connection per embedding thread
+                _providers[key] = create_provider(name, region=AWS_REGION, model=EMBEDDING_MODEL,
+                                                  max_pool_connections=max(10, max_pool_connections),
+                                                  dimensions=dimensions, normalize=True)
+                print(f"✅ Connected to AWS Bedrock in {AWS_REGION}")
+            else:
+                _providers[key] = create_provider(name, dimension=dimensions)
+        except Exception as e:
+            print(f"❌ Failed to create the {name} embedding provider: {e}")
+            if name == "bedrock":
+                print("Please ensure your AWS credentials are configured correctly, or use --provider hashing")
+            return None
+    return _providers[key]
+
+# A parser backend turns an HTML document into (page title, sections), where each
+# section is (section HTML, heading text or None, section id or None)
+ParsedSections = Tuple[Optional[str], List[Tuple[str, Optional[str], Optional[str]]]]
+
+def parse_sections_bs4(html_content: str) -> ParsedSections:
+    """Find the content sections of a page with BeautifulSoup's html.parser"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    title_elem = soup.find('title')
+    page_title = title_elem.get_text() if title_elem else None
+    
+    # Find all sections (or fallback to main content areas)
+    sections = soup.find_all('section')
+    if not sections:
+        sections = soup.find_all(['div'], class_=['content', 'main', 'module-section'])
+    
+    parsed = []
+    for section in sections:
+        heading = section.find(['h1', 'h2', 'h3', 'h4'])
+        parsed.append((str(section), heading.get_text() if heading else None, section.get('id')))
+    return page_title, parsed
+
+# Tags whose text BeautifulSoup's get_text() leaves out
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
 
-def extract_text_from_html(html_file_path: str) -> List[Dict[str, Any]]:
+def _lxml_text(element) -> str:
+    """Text of an lxml element, matching BeautifulSoup's get_text()"""
+    parts = [element.text or '']
+    for child in element:
+        # Comments and processing instructions have a non-string tag
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            parts.append(_lxml_text(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+def parse_sections_lxml(html_content: str) -> ParsedSections:
+    """Find the content sections of a page with lxml.html (same result, much faster)"""
+    if lxml is None:
+        raise ImportError("The lxml parser backend requires the lxml package")
+    root = lxml.html.document_fromstring(html_content)
+    title_elem = next(root.iter('title'), None)
+    page_title = _lxml_text(title_elem) if title_elem is not None else None
+    
+    sections = list(root.iter('section'))
+    if not sections:
+        wanted = {'content', 'main', 'module-section'}
+        sections = [div for div in root.iter('div') if wanted & set((div.get('class') or '').split())]
+    
+    parsed = []
+    for section in sections:
+        heading = next(section.iterdescendants('h1', 'h2', 'h3', 'h4'), None)
+        section_html = lxml.html.tostring(section, encoding='unicode', with_tail=False)
+        parsed.append((section_html, _lxml_text(heading) if heading is not None else None, section.get('id')))
+    return page_title, parsed
+
+PARSER_BACKENDS = {
+    "html.parser": parse_sections_bs4,
+    "lxml": parse_sections_lxml,
+}
+
+def extract_text_from_html(html_file_path: str, parser: str = HTML_PARSER) -> List[Dict[str, Any]]:
     """
     Extract clean text from HTML file and chunk by sections
     
     Args:
         html_file_path: Path to HTML file
+        parser: HTML parser backend, one of HTML_PARSERS
         
     Returns:
         List of content chunks with metadata
@@ -55,17 +192,10 @@ def extract_text_from_html(html_file_path: str) -> List[Dict[str, Any]]:
     h.body_width = 0  # Don't wrap lines
     
     # Parse HTML for section-based chunking
-    soup = BeautifulSoup(html_content, 'html.parser')
+    page_title, sections = PARSER_BACKENDS[parser](html_content)
     
     chunks = []
     file_name = os.path.basename(html_file_path)
-    
-    # Find all sections (or fallback to main content areas)
-    sections = soup.find_all('section')
-    
-    if not sections:
-        # Fallback: look for main content divs or just process whole file
-        sections = soup.find_all(['div'], class_=['content', 'main', 'module-section'])
         
     if not sections:
         # Last resort: process entire file as one chunk
@@ -75,68 +205,332 @@ def extract_text_from_html(html_file_path: str) -> List[Dict[str, Any]]:
                 'content': full_text.strip(),
                 'source': file_name,
                 'section_id': 'full_content',
-                'title': soup.find('title').get_text() if soup.find('title') else file_name,
+                'title': page_title if page_title is not None else file_name,
                 'word_count': len(full_text.split())
             })
     else:
         # Process each section
-        for i, section in enumerate(sections):
-            section_html = str(section)
+        for i, (section_html, heading, section_id) in enumerate(sections):
             section_text = h.handle(section_html)
             
             if len(section_text.strip()) < 50:  # Skip very short sections
                 continue
                 
             # Extract title from section
-            title_elem = section.find(['h1', 'h2', 'h3', 'h4'])
-            title = title_elem.get_text().strip() if title_elem else f"Section {i+1}"
+            title = heading.strip() if heading is not None else f"Section {i+1}"
             
             chunks.append({
                 'content': section_text.strip(),
                 'source': file_name,
-                'section_id': section.get('id', f'section_{i}'),
+                'section_id': section_id if section_id is not None else f'section_{i}',
                 'title': title,
                 'word_count': len(section_text.split())
             })
     
     return chunks
 
-def create_embedding(text: str) -> List[float]:
+def create_embedding(text: str, provider: str = EMBEDDING_PROVIDER) -> List[float]:
     """
-    Create embedding for text using AWS Bedrock Titan
+    Create embedding for text using AWS Bedrock Titan or the offline provider
     
     Args:
         text: Text to embed
+        provider: Embedding provider name, one of PROVIDERS
         
     Returns:
-        Embedding vector as list of floats
+        Embedding vector as list of floats (empty on failure)
     """
+    embedding_provider = get_provider(provider)
+    if embedding_provider is None:
+        return []
+    
     try:
-        # Titan embeddings API call
-        response = bedrock_client.invoke_model(
-            modelId=EMBEDDING_MODEL,
-            body=json.dumps({
-                "inputText": text
-            })
-        )
-        
-        response_body = json.loads(response['body'].read())
-        return response_body['embedding']
+        return embedding_provider.embed(text)
         
     except Exception as e:
         print(f"❌ Error creating embedding: {e}")
         return []
 
-def process_course_content():
+@contextlib.contextmanager
+def replaced_atomically(path: str):
+    """
+    Yield a temporary path to write, then rename it over path
+    
+    Readers never see a half-written file, and a running MCP server that memory-maps
+    the old file keeps a valid mapping until it reloads.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def is_retryable(error: Exception) -> bool:
+    """True for throttling, transient service and connection errors"""
+    # Non-botocore errors may carry a response that is None or not a dict
+    response = getattr(error, "response", None) or {}
+    code = response.get("Error", {}).get("Code") if isinstance(response, dict) else None
+    return code in RETRYABLE_ERROR_CODES or type(error).__name__ in RETRYABLE_ERROR_TYPES
+
+def embed_with_retry(embedding_provider: EmbeddingProvider, text: str, max_retries: int = MAX_RETRIES,
+                     sleep=time.sleep) -> Tuple[List[float], int]:
+    """
+    Embed text, retrying retryable errors with exponential backoff and full jitter
+    
+    Returns:
+        (embedding, number of retries)
+        
+    Raises:
+        The last error, if it is not retryable or max_retries ran out
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return embedding_provider.embed(text), attempt
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+
+def checkpoint_key(embedding_provider: EmbeddingProvider, chunk: Dict[str, Any]) -> str:
+    """Checkpoint key of a chunk: changes when its content or the embedding model or options change"""
+    return hashlib.sha256(f"{embedding_provider.cache_id}\n{chunk['content']}".encode('utf-8')).hexdigest()
+
+def load_checkpoint(checkpoint_file: str) -> Dict[str, List[float]]:
+    """Embeddings saved by an earlier, interrupted run; a torn last line is ignored"""
+    saved = {}
+    if checkpoint_file and os.path.exists(checkpoint_file):
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                saved[record["key"]] = record["embedding"]
+    return saved
+
+def embed_chunks(chunks: List[Dict[str, Any]], embedding_provider: EmbeddingProvider,
+                 workers: int = EMBEDDING_WORKERS, checkpoint_file: Optional[str] = CHECKPOINT_FILE,
+                 max_retries: int = MAX_RETRIES) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Embed chunks on a thread pool of `workers` concurrent requests
+    
+    Each finished embedding is appended to checkpoint_file, and chunks already in it
+    (same content, same model) are not embedded again, so a rerun after an
+    interruption only embeds what is missing.
+    
+    Returns:
+        (embedded chunks in their original order, chunks that failed after retries)
+    """
+    saved = load_checkpoint(checkpoint_file)
+    keys = [checkpoint_key(embedding_provider, chunk) for chunk in chunks]
+    todo = [i for i, key in enumerate(keys) if key not in saved]
+    if len(todo) < len(chunks):
+        print(f"   ♻️  Resuming: {len(chunks) - len(todo)} chunks already embedded in {checkpoint_file}")
+    
+    failed = []
+    retries = 0
+    lock = threading.Lock()
+    start = time.perf_counter()
+    checkpoint = open(checkpoint_file, 'a', encoding='utf-8') if checkpoint_file else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(embed_with_retry, embedding_provider, chunks[i]['content'], max_retries): i
+                       for i in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    embedding, attempts = future.result()
+                except Exception as e:
+                    print(f"   ⚠️  Failed to create embedding for chunk: {chunks[i]['title']} ({e})")
+                    failed.append(i)
+                    continue
+                
+                retries += attempts
+                saved[keys[i]] = embedding
+                if checkpoint:
+                    with lock:
+                        checkpoint.write(json.dumps({"key": keys[i], "embedding": embedding}) + "\n")
+                        checkpoint.flush()
+                if done % max(1, len(todo) // 10) == 0 or done == len(todo):
+                    elapsed = time.perf_counter() - start
+                    print(f"   Embedded {done}/{len(todo)} chunks ({done / elapsed:.1f} chunks/sec)")
+    finally:
+        if checkpoint:
+            checkpoint.close()
+    
+    elapsed = time.perf_counter() - start
+    if todo:
+        print(f"⏱️  Embedded {len(todo) - len(failed)} chunks in {elapsed:.1f}s "
+              f"({(len(todo) - len(failed)) / elapsed:.1f} chunks/sec, {workers} workers, {retries} retries)")
+    
+    embedded = []
+    for chunk, key in zip(chunks, keys):
+        if key in saved:
+            chunk['embedding'] = saved[key]
+            embedded.append(chunk)
+    return embedded, [chunks[i] for i in sorted(failed)]
+
+def write_embeddings(output_data: Dict[str, Any], output_file: str, output_format: str = "json",
+                     dtype: str = "float32"):
+    """
+    Write embedded chunks in the monolithic JSON, JSON Lines or .npy sidecar format
+    
+    Args:
+        output_data: {"metadata": ..., "chunks": [...]}
+        output_file: Path of the file to write (the metadata file for "npy")
+        output_format: "json" (one indented document), "jsonl" (one compact record per line)
+            or "npy" (embedding matrix in NPY_OUTPUT_FILE, chunks without embeddings in output_file)
+        dtype: Element type of the .npy matrix, one of EMBEDDING_DTYPES ("npy" only)
+    """
+    metadata = output_data["metadata"]
+    chunks = output_data["chunks"]
+    
+    if output_format == "npy":
+        matrix = np.array([chunk['embedding'] for chunk in chunks], dtype=dtype)
+        with replaced_atomically(NPY_OUTPUT_FILE) as tmp_path, open(tmp_path, 'wb') as f:
+            np.save(f, matrix)
+        metadata = {
+            **metadata,
+            # Stored relative to the metadata file so the pair can be moved together
+            "embeddings_file": os.path.relpath(NPY_OUTPUT_FILE, os.path.dirname(os.path.abspath(output_file))),
+            "embedding_dtype": dtype,
+        }
+        chunks = [{key: value for key, value in chunk.items() if key != 'embedding'} for chunk in chunks]
+    
+    with replaced_atomically(output_file) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+        if output_format in ("jsonl", "npy"):
+            f.write(json.dumps({"metadata": metadata}, ensure_ascii=False) + "\n")
+            for chunk in chunks:
+                f.write(json.dumps({"chunk": chunk}, ensure_ascii=False, separators=(',', ':')) + "\n")
+        else:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+
+def iter_embeddings(input_file: str):
+    """
+    Stream ("metadata", metadata) and then ("chunk", chunk) records from an embeddings file
+    
+    .jsonl files are read one line at a time, so memory stays flat however many chunks
+    there are; monolithic .json files are still supported but loaded in one go. When the
+    metadata names an .npy sidecar, it is memory-mapped and each chunk gets its row back.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        if input_file.endswith(".jsonl"):
+            matrix = None
+            row = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                (record_type, record), = json.loads(line).items()
+                if record_type == "metadata" and record.get("embeddings_file"):
+                    npy_path = os.path.join(os.path.dirname(os.path.abspath(input_file)), record["embeddings_file"])
+                    matrix = np.load(npy_path, mmap_mode='r')
+                elif record_type == "chunk" and matrix is not None:
+                    record['embedding'] = matrix[row].astype(np.float32).tolist()
+                    row += 1
+                yield record_type, record
+        else:
+            data = json.load(f)
+            yield "metadata", data["metadata"]
+            for chunk in data["chunks"]:
+                yield "chunk", chunk
+
+def write_search_index(output_data: Dict[str, Any]):
+    """
+    Write a FAISS inner-product index of the normalized embeddings plus its chunk metadata
+    (embeddings the provider already normalized are used as they are)
+    
+    The MCP server memory-maps INDEX_FILE instead of rebuilding the index on every start.
+    Chunks are written in index row order, without their embeddings.
+    
+    Args:
+        output_data: {"metadata": ..., "chunks": [...]}
+    """
+    if faiss is None:
+        print("⚠️  faiss not installed, skipping the search index (the MCP server will build it)")
+        return
+    
+    chunks = output_data["chunks"]
+    matrix = np.array([chunk['embedding'] for chunk in chunks], dtype=np.float32)
+    if not output_data["metadata"].get("embedding_normalized"):
+        faiss.normalize_L2(matrix)
+    index = faiss.IndexFlatIP(matrix.shape[1])
+    index.add(matrix)
+    with replaced_atomically(INDEX_FILE) as tmp_path:
+        faiss.write_index(index, tmp_path)
+    
+    metadata = {key: value for key, value in output_data["metadata"].items()
+                if key not in ("embeddings_file", "embedding_dtype")}
+    with replaced_atomically(INDEX_METADATA_FILE) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"metadata": {**metadata, "index_type": type(index).__name__}}, ensure_ascii=False) + "\n")
+        for chunk in chunks:
+            record = {key: value for key, value in chunk.items() if key != 'embedding'}
+            f.write(json.dumps({"chunk": record}, ensure_ascii=False, separators=(',', ':')) + "\n")
+    print(f"✅ Saved FAISS index with {index.ntotal} vectors to {INDEX_FILE}")
+
+def convert_embeddings(input_file: str, output_format: str, dtype: str = "float32") -> bool:
+    """
+    Rewrite an existing embeddings file in another format without calling Bedrock
+    
+    Args:
+        input_file: Embeddings file in any format
+        output_format: Target format, one of OUTPUT_FORMATS
+        dtype: Element type of the .npy matrix, one of EMBEDDING_DTYPES ("npy" only)
+    
+    Returns:
+        True if the file was converted
+    """
+    output_file = OUTPUT_FILES[output_format]
+    if os.path.abspath(input_file) == os.path.abspath(output_file):
+        print(f"❌ {input_file} is already in {output_format} format")
+        return False
+    if not os.path.exists(input_file):
+        print(f"❌ No embeddings file found at {input_file}")
+        return False
+    
+    output_data = {"metadata": {}, "chunks": []}
+    for record_type, record in iter_embeddings(input_file):
+        if record_type == "metadata":
+            output_data["metadata"] = {key: value for key, value in record.items()
+                                       if key not in ("embeddings_file", "embedding_dtype")}
+        elif record_type == "chunk":
+            output_data["chunks"].append(record)
+    
+    write_embeddings(output_data, output_file, output_format, dtype)
+    print(f"✅ Converted {len(output_data['chunks'])} chunks from {input_file} to {output_file}")
+    if output_format == "npy":
+        print(f"   Embeddings: {NPY_OUTPUT_FILE} ({os.path.getsize(NPY_OUTPUT_FILE) / 1024 / 1024:.2f} MB, {dtype})")
+    return True
+
+def process_course_content(parser: str = HTML_PARSER, output_format: str = "json", dtype: str = "float32",
+                           provider: str = EMBEDDING_PROVIDER, workers: int = EMBEDDING_WORKERS,
+                           checkpoint_file: Optional[str] = CHECKPOINT_FILE,
+                           dimensions: int = EMBEDDING_DIMENSIONS) -> bool:
     """
     Main function to process all course HTML files and create embeddings
+    
+    Args:
+        parser: HTML parser backend, one of HTML_PARSERS
+        output_format: Output format, one of OUTPUT_FORMATS
+        dtype: Element type of the .npy matrix, one of EMBEDDING_DTYPES ("npy" only)
+        provider: Embedding provider name, one of PROVIDERS
+        workers: Concurrent embedding requests
+        checkpoint_file: Where finished embeddings are saved to resume an interrupted
+            run (deleted once the output is written), or None
+        dimensions: Embedding size, one of TITAN_V2_DIMENSIONS
+    
+    Returns:
+        True if the embeddings were written
     """
+    output_file = OUTPUT_FILES[output_format]
     print(f"\n📂 Processing course content from: {COURSE_DIR}")
+    print(f"   HTML parser: {parser}")
     
     if not os.path.exists(COURSE_DIR):
         print(f"❌ Course directory not found: {COURSE_DIR}")
         print("Please update COURSE_DIR variable to point to your course content")
-        return
+        return False
     
     all_chunks = []
     processed_files = []
@@ -145,7 +539,7 @@ def process_course_content():
     index_path = os.path.join(COURSE_DIR, "index.html")
     if os.path.exists(index_path):
         print(f"📄 Processing: index.html")
-        chunks = extract_text_from_html(index_path)
+        chunks = extract_text_from_html(index_path, parser)
         all_chunks.extend(chunks)
         processed_files.append("index.html")
     
@@ -157,7 +551,7 @@ def process_course_content():
         for html_file in sorted(html_files):
             print(f"📄 Processing: pages/{html_file}")
             file_path = os.path.join(pages_dir, html_file)
-            chunks = extract_text_from_html(file_path)
+            chunks = extract_text_from_html(file_path, parser)
             all_chunks.extend(chunks)
             processed_files.append(f"pages/{html_file}")
     
@@ -168,30 +562,27 @@ def process_course_content():
     
     if not all_chunks:
         print("❌ No content found to process")
-        return
+        return False
     
     # Create embeddings
-    print(f"\n🧠 Creating embeddings using {EMBEDDING_MODEL}...")
+    embedding_provider = get_provider(provider, workers, dimensions)
+    if embedding_provider is None:
+        return False
+    print(f"\n🧠 Creating embeddings using {embedding_provider.model_id} ({embedding_provider.name})...")
     print("This may take a few minutes depending on content size...")
     
-    embedded_chunks = []
-    
-    for i, chunk in enumerate(all_chunks):
-        print(f"   Processing chunk {i+1}/{len(all_chunks)}: {chunk['title'][:50]}...")
-        
-        embedding = create_embedding(chunk['content'])
-        
-        if embedding:
-            chunk['embedding'] = embedding
-            embedded_chunks.append(chunk)
-        else:
-            print(f"   ⚠️  Failed to create embedding for chunk: {chunk['title']}")
+    embedded_chunks, failed_chunks = embed_chunks(all_chunks, embedding_provider, workers, checkpoint_file)
+    if failed_chunks:
+        # An incomplete corpus is not written; the checkpoint keeps the finished chunks
+        print(f"❌ {len(failed_chunks)} chunks could not be embedded. Run the command again to "
+              f"retry them; the {len(embedded_chunks)} finished chunks are kept in {checkpoint_file}")
+        return False
     
     # Prepare final output
     output_data = {
         "metadata": {
             "created_at": datetime.now().isoformat(),
-            "embedding_model": EMBEDDING_MODEL,
+            **embedding_provider.metadata(),
             "chunk_count": len(embedded_chunks),
             "total_words": sum(chunk['word_count'] for chunk in embedded_chunks),
             "embedding_dimension": len(embedded_chunks[0]['embedding']) if embedded_chunks else 0,
@@ -201,18 +592,23 @@ def process_course_content():
     }
     
     # Save to file
-    print(f"\n💾 Saving embeddings to: {OUTPUT_FILE}")
+    print(f"\n💾 Saving embeddings to: {output_file}")
     
     try:
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        write_embeddings(output_data, output_file, output_format, dtype)
         
         print(f"✅ Successfully saved {len(embedded_chunks)} embedded chunks")
-        print(f"   File size: {os.path.getsize(OUTPUT_FILE) / 1024 / 1024:.1f} MB")
+        print(f"   File size: {os.path.getsize(output_file) / 1024 / 1024:.1f} MB")
+        
+        # Written after the embeddings so the index is never older than its source data
+        write_search_index(output_data)
         
     except Exception as e:
         print(f"❌ Error saving embeddings: {e}")
-        return
+        return False
+    
+    if checkpoint_file and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
     
     # Validate the output
     print(f"\n🔍 Validation:")
@@ -222,56 +618,92 @@ def process_course_content():
         print(f"      - {chunk['title']} ({chunk['word_count']} words)")
     
     print(f"\n🎉 Embeddings creation complete!")
-    print(f"Use '{OUTPUT_FILE}' in your Module 3 Agent Lab")
+    print(f"Use '{output_file}' in your Module 3 Agent Lab")
+    return True
 
-def test_embeddings():
+def test_embeddings(output_format: str = "json") -> bool:
     """
     Test function to verify embeddings work correctly
+    
+    Args:
+        output_format: Format of the file to test, one of OUTPUT_FORMATS
+    
+    Returns:
+        True if the file is valid
     """
-    if not os.path.exists(OUTPUT_FILE):
+    output_file = OUTPUT_FILES[output_format]
+    if not os.path.exists(output_file):
         print("❌ No embeddings file found. Run process_course_content() first.")
-        return
+        return False
     
-    print(f"\n🧪 Testing embeddings from {OUTPUT_FILE}")
+    print(f"\n🧪 Testing embeddings from {output_file}")
     
     try:
-        with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        metadata = None
+        chunk_count = 0
+        sample_embeddings = []
         
-        chunks = data['chunks']
-        metadata = data['metadata']
+        # Stream the records; only the first two embeddings are kept
+        for record_type, record in iter_embeddings(output_file):
+            if record_type == "metadata":
+                metadata = record
+            elif record_type == "chunk":
+                chunk_count += 1
+                if len(sample_embeddings) < 2:
+                    sample_embeddings.append(record['embedding'])
         
-        print(f"✅ Loaded {len(chunks)} chunks")
+        print(f"✅ Loaded {chunk_count} chunks")
         print(f"✅ Embedding dimension: {metadata['embedding_dimension']}")
         
         # Test similarity calculation
-        if len(chunks) >= 2:
-            emb1 = np.array(chunks[0]['embedding'])
-            emb2 = np.array(chunks[1]['embedding'])
+        if len(sample_embeddings) >= 2:
+            emb1 = np.array(sample_embeddings[0])
+            emb2 = np.array(sample_embeddings[1])
             
             # Cosine similarity
             similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
             print(f"✅ Sample similarity score: {similarity:.3f}")
         
         print("✅ Embeddings file is valid and ready for use!")
+        return True
         
     except Exception as e:
         print(f"❌ Error testing embeddings: {e}")
+        return False
 
 # Main execution
 if __name__ == "__main__":
-    print("Choose an option:")
-    print("1. Create embeddings from course content")
-    print("2. Test existing embeddings file")
+    arg_parser = argparse.ArgumentParser(description="Create or test course content embeddings")
+    arg_parser.add_argument("command", choices=["create", "test", "convert"],
+                            help=f"create: embed the course content; test: check the --format file; "
+                                 f"convert: rewrite {os.path.basename(OUTPUT_FILE)} in --format without embedding")
+    arg_parser.add_argument("--parser", choices=HTML_PARSERS, default=HTML_PARSER,
+                            help=f"HTML parser backend (default: {HTML_PARSER})")
+    arg_parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json",
+                            help="Embeddings file format: indented JSON, streamable JSON Lines, or a .npy "
+                                 "matrix with slim JSON Lines metadata (default: json)")
+    arg_parser.add_argument("--dtype", choices=EMBEDDING_DTYPES, default="float32",
+                            help="Element type of the .npy matrix; float16 halves its size (default: float32)")
+    arg_parser.add_argument("--provider", choices=list(PROVIDERS), default=EMBEDDING_PROVIDER,
+                            help="Embedding provider: AWS Bedrock Titan, or deterministic offline hashing "
+                                 f"that needs no credentials (default: {EMBEDDING_PROVIDER})")
+    arg_parser.add_argument("--workers", type=int, default=EMBEDDING_WORKERS,
+                            help=f"Concurrent embedding requests (default: {EMBEDDING_WORKERS}, or set EMBEDDING_WORKERS)")
+    arg_parser.add_argument("--dimensions", type=int, choices=TITAN_V2_DIMENSIONS, default=EMBEDDING_DIMENSIONS,
+                            help="Embedding size; Titan v2 returns these already normalized "
+                                 f"(default: {EMBEDDING_DIMENSIONS}, or set EMBEDDING_DIMENSIONS)")
+    arg_parser.add_argument("--no-resume", action="store_true",
+                            help="Discard the checkpoint of an interrupted run and embed every chunk again")
+    args = arg_parser.parse_args()
     
-    choice = input("\nEnter choice (1 or 2): ").strip()
-    
-    if choice == "1":
-        process_course_content()
-    elif choice == "2":
-        test_embeddings()
+    if args.command == "create":
+        if args.no_resume and os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
+        succeeded = process_course_content(args.parser, args.format, args.dtype, args.provider, args.workers,
+                                           dimensions=args.dimensions)
+    elif args.command == "test":
+        succeeded = test_embeddings(args.format)
     else:
-        print("Invalid choice. Please run the notebook again.")
-
-# Uncomment the line below to run automatically without input
-# process_course_content()
\ No newline at end of file
+        succeeded = convert_embeddings(OUTPUT_FILE, args.format, args.dtype)
+    
+    sys.exit(0 if succeeded else 1)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Embedding Providers for the Module 3 Course Content Search
+
+Both course_embeddings_generator.py and mcp_course_content_server.py create their
+embeddings through a provider, so the course content can be indexed and searched
+either with AWS Bedrock or fully offline:
+
+- "bedrock": Amazon Titan text embeddings through the Bedrock runtime (needs AWS credentials)
+- "hashing": deterministic local embeddings (signed feature hashing of word unigrams
+  and bigrams). No network, no model download, thousands of queries per second;
+  lexical rather than semantic similarity, so it suits development, tests and benchmarks.
+
+The provider name and model id are recorded in the embeddings metadata, and the
+server embeds queries with the same provider that embedded the course content.
+"""
+
+import re
+import json
+import math
+import hashlib
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+DEFAULT_PROVIDER = "bedrock"
+BEDROCK_REGION = "us-west-2"
+BEDROCK_MODEL = "amazon.titan-embed-text-v2:0"
+# Output sizes Titan Text Embeddings v2 can return (and normalize) itself
+TITAN_V2_DIMENSIONS = [256, 512, 1024]
+HASHING_DIMENSION = 1024
+
+# Very common words carry no signal for lexical matching
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have how i if in into is it its of on "
+    "or so such that the their then there these they this to was we what when where which "
+    "while who why will with you your".split()
+)
+
+class EmbeddingProvider:
+    """Interface of an embedding provider"""
+
+    name = ""
+    # Cosine similarity below which a search result is not relevant
+    min_relevance = 0.3
+    # True if embeddings come back with unit length, so callers need not normalize them
+    normalized = False
+    # Length of the embeddings, if known before the first one is made
+    dimension: Optional[int] = None
+
+    @property
+    def model_id(self) -> str:
+        """Identifier of the embedding model (recorded in metadata)"""
+        raise NotImplementedError
+
+    @property
+    def cache_id(self) -> str:
+        """Identifier of the model and options, for keys of cached embeddings"""
+        return f"{self.model_id}/{self.dimension or 'default'}/{'normalized' if self.normalized else 'raw'}"
+
+    def embed(self, text: str) -> List[float]:
+        """Embedding of one text"""
+        raise NotImplementedError
+
+    def metadata(self) -> Dict[str, Any]:
+        """Fields recorded in the embeddings metadata"""
+        return {"embedding_provider": self.name, "embedding_model": self.model_id,
+                "embedding_normalized": self.normalized}
+
+class BedrockEmbeddingProvider(EmbeddingProvider):
+    """
+    Amazon Titan text embeddings through AWS Bedrock
+
+    Titan v2 can return 256, 512 or 1024 dimensions (dimensions) and unit-length
+    vectors (normalize), which saves normalizing them again at index and query time.
+    """
+
+    name = "bedrock"
+
+    def __init__(self, region: str = BEDROCK_REGION, model: str = BEDROCK_MODEL,
+                 max_pool_connections: int = 10, client=None,
+                 dimensions: Optional[int] = None, normalize: bool = False):
+        if dimensions is not None and dimensions not in TITAN_V2_DIMENSIONS:
+            raise ValueError(f"Titan v2 returns {', '.join(map(str, TITAN_V2_DIMENSIONS))} dimensions, not {dimensions}")
+        self.region = region
+        self.model = model
+        self.dimension = dimensions
+        self.normalized = normalize
+        if client is None:
+            # Imported here so the offline provider works without boto3
+            import boto3
+            from botocore.config import Config
+            client = boto3.client("bedrock-runtime", region_name=region,
+                                  config=Config(max_pool_connections=max_pool_connections))
+        self.client = client
+
+    @property
+    def model_id(self) -> str:
+        return self.model
+
+    def embed(self, text: str) -> List[float]:
+        body = {"inputText": text}
+        if self.dimension:
+            body["dimensions"] = self.dimension
+        if self.normalized:
+            body["normalize"] = True
+        response = self.client.invoke_model(
+            modelId=self.model,
+            body=json.dumps(body)
+        )
+        return json.loads(response['body'].read())['embedding']
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic offline embeddings by signed feature hashing
+
+    Lower-cased word unigrams and bigrams (stopwords dropped) are hashed with BLAKE2b
+    into `dimension` buckets with a random sign, weighted by 1 + log(term frequency),
+    and L2-normalized. The same text always gives the same vector on every machine.
+    """
+
+    name = "hashing"
+    # Short queries share few features with long chunks, so lexical scores run lower
+    min_relevance = 0.1
+    normalized = True
+
+    def __init__(self, dimension: int = HASHING_DIMENSION):
+        self.dimension = dimension
+
+    @property
+    def model_id(self) -> str:
+        return f"hashing-unigram-bigram-{self.dimension}"
+
+    def _features(self, text: str) -> Dict[str, int]:
+        words = [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+        counts = {}
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature, count in self._features(text).items():
+            digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+            sign = 1.0 if digest >> 63 else -1.0
+            vector[digest % self.dimension] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+PROVIDERS = {
+    "bedrock": BedrockEmbeddingProvider,
+    "hashing": HashingEmbeddingProvider,
+}
+
+def create_provider(name: str = DEFAULT_PROVIDER, **kwargs) -> EmbeddingProvider:
+    """Create the embedding provider registered under name"""
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider: {name} (choose from {', '.join(PROVIDERS)})")
+    return PROVIDERS[name](**kwargs)
+
+def provider_from_metadata(metadata: Dict[str, Any], override: Optional[str] = None,
+                           region: str = BEDROCK_REGION, max_pool_connections: int = 10) -> EmbeddingProvider:
+    """
+    Create the provider that produced an embeddings file, to embed queries against it
+
+    Files written before providers existed have no "embedding_provider" and were
+    made with Bedrock. An override must match the recorded provider, since query and
+    content embeddings from different providers are not comparable.
+    """
+    recorded = metadata.get("embedding_provider", "bedrock")
+    if override and override != recorded:
+        raise ValueError(f"Embeddings were created with the {recorded} provider, not {override}")
+    if recorded == "bedrock":
+        # Queries must be embedded with the same size and normalization as the content
+        model = metadata.get("embedding_model", BEDROCK_MODEL)
+        dimension = metadata.get("embedding_dimension")
+        return create_provider(recorded, region=region, model=model, max_pool_connections=max_pool_connections,
+                               dimensions=dimension if model.startswith("amazon.titan-embed-text-v2") else None,
+                               normalize=metadata.get("embedding_normalized", False))
+    if recorded == "hashing":
+        return create_provider(recorded, dimension=metadata.get("embedding_dimension") or HASHING_DIMENSION)
+    return create_provider(recorded)
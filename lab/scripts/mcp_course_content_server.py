@@ -4,7 +4,8 @@ MCP Server for Course Content Search
 
 This server exposes the course content search functionality via the Model Context Protocol.
 It provides a standardized interface for searching through AI/ML course materials using
-semantic similarity with FAISS and AWS Bedrock embeddings.
+semantic similarity with FAISS and AWS Bedrock embeddings (or the offline hashing
+provider of embedding_providers.py).
 
 Usage:
     python course_content_server.py
@@ -13,21 +14,34 @@ For development/testing:
     mcp dev course_content_server.py
 """
 
+import os
 import json
 import sys
+import time
+import asyncio
+import argparse
 import logging
+import threading
+import contextlib
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+
+# Process start, for the time-to-ready reported by get_server_status
+PROCESS_START = time.perf_counter()
 
 # MCP imports
 from mcp.server.fastmcp import FastMCP
 
 # Course content search dependencies
-import boto3
 import numpy as np
 import faiss
 
+from embedding_providers import PROVIDERS, EmbeddingProvider, provider_from_metadata
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,7 +49,260 @@ logger = logging.getLogger(__name__)
 # Configuration constants
 AWS_REGION = "us-west-2"
 EMBEDDINGS_FILE = "../embeddings/course_embeddings.json"  # Relative path from lab directory
-EMBEDDING_MODEL = "amazon.titan-embed-text-v2:0"
+EMBEDDINGS_JSONL_FILE = "../embeddings/course_embeddings.jsonl"  # Streamable JSON Lines variant
+EMBEDDINGS_METADATA_FILE = "../embeddings/course_embeddings.meta.jsonl"  # Slim metadata for the .npy sidecar
+INDEX_ADD_BLOCK_SIZE = 4096  # Rows copied from a memory-mapped matrix per index.add() call
+INDEX_FILE = "../embeddings/course_index.faiss"  # Serialized FAISS index (normalized vectors)
+INDEX_METADATA_FILE = "../embeddings/course_index.meta.jsonl"  # Chunks in index row order, without embeddings
+# The provider recorded in the embeddings metadata embeds queries. Setting this only
+# checks that it matches ("bedrock" or "hashing"); it cannot switch providers.
+EMBEDDING_PROVIDER = os.environ.get("COURSE_EMBEDDING_PROVIDER")
+MAX_BATCH_QUERIES = 20  # Queries accepted by one search_content_batch call
+BEDROCK_WORKERS = 8  # Thread pool for Bedrock embedding calls, shared by all tool calls
+QUERY_CACHE_SIZE = int(os.environ.get("COURSE_QUERY_CACHE_SIZE", "1024"))  # Query embeddings kept in memory
+QUERY_CACHE_FILE = os.environ.get("COURSE_QUERY_CACHE_FILE")  # Optional JSON Lines file persisting the cache
+# Chunk fields search_content can filter on, with FAISS ID selectors
+FILTER_FIELDS = ("source", "section_id")
+# Seconds between checks of the embeddings and index files for hot reload (0 disables)
+RELOAD_INTERVAL = float(os.environ.get("COURSE_RELOAD_INTERVAL", "2"))
+
+# Index types: exact "flat" search, or approximate "hnsw", "ivf" and "ivfpq" for large corpora.
+# "auto" picks flat below AUTO_FLAT_MAX_VECTORS and HNSW above. IVF-PQ trades recall for a
+# ~16x smaller index, so it is only used when asked for (see benchmark_index_types.py).
+INDEX_TYPES = ["auto", "flat", "hnsw", "ivf", "ivfpq"]
+INDEX_TYPE = os.environ.get("COURSE_INDEX_TYPE", "auto")
+AUTO_FLAT_MAX_VECTORS = 10_000
+INDEX_CLASS_TYPES = {
+    "IndexFlatIP": "flat",
+    "IndexHNSWFlat": "hnsw",
+    "IndexIVFFlat": "ivf",
+    "IndexIVFPQ": "ivfpq",
+}
+HNSW_M = 32  # Graph neighbours per node
+HNSW_EF_CONSTRUCTION = 80
+PQ_SUBVECTOR_DIM = 8  # IVF-PQ stores one 8-bit code per 8 dimensions (128 bytes for 1024 dims)
+IVF_TRAINING_POINTS_PER_LIST = 39  # FAISS k-means warns below 39 training points per centroid
+
+def resolve_index_type(index_type: str, num_vectors: int) -> str:
+    """Turn "auto" into a concrete index type for a corpus of num_vectors"""
+    if index_type != "auto":
+        return index_type
+    return "flat" if num_vectors < AUTO_FLAT_MAX_VECTORS else "hnsw"
+
+def ivf_nlist(num_vectors: int) -> int:
+    """Number of IVF lists: ~4*sqrt(N), with enough training points per list"""
+    return max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // IVF_TRAINING_POINTS_PER_LIST))
+
+def _normalized_rows(matrix, rows, normalized: bool = False) -> np.ndarray:
+    """Copy some rows of a (possibly memory-mapped, float16) matrix as normalized float32"""
+    block = np.array(matrix[rows], dtype=np.float32)
+    if not normalized:
+        faiss.normalize_L2(block)
+    return block
+
+def build_index(matrix, index_type: str = "auto", block_size: int = INDEX_ADD_BLOCK_SIZE,
+                normalized: bool = False):
+    """
+    Build an inner-product FAISS index over the L2-normalized rows of matrix
+    
+    Args:
+        matrix: (N, d) embeddings, possibly a read-only float16 memory map
+        index_type: One of INDEX_TYPES
+        block_size: Rows normalized and added per index.add() call
+        normalized: The rows already have unit length (e.g. Titan v2 with normalize: true)
+        
+    Returns:
+        The populated FAISS index
+    """
+    num_vectors, dimension = matrix.shape
+    index_type = resolve_index_type(index_type, num_vectors)
+    
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dimension)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type in ("ivf", "ivfpq"):
+        nlist = ivf_nlist(num_vectors)
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            if dimension % PQ_SUBVECTOR_DIM:
+                raise ValueError(f"IVF-PQ needs a dimension divisible by {PQ_SUBVECTOR_DIM}, got {dimension}")
+            # 8-bit codes need 256 centroids per sub-quantizer; use fewer bits for tiny corpora
+            nbits = int(min(8, np.log2(max(2, num_vectors // IVF_TRAINING_POINTS_PER_LIST))))
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, dimension // PQ_SUBVECTOR_DIM, nbits,
+                                     faiss.METRIC_INNER_PRODUCT)
+        # Train on a random sample large enough for both k-means stages
+        sample_size = min(num_vectors, max(nlist, 256) * 64)
+        sample = np.sort(np.random.default_rng(0).choice(num_vectors, sample_size, replace=False))
+        index.train(_normalized_rows(matrix, sample, normalized))
+    else:
+        raise ValueError(f"Unknown index type: {index_type} (choose from {', '.join(INDEX_TYPES)})")
+    
+    # Normalize and add one block at a time, so a memory-mapped matrix is never fully duplicated
+    for start in range(0, num_vectors, block_size):
+        index.add(_normalized_rows(matrix, slice(start, start + block_size), normalized))
+    return index
+
+def index_type_of(index) -> str:
+    """Index type name ("flat", "hnsw", ...) of a FAISS index"""
+    return INDEX_CLASS_TYPES.get(type(index).__name__, type(index).__name__)
+
+def search_parameters(index, ef_search: Optional[int] = None, nprobe: Optional[int] = None, selector=None):
+    """
+    Per-query FAISS search parameters for the knobs that apply to this index, or None
+    
+    selector (a faiss.IDSelector) restricts the search to some rows, inside the search.
+    """
+    index_type = index_type_of(index)
+    if index_type == "hnsw" and (ef_search or selector):
+        return faiss.SearchParametersHNSW(efSearch=ef_search or index.hnsw.efSearch, sel=selector)
+    if index_type in ("ivf", "ivfpq") and (nprobe or selector):
+        return faiss.SearchParametersIVF(nprobe=nprobe or index.nprobe, sel=selector)
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)
+    return None
+
+def build_filter_ids(chunks: List[Dict[str, Any]]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Index row ids of the chunks for each value of the FILTER_FIELDS, computed once per index"""
+    rows = {field: {} for field in FILTER_FIELDS}
+    for row, chunk in enumerate(chunks):
+        for field in FILTER_FIELDS:
+            if chunk.get(field) is not None:
+                rows[field].setdefault(chunk[field], []).append(row)
+    return {field: {value: np.array(ids, dtype=np.int64) for value, ids in values.items()}
+            for field, values in rows.items()}
+
+def filter_rows(filter_ids: Dict[str, Dict[str, np.ndarray]], source: Optional[str] = None,
+                section_id: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    Row ids matching all the given filters, or None when there are no filters
+    
+    Raises:
+        ValueError: For a source or section_id no chunk has
+    """
+    rows = None
+    for field, value in (("source", source), ("section_id", section_id)):
+        if value is None:
+            continue
+        values = filter_ids.get(field, {})
+        if value not in values:
+            available = f" (available: {', '.join(sorted(values))})" if field == "source" else ""
+            raise ValueError(f"Unknown {field}: {value}{available}")
+        rows = values[value] if rows is None else np.intersect1d(rows, values[value])
+    return rows
+
+def file_version(path) -> Optional[tuple]:
+    """(mtime_ns, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+@contextlib.contextmanager
+def replaced_atomically(path: str):
+    """
+    Yield a temporary path to write, then rename it over path
+    
+    A memory-mapped index keeps mapping the old file (searches in flight on it stay
+    valid), and the reload watcher never sees a half-written file.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a query for embedding and caching: NFKC, collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings, keyed by model id and normalized query text.
+    
+    With a cache file, every new embedding is appended as one JSON line and the file is
+    replayed (and compacted) at startup, so repeated queries survive server restarts.
+    Also keeps hit/miss counts and recent Bedrock embedding latencies for get_server_status.
+    """
+    
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, cache_file: Optional[str] = QUERY_CACHE_FILE):
+        self.max_entries = max_entries
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.latencies_ms = deque(maxlen=1000)
+        self.lock = threading.Lock()
+        if self.cache_file:
+            self._load()
+    
+    @staticmethod
+    def key(model_id: str, query: str) -> str:
+        return f"{model_id}\n{normalize_query(query)}"
+    
+    def get(self, key: str) -> Optional[List[float]]:
+        with self.lock:
+            embedding = self.entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+    
+    def put(self, key: str, embedding: List[float], latency_ms: float):
+        with self.lock:
+            self.latencies_ms.append(latency_ms)
+            self._insert(key, embedding)
+            if self.cache_file:
+                try:
+                    with open(self.cache_file, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps({"key": key, "embedding": embedding}) + "\n")
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not persist query embedding: {e}")
+    
+    def _insert(self, key: str, embedding: List[float]):
+        self.entries[key] = embedding
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def _load(self):
+        """Replay the cache file, keeping the most recent entries, and rewrite it compacted"""
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._insert(record["key"], record["embedding"])
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                for key, embedding in self.entries.items():
+                    f.write(json.dumps({"key": key, "embedding": embedding}) + "\n")
+            logger.info(f"✅ Loaded {len(self.entries)} cached query embeddings from {self.cache_file}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable query cache {self.cache_file}: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries, hits, lookups = len(self.entries), self.hits, self.hits + self.misses
+            latencies = list(self.latencies_ms)
+        return {
+            "entries": entries,
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": hits / lookups if lookups else None,
+            "embedding_calls": len(latencies),
+            "embedding_p50_ms": float(np.percentile(latencies, 50)) if latencies else None,
+            "embedding_p95_ms": float(np.percentile(latencies, 95)) if latencies else None,
+        }
 
 @dataclass
 class SearchResult:
@@ -51,11 +318,31 @@ class CourseContentSearcher:
     This class encapsulates all the FAISS and embedding functionality.
     """
     
-    def __init__(self):
-        self.bedrock_client = None
+    def __init__(self, index_type: str = INDEX_TYPE):
+        self.index_type = index_type
+        self.expected_provider = EMBEDDING_PROVIDER
+        self.embedding_provider: Optional[EmbeddingProvider] = None
+        self.embeddings_metadata: Dict[str, Any] = {}
+        self.filter_ids: Dict[str, Dict[str, np.ndarray]] = {}  # See build_filter_ids
         self.search_index = None
         self.content_chunks = []
         self.is_initialized = False
+        self.index_source = None  # "persisted" (memory-mapped) or "rebuilt"
+        self.index_load_seconds = None
+        self.time_to_ready_seconds = None
+        self.query_cache = QueryEmbeddingCache()
+        # Hot reload: searches take a consistent (index, chunks, provider) snapshot under
+        # index_lock, and a reload builds the new index before swapping it in under it
+        self.index_lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+        self.stop_watching = threading.Event()
+        self.index_version = None  # Versions of the files the served index was loaded from
+        self.failed_version = None  # Files that failed to load, not retried until they change
+        self.reload_count = 0
+        self.reload_failures = 0
+        self.last_reload_at = None
+        # Bedrock calls run here, so concurrent tool calls do not wait on each other
+        self.bedrock_executor = ThreadPoolExecutor(max_workers=BEDROCK_WORKERS, thread_name_prefix="bedrock")
     
     def initialize(self) -> bool:
         """
@@ -63,48 +350,314 @@ class CourseContentSearcher:
         Returns True if successful, False otherwise.
         """
         try:
-            # Initialize AWS Bedrock client
-            self.bedrock_client = boto3.client("bedrock-runtime", region_name=AWS_REGION)
-            logger.info("✅ Connected to AWS Bedrock")
+            start = time.perf_counter()
+            
+            loaded = self._load_index()
+            if not loaded:
+                return False
+            self._swap_index(loaded)
             
+            self.index_load_seconds = time.perf_counter() - start
+            self.time_to_ready_seconds = time.perf_counter() - PROCESS_START
+            self.is_initialized = True
+            logger.info(f"✅ Course content searcher initialized with {len(self.content_chunks)} chunks "
+                        f"({self.index_source} index in {self.index_load_seconds * 1000:.0f} ms, "
+                        f"ready {self.time_to_ready_seconds:.2f}s after start)")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize searcher: {e}")
+            return False
+    
+    def _load_index(self) -> Optional[Dict[str, Any]]:
+        """
+        Load the search index without touching the one being served
+        
+        Returns {"index", "chunks", "metadata", "provider", "source", "version"}, or None
+        if no index could be loaded.
+        """
+        embeddings_version = self._embeddings_version()
+        
+        # Prefer the persisted index; rebuild only when it is missing or stale
+        index, chunks, metadata, source = None, [], {}, "persisted"
+        if self._persisted_index_is_fresh():
+            index, chunks, metadata = self._load_persisted_index()
+        
+        if not index:
             # Load embeddings data
             embeddings_data = self._load_embeddings()
             if not embeddings_data:
-                return False
+                return None
             
             # Create search index
-            self.search_index, self.content_chunks = self._create_search_index(embeddings_data)
-            if not self.search_index:
+            index, chunks = self._create_search_index(embeddings_data)
+            if not index:
+                return None
+            metadata, source = embeddings_data['metadata'], "rebuilt"
+            self._save_persisted_index(index, chunks, metadata)
+        
+        # Queries are embedded by the provider that embedded the course content
+        provider = self._provider_for(metadata)
+        if provider.dimension and provider.dimension != index.d:
+            raise ValueError(f"{provider.model_id} makes {provider.dimension}-dimensional query embeddings, "
+                             f"the index has {index.d} dimensions")
+        logger.info(f"✅ Embedding queries with {provider.model_id} ({provider.name})")
+        
+        return {
+            "index": index, "chunks": chunks, "metadata": metadata, "provider": provider, "source": source,
+            # Read after saving, so the rebuilt index's own files do not look like a change
+            "version": (embeddings_version, file_version(INDEX_FILE), file_version(INDEX_METADATA_FILE)),
+        }
+    
+    def _provider_for(self, metadata: Dict[str, Any]) -> EmbeddingProvider:
+        """The embedding provider for metadata, reusing the current one (and its Bedrock connections) if its model and options match"""
+        provider = provider_from_metadata(
+            metadata, self.expected_provider,
+            # One pooled Bedrock connection per embedding thread
+            region=AWS_REGION, max_pool_connections=BEDROCK_WORKERS
+        )
+        current = self.embedding_provider
+        if current and current.cache_id == provider.cache_id:
+            return current
+        return provider
+    
+    def _swap_index(self, loaded: Dict[str, Any]):
+        """Atomically replace the served index; searches already running keep their snapshot"""
+        with self.index_lock:
+            self.search_index = loaded['index']
+            self.content_chunks = loaded['chunks']
+            self.filter_ids = build_filter_ids(loaded['chunks'])
+            self.embedding_provider = loaded['provider']
+            self.embeddings_metadata = loaded['metadata']
+            self.index_source = loaded['source']
+            self.index_version = loaded['version']
+    
+    def _snapshot(self) -> tuple:
+        """The (index, chunks, provider, filter_ids) being served, read together"""
+        with self.index_lock:
+            return self.search_index, self.content_chunks, self.embedding_provider, self.filter_ids
+    
+    def _embeddings_version(self) -> Optional[tuple]:
+        """Path and version of the embeddings file the index is built from"""
+        embeddings_path = self._embeddings_path()
+        if embeddings_path is None:
+            return None
+        return str(embeddings_path), file_version(embeddings_path)
+    
+    def artifact_version(self) -> tuple:
+        """Current versions of the embeddings and persisted index files"""
+        return self._embeddings_version(), file_version(INDEX_FILE), file_version(INDEX_METADATA_FILE)
+    
+    def reload(self) -> bool:
+        """
+        Load the index again in the calling thread and swap it in
+        
+        The old index keeps serving until the new one is ready, and stays in use if
+        the new one fails to load. Returns True if a new index was swapped in.
+        """
+        with self.reload_lock:
+            start = time.perf_counter()
+            version = self.artifact_version()
+            try:
+                loaded = self._load_index()
+            except Exception as e:
+                logger.error(f"❌ Error reloading index: {e}")
+                loaded = None
+            
+            if not loaded:
+                self.reload_failures += 1
+                self.failed_version = version
+                logger.warning("⚠️ Reload failed, still serving the previous index")
                 return False
             
-            self.is_initialized = True
-            logger.info(f"✅ Course content searcher initialized with {len(self.content_chunks)} chunks")
+            self._swap_index(loaded)
+            self.reload_count += 1
+            self.last_reload_at = time.time()
+            self.index_load_seconds = time.perf_counter() - start
+            logger.info(f"🔄 Reloaded {self.index_source} index with {len(loaded['chunks'])} chunks "
+                        f"in {self.index_load_seconds * 1000:.0f} ms")
+            return True
+    
+    def reload_if_changed(self) -> bool:
+        """Reload if the files changed since the served index was loaded (and not to a version that failed)"""
+        version = self.artifact_version()
+        if version == self.index_version or version == self.failed_version:
+            return False
+        return self.reload()
+    
+    def watch(self, interval: float = RELOAD_INTERVAL):
+        """
+        Poll the embeddings and index files every interval seconds and hot-reload on change
+        
+        Blocks until stop_watching is set. The generator replaces several files in turn,
+        so a change is only picked up once the files are unchanged for one interval.
+        """
+        pending = None
+        while not self.stop_watching.wait(interval):
+            try:
+                version = self.artifact_version()
+                if version == self.index_version or version == self.failed_version:
+                    pending = None
+                elif version != pending:
+                    pending = version
+                else:
+                    pending = None
+                    self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"❌ Error watching index files: {e}")
+    
+    def start_watching(self, interval: float = RELOAD_INTERVAL) -> threading.Thread:
+        """Run watch() on a daemon thread"""
+        self.stop_watching.clear()
+        thread = threading.Thread(target=self.watch, args=(interval,), name="index-watcher", daemon=True)
+        thread.start()
+        logger.info(f"👀 Watching {Path(EMBEDDINGS_FILE).parent} for new embeddings every {interval:g}s")
+        return thread
+    
+    def _persisted_index_is_fresh(self) -> bool:
+        """True if the persisted index exists and is at least as new as the embeddings data"""
+        index_path, metadata_path = Path(INDEX_FILE), Path(INDEX_METADATA_FILE)
+        if not (index_path.exists() and metadata_path.exists()):
+            logger.info(f"ℹ️ No persisted index at {INDEX_FILE}, building one")
+            return False
+        
+        embeddings_path = self._embeddings_path()
+        if embeddings_path is None:
             return True
+        built_at = min(index_path.stat().st_mtime, metadata_path.stat().st_mtime)
+        if built_at < embeddings_path.stat().st_mtime:
+            logger.info(f"ℹ️ Persisted index is older than {embeddings_path}, rebuilding")
+            return False
+        return True
+    
+    def _load_persisted_index(self) -> tuple:
+        """Memory-map the persisted FAISS index and read its chunks and metadata"""
+        try:
+            index = faiss.read_index(INDEX_FILE, faiss.IO_FLAG_MMAP)
+            
+            chunks = []
+            metadata = {}
+            with open(INDEX_METADATA_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        (record_type, record), = json.loads(line).items()
+                        if record_type == "chunk":
+                            chunks.append(record)
+                        elif record_type == "metadata":
+                            metadata = record
+            
+            if index.ntotal != len(chunks):
+                logger.warning(f"⚠️ Persisted index has {index.ntotal} vectors for {len(chunks)} chunks, rebuilding")
+                return None, [], {}
+            
+            wanted_type = resolve_index_type(self.index_type, index.ntotal)
+            if index_type_of(index) != wanted_type:
+                logger.info(f"ℹ️ Persisted index is {index_type_of(index)}, {wanted_type} requested, rebuilding")
+                return None, [], {}
+            
+            logger.info(f"✅ Loaded persisted FAISS index with {index.ntotal} vectors from {INDEX_FILE}")
+            return index, chunks, metadata
             
         except Exception as e:
-            logger.error(f"❌ Failed to initialize searcher: {e}")
-            return False
+            logger.warning(f"⚠️ Could not load persisted index, rebuilding: {e}")
+            return None, [], {}
+    
+    def _save_persisted_index(self, index, chunks: List[Dict[str, Any]], metadata: Dict[str, Any]):
+        """Write the index and its chunk metadata so the next start can skip the rebuild"""
+        try:
+            with replaced_atomically(INDEX_FILE) as tmp_path:
+                faiss.write_index(index, tmp_path)
+            with replaced_atomically(INDEX_METADATA_FILE) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+                metadata = {key: value for key, value in metadata.items()
+                            if key not in ("embeddings_file", "embedding_dtype")}
+                f.write(json.dumps({"metadata": {**metadata, "index_type": index_type_of(index)}}, ensure_ascii=False) + "\n")
+                for chunk in chunks:
+                    f.write(json.dumps({"chunk": chunk}, ensure_ascii=False, separators=(',', ':')) + "\n")
+            logger.info(f"💾 Saved FAISS index to {INDEX_FILE}")
+        except Exception as e:
+            # A read-only checkout still works, it just rebuilds on every start
+            logger.warning(f"⚠️ Could not save FAISS index: {e}")
+    
+    def _embeddings_path(self) -> Optional[Path]:
+        """Pick the embeddings file to load: the newest of the .npy metadata, JSON Lines and JSON files"""
+        candidates = [
+            path for path in (Path(EMBEDDINGS_METADATA_FILE), Path(EMBEDDINGS_JSONL_FILE), Path(EMBEDDINGS_FILE))
+            if path.exists()
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda path: path.stat().st_mtime)
     
     def _load_embeddings(self) -> Dict[str, Any]:
-        """Load embeddings from JSON file"""
+        """
+        Load embeddings from the JSON Lines or JSON file.
+        
+        Returns {"metadata", "chunks", "embeddings"}, where the chunks no longer carry
+        their embedding and "embeddings" is a matrix with one row per chunk.
+        JSON Lines files are streamed line by line straight into a float32 matrix;
+        a .npy sidecar named by the metadata is memory-mapped instead of read.
+        """
         try:
-            embeddings_path = Path(EMBEDDINGS_FILE)
+            embeddings_path = self._embeddings_path()
             
-            if not embeddings_path.exists():
-                logger.error(f"❌ Embeddings file not found: {EMBEDDINGS_FILE}")
+            if embeddings_path is None:
+                logger.error(f"❌ Embeddings file not found: {EMBEDDINGS_FILE} or {EMBEDDINGS_JSONL_FILE}")
                 logger.error("Please ensure the course embeddings file is available from the agents lab")
                 return {}
             
-            with open(embeddings_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if embeddings_path.suffix == ".jsonl":
+                data = self._stream_jsonl_embeddings(embeddings_path)
+            else:
+                with open(embeddings_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                chunks = data['chunks']
+                data['embeddings'] = np.array([chunk.pop('embedding') for chunk in chunks], dtype=np.float32)
             
-            logger.info(f"✅ Loaded embeddings from {EMBEDDINGS_FILE}")
+            logger.info(f"✅ Loaded embeddings from {embeddings_path}")
             return data
             
         except Exception as e:
             logger.error(f"❌ Error loading embeddings: {e}")
             return {}
     
+    def _stream_jsonl_embeddings(self, embeddings_path: Path) -> Dict[str, Any]:
+        """Read a JSON Lines embeddings file into a preallocated float32 matrix (or memory-map its .npy sidecar)"""
+        metadata = {}
+        chunks = []
+        matrix = None
+        mapped = False
+        
+        with open(embeddings_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                (record_type, record), = json.loads(line).items()
+                if record_type == "metadata":
+                    metadata = record
+                    if metadata.get('embeddings_file'):
+                        # Pages of the matrix are only read when the index is built
+                        matrix = np.load(embeddings_path.parent / metadata['embeddings_file'], mmap_mode='r')
+                        mapped = True
+                    else:
+                        matrix = np.empty((metadata['chunk_count'], metadata['embedding_dimension']), dtype=np.float32)
+                elif record_type == "chunk" and mapped:
+                    chunks.append(record)
+                elif record_type == "chunk":
+                    embedding = record.pop('embedding')
+                    if matrix is None:
+                        matrix = np.empty((0, len(embedding)), dtype=np.float32)
+                    if len(chunks) == len(matrix):
+                        # More chunks than the metadata announced: grow the matrix
+                        matrix = np.resize(matrix, (max(1, 2 * len(matrix)), matrix.shape[1]))
+                    matrix[len(chunks)] = embedding
+                    chunks.append(record)
+        
+        if matrix is None:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        if mapped and len(matrix) != len(chunks):
+            raise ValueError(f"{metadata['embeddings_file']} has {len(matrix)} rows for {len(chunks)} chunks")
+        return {"metadata": metadata, "chunks": chunks, "embeddings": matrix[:len(chunks)]}
+    
     def _create_search_index(self, embeddings_data: Dict[str, Any]) -> tuple:
         """Create FAISS index from embeddings data"""
         try:
@@ -113,36 +666,135 @@ class CourseContentSearcher:
             
             chunks = embeddings_data['chunks']
             
-            # Extract embeddings as numpy array
-            embeddings_matrix = np.array([chunk['embedding'] for chunk in chunks], dtype=np.float32)
-            
-            # Create FAISS index (using Inner Product for cosine similarity)
-            dimension = embeddings_matrix.shape[1]
-            index = faiss.IndexFlatIP(dimension)
-            
-            # Normalize embeddings for cosine similarity
-            faiss.normalize_L2(embeddings_matrix)
+            # Embeddings matrix, one row per chunk (possibly a read-only float16 memory map),
+            # normalized so inner product equals cosine similarity. Rows the provider
+            # already normalized are used as they are, unless float16 rounding moved them.
+            matrix = embeddings_data['embeddings']
+            normalized = bool(embeddings_data['metadata'].get('embedding_normalized')) and matrix.dtype == np.float32
+            start = time.perf_counter()
+            index = build_index(matrix, self.index_type, normalized=normalized)
             
-            # Add embeddings to index
-            index.add(embeddings_matrix)
-            
-            logger.info(f"✅ Created FAISS index with {index.ntotal} vectors, dimension {dimension}")
+            logger.info(f"✅ Created {index_type_of(index)} FAISS index with {index.ntotal} vectors, "
+                        f"dimension {index.d}, in {time.perf_counter() - start:.2f}s")
             return index, chunks
             
         except Exception as e:
             logger.error(f"❌ Error creating search index: {e}")
             return None, []
     
-    def search(self, query: str, max_results: int = 3) -> List[SearchResult]:
+    def _embed_query(self, query: str, provider: EmbeddingProvider) -> List[float]:
+        """Embed one query with the embedding provider (one Bedrock round trip for Titan)"""
+        return provider.embed(query)
+    
+    def _embed_and_cache(self, key: str, query: str, provider: EmbeddingProvider) -> Optional[List[float]]:
+        """Embed one normalized query on a Bedrock worker thread and cache the result"""
+        try:
+            start = time.perf_counter()
+            embedding = self._embed_query(query, provider)
+            self.query_cache.put(key, embedding, (time.perf_counter() - start) * 1000)
+            return embedding
+        except Exception as e:
+            logger.error(f"❌ Error embedding query '{query[:50]}': {e}")
+            return None
+    
+    def get_query_embeddings(self, queries: List[str],
+                             provider: Optional[EmbeddingProvider] = None) -> List[Optional[List[float]]]:
+        """
+        Embeddings for the queries, from the cache where possible
+        
+        Cache misses are embedded concurrently on the shared Bedrock thread pool
+        (repeated queries only once). None marks a query whose embedding failed.
+        """
+        provider = provider or self.embedding_provider
+        keys = [QueryEmbeddingCache.key(provider.cache_id, query) for query in queries]
+        embeddings = [self.query_cache.get(key) for key in keys]
+        
+        pending = {}
+        for key, query, embedding in zip(keys, queries, embeddings):
+            if embedding is None and key not in pending:
+                pending[key] = self.bedrock_executor.submit(self._embed_and_cache, key, normalize_query(query), provider)
+        
+        return [embedding if embedding is not None else pending[key].result()
+                for key, embedding in zip(keys, embeddings)]
+    
+    def _search_vectors(self, query_embeddings: List[List[float]], max_results: int,
+                        ef_search: Optional[int] = None, nprobe: Optional[int] = None,
+                        snapshot: Optional[tuple] = None, rows: Optional[np.ndarray] = None) -> List[List[SearchResult]]:
+        """
+        Search all query embeddings with one index.search call on an (n x d) matrix
+        
+        rows (see filter_rows) restricts the search to those chunks with a
+        faiss.IDSelectorBatch, so other chunks do not take up top-k slots. Approximate
+        indexes can return fewer than k candidates, so k (and HNSW's efSearch with it)
+        doubles for the queries that came back short, until every query has
+        max_results relevant hits or all the chunks in scope were candidates.
+        """
+        index, chunks, provider, _ = snapshot or self._snapshot()
+        
+        # Convert to numpy and normalize for cosine similarity (unless the provider did)
+        query_vectors = np.array(query_embeddings, dtype=np.float32)
+        if query_vectors.shape[1] != index.d:
+            raise ValueError(f"Query embeddings have {query_vectors.shape[1]} dimensions, the index has {index.d}")
+        if not provider.normalized:
+            faiss.normalize_L2(query_vectors)
+        
+        selector = faiss.IDSelectorBatch(rows) if rows is not None and len(rows) else None
+        scope = index.ntotal if rows is None else len(rows)
+        hits = [[] for _ in range(len(query_vectors))]
+        pending = np.arange(len(query_vectors))
+        k = min(max_results, scope)
+        
+        # Search for similar content
+        while len(pending) and k > 0:
+            ef = max(ef_search or index.hnsw.efSearch, k) if index_type_of(index) == "hnsw" else ef_search
+            params = search_parameters(index, ef, nprobe, selector)
+            scores, indices = index.search(query_vectors[pending], k, params=params)
+            
+            short = []
+            for query_row, row_scores, row_indices in zip(pending, scores, indices):
+                # Approximate indexes pad with -1 when they find fewer than k
+                hits[query_row] = [(float(score), idx) for score, idx in zip(row_scores, row_indices)
+                                   if idx >= 0 and score > provider.min_relevance]  # Only reasonably relevant results
+                if len(hits[query_row]) < max_results and (row_indices[-1] < 0 or row_scores[-1] > provider.min_relevance):
+                    short.append(query_row)
+            if k == scope:
+                break
+            pending, k = np.array(short, dtype=np.int64), min(2 * k, scope)
+        
+        # Format results
+        all_results = []
+        for query_hits in hits:
+            results = []
+            for score, idx in query_hits[:max_results]:
+                chunk = chunks[idx]
+                results.append(SearchResult(
+                    content=chunk['content'][:500] + "..." if len(chunk['content']) > 500 else chunk['content'],
+                    title=chunk['title'],
+                    source=chunk['source'],
+                    relevance_score=score
+                ))
+            all_results.append(results)
+        return all_results
+    
+    def search(self, query: str, max_results: int = 3, ef_search: Optional[int] = None,
+               nprobe: Optional[int] = None, source: Optional[str] = None,
+               section_id: Optional[str] = None) -> List[SearchResult]:
         """
         Search course content using semantic similarity
         
         Args:
             query: The search query
             max_results: Maximum number of results to return
+            ef_search: HNSW candidate list size (higher = better recall, slower); HNSW indexes only
+            nprobe: Number of IVF lists to visit (higher = better recall, slower); IVF indexes only
+            source: Only search chunks of this page (e.g. "pages/mcp.html")
+            section_id: Only search chunks of this section
             
         Returns:
             List of SearchResult objects
+            
+        Raises:
+            ValueError: For a source or section_id no chunk has
         """
         if not self.is_initialized:
             logger.error("❌ Searcher not initialized")
@@ -152,32 +804,17 @@ class CourseContentSearcher:
             logger.warning("⚠️ Empty query provided")
             return []
         
+        # Embed and search against the same index, even if a reload swaps it meanwhile
+        snapshot = self._snapshot()
+        rows = filter_rows(snapshot[3], source, section_id)
+        
         try:
-            # Create query embedding
-            response = self.bedrock_client.invoke_model(
-                modelId=EMBEDDING_MODEL,
-                body=json.dumps({"inputText": query})
-            )
-            query_embedding = json.loads(response['body'].read())['embedding']
-            
-            # Convert to numpy and normalize for cosine similarity
-            query_vector = np.array([query_embedding], dtype=np.float32)
-            faiss.normalize_L2(query_vector)
+            # Create query embedding (or reuse a cached one)
+            query_embedding = self.get_query_embeddings([query], snapshot[2])[0]
+            if query_embedding is None:
+                return []
             
-            # Search for similar content
-            scores, indices = self.search_index.search(query_vector, max_results)
-            
-            # Format results
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if score > 0.3:  # Only include reasonably relevant results
-                    chunk = self.content_chunks[idx]
-                    results.append(SearchResult(
-                        content=chunk['content'][:500] + "..." if len(chunk['content']) > 500 else chunk['content'],
-                        title=chunk['title'],
-                        source=chunk['source'],
-                        relevance_score=float(score)
-                    ))
+            results = self._search_vectors([query_embedding], max_results, ef_search, nprobe, snapshot, rows)[0]
             
             logger.info(f"🔍 Found {len(results)} results for query: '{query[:50]}...'")
             return results
@@ -185,6 +822,51 @@ class CourseContentSearcher:
         except Exception as e:
             logger.error(f"❌ Error during search: {e}")
             return []
+    
+    def search_batch(self, queries: List[str], max_results: int = 3, ef_search: Optional[int] = None,
+                     nprobe: Optional[int] = None, source: Optional[str] = None,
+                     section_id: Optional[str] = None) -> List[Optional[List[SearchResult]]]:
+        """
+        Search several queries at once
+        
+        The queries are embedded concurrently (boto3 clients are thread-safe), reusing
+        cached embeddings, then all of them are searched with a single index.search call.
+        
+        Args:
+            queries: The search queries (non-empty)
+            max_results: Maximum number of results per query
+            ef_search: HNSW candidate list size; HNSW indexes only
+            nprobe: Number of IVF lists to visit; IVF indexes only
+            source: Only search chunks of this page
+            section_id: Only search chunks of this section
+            
+        Returns:
+            One list of SearchResult objects per query, or None for a query whose
+            embedding failed
+            
+        Raises:
+            ValueError: For a source or section_id no chunk has
+        """
+        if not self.is_initialized:
+            logger.error("❌ Searcher not initialized")
+            return [None] * len(queries)
+        
+        start = time.perf_counter()
+        snapshot = self._snapshot()
+        rows = filter_rows(snapshot[3], source, section_id)
+        embeddings = self.get_query_embeddings(queries, snapshot[2])
+        
+        embedded = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        results = [None] * len(queries)
+        if embedded:
+            found = self._search_vectors([embeddings[i] for i in embedded], max_results, ef_search, nprobe,
+                                        snapshot, rows)
+            for i, query_results in zip(embedded, found):
+                results[i] = query_results
+        
+        logger.info(f"🔍 Searched {len(embedded)}/{len(queries)} queries in one batch "
+                    f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return results
 
 # Initialize the global searcher instance
 searcher = CourseContentSearcher()
@@ -193,7 +875,9 @@ searcher = CourseContentSearcher()
 mcp = FastMCP("course-content-server")
 
 @mcp.tool()
-def search_content(query: str, max_results: int = 3) -> str:
+async def search_content(query: str, max_results: int = 3, ef_search: Optional[int] = None,
+                         nprobe: Optional[int] = None, source: Optional[str] = None,
+                         section_id: Optional[str] = None) -> str:
     """
     Search course content using semantic similarity
     
@@ -204,6 +888,12 @@ def search_content(query: str, max_results: int = 3) -> str:
     Args:
         query: The search query - what you want to find in the course content
         max_results: Maximum number of results to return (default: 3, max: 10)
+        ef_search: HNSW index only - candidates explored per query (default: index setting, max: 1024).
+            Higher values improve recall at the cost of latency.
+        nprobe: IVF/IVF-PQ index only - inverted lists visited per query (default: index setting, max: 1024).
+            Higher values improve recall at the cost of latency.
+        source: Only search this page, as shown in the results' Source (e.g. "pages/mcp.html")
+        section_id: Only search this section of the page (the HTML id of the section)
     
     Returns:
         Formatted search results with titles, sources, and content snippets
@@ -215,14 +905,17 @@ def search_content(query: str, max_results: int = 3) -> str:
     
     # Limit max_results to prevent excessive responses
     max_results = min(max(1, max_results), 10)
+    ef_search = min(max(1, ef_search), 1024) if ef_search else None
+    nprobe = min(max(1, nprobe), 1024) if nprobe else None
     
     # Check if searcher is initialized
     if not searcher.is_initialized:
         return "Error: Course content search system not initialized. Please check server logs."
     
     try:
-        # Perform the search
-        results = searcher.search(query.strip(), max_results)
+        # Perform the search off the event loop, so other tool calls keep being served
+        results = await asyncio.to_thread(searcher.search, query.strip(), max_results, ef_search, nprobe,
+                                          source, section_id)
         
         if not results:
             return f"No relevant content found for query: '{query}'"
@@ -237,10 +930,79 @@ def search_content(query: str, max_results: int = 3) -> str:
         
         return output
         
+    except ValueError as e:
+        # Unknown source or section_id
+        return f"Error: {e}"
     except Exception as e:
         logger.error(f"❌ Error in search_content tool: {e}")
         return f"Error during search: {str(e)}"
 
+@mcp.tool()
+async def search_content_batch(queries: List[str], max_results: int = 3, ef_search: Optional[int] = None,
+                               nprobe: Optional[int] = None, source: Optional[str] = None,
+                               section_id: Optional[str] = None) -> str:
+    """
+    Search course content for several queries in one call
+    
+    Use this instead of calling search_content repeatedly when you already know
+    several things you want to look up. The queries are embedded concurrently and
+    searched together, so a batch takes about as long as a single search.
+    
+    Args:
+        queries: The search queries (max: 20)
+        max_results: Maximum number of results per query (default: 3, max: 10)
+        ef_search: HNSW index only - candidates explored per query (default: index setting, max: 1024)
+        nprobe: IVF/IVF-PQ index only - inverted lists visited per query (default: index setting, max: 1024)
+        source: Only search this page, for every query (e.g. "pages/mcp.html")
+        section_id: Only search this section of the page, for every query
+    
+    Returns:
+        JSON object {"results": [{"query", "results": [{"title", "source", "content",
+        "relevance_score"}]} or {"query", "error"}, ...]} with one entry per query, in order
+    """
+    
+    # Input validation
+    if not queries:
+        return json.dumps({"error": "At least one search query is required"})
+    if len(queries) > MAX_BATCH_QUERIES:
+        return json.dumps({"error": f"At most {MAX_BATCH_QUERIES} queries per batch, got {len(queries)}"})
+    
+    # Limit max_results to prevent excessive responses
+    max_results = min(max(1, max_results), 10)
+    ef_search = min(max(1, ef_search), 1024) if ef_search else None
+    nprobe = min(max(1, nprobe), 1024) if nprobe else None
+    
+    # Check if searcher is initialized
+    if not searcher.is_initialized:
+        return json.dumps({"error": "Course content search system not initialized. Please check server logs."})
+    
+    try:
+        # Empty queries get an error entry; the rest are searched together
+        valid = [i for i, query in enumerate(queries) if query and query.strip()]
+        found = await asyncio.to_thread(
+            searcher.search_batch, [queries[i].strip() for i in valid], max_results, ef_search, nprobe,
+            source, section_id
+        )
+        found_by_position = dict(zip(valid, found))
+        
+        entries = []
+        for i, query in enumerate(queries):
+            if i not in found_by_position:
+                entries.append({"query": query, "error": "Search query cannot be empty"})
+            elif found_by_position[i] is None:
+                entries.append({"query": query, "error": "Could not create query embedding"})
+            else:
+                entries.append({"query": query, "results": [asdict(result) for result in found_by_position[i]]})
+        
+        return json.dumps({"results": entries}, ensure_ascii=False)
+        
+    except ValueError as e:
+        # Unknown source or section_id
+        return json.dumps({"error": str(e)})
+    except Exception as e:
+        logger.error(f"❌ Error in search_content_batch tool: {e}")
+        return json.dumps({"error": f"Error during search: {str(e)}"})
+
 @mcp.tool()
 def get_server_status() -> str:
     """
@@ -259,14 +1021,42 @@ def get_server_status() -> str:
             "initialized": searcher.is_initialized,
             "content_chunks": len(searcher.content_chunks) if searcher.is_initialized else 0,
             "aws_region": AWS_REGION,
-            "embedding_model": EMBEDDING_MODEL
+            "embedding_provider": searcher.embedding_provider.name if searcher.embedding_provider else None,
+            "embedding_model": searcher.embedding_provider.model_id if searcher.embedding_provider else None,
+            "embedding_dimension": searcher.search_index.d if searcher.is_initialized else None,
+            "embedding_normalized": searcher.embedding_provider.normalized if searcher.embedding_provider else None,
+            "index_type": index_type_of(searcher.search_index) if searcher.is_initialized else None,
+            "index_source": searcher.index_source,
+            "index_load_seconds": searcher.index_load_seconds,
+            "time_to_ready_seconds": searcher.time_to_ready_seconds,
+            "query_cache": searcher.query_cache.stats(),
+            "reloads": searcher.reload_count,
+            "reload_failures": searcher.reload_failures,
+            "last_reload_at": searcher.last_reload_at
         }
         
         if searcher.is_initialized:
             status_msg = "✅ Server Status: READY\n"
             status_msg += f"📊 Content chunks loaded: {status['content_chunks']}\n"
             status_msg += f"🌎 AWS Region: {status['aws_region']}\n"
-            status_msg += f"🧠 Embedding Model: {status['embedding_model']}\n"
+            status_msg += (f"🧠 Embedding Model: {status['embedding_model']} ({status['embedding_provider']}, "
+                           f"{status['embedding_dimension']} dims"
+                           f"{', normalized by the provider' if status['embedding_normalized'] else ''})\n")
+            if status['index_load_seconds'] is not None:
+                status_msg += f"🗂️ Index: {status['index_type']}, {status['index_source']} in {status['index_load_seconds'] * 1000:.0f} ms\n"
+                status_msg += f"⏱️ Time to ready: {status['time_to_ready_seconds']:.2f}s after process start\n"
+            if status['reloads'] or status['reload_failures']:
+                status_msg += f"🔄 Hot reloads: {status['reloads']} ({status['reload_failures']} failed)"
+                if status['last_reload_at']:
+                    status_msg += f", last {time.time() - status['last_reload_at']:.0f}s ago"
+                status_msg += "\n"
+            cache = status['query_cache']
+            if cache['lookups']:
+                status_msg += (f"🗃️ Query cache: {cache['hits']}/{cache['lookups']} hits "
+                               f"({cache['hit_rate']:.0%}), {cache['entries']} entries\n")
+            if cache['embedding_calls']:
+                status_msg += (f"📡 Query embedding latency: p50 {cache['embedding_p50_ms']:.0f} ms, "
+                               f"p95 {cache['embedding_p95_ms']:.0f} ms (last {cache['embedding_calls']} calls)\n")
             status_msg += "🔍 Ready to handle search requests"
         else:
             status_msg = "⚠️ Server Status: NOT READY\n"
@@ -283,6 +1073,19 @@ def main():
     """
     Main entry point for the MCP server
     """
+    arg_parser = argparse.ArgumentParser(description="Course content MCP server")
+    arg_parser.add_argument("--index-type", choices=INDEX_TYPES, default=INDEX_TYPE,
+                            help=f"FAISS index type (default: {INDEX_TYPE}, or set COURSE_INDEX_TYPE)")
+    arg_parser.add_argument("--embedding-provider", choices=list(PROVIDERS), default=EMBEDDING_PROVIDER,
+                            help="Expected embedding provider of the course embeddings "
+                                 "(default: as recorded in their metadata, or set COURSE_EMBEDDING_PROVIDER)")
+    arg_parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL,
+                            help=f"Seconds between checks for new embeddings to hot-reload; 0 disables "
+                                 f"(default: {RELOAD_INTERVAL:g}, or set COURSE_RELOAD_INTERVAL)")
+    args = arg_parser.parse_args()
+    searcher.index_type = args.index_type
+    searcher.expected_provider = args.embedding_provider
+    
     try:
         # Initialize the course content searcher
         logger.info("🚀 Starting course content MCP server...")
@@ -290,12 +1093,14 @@ def main():
         if not searcher.initialize():
             logger.error("❌ Failed to initialize course content searcher")
             logger.error("Please ensure:")
-            logger.error("  1. AWS credentials are configured")
+            logger.error("  1. AWS credentials are configured (bedrock embedding provider)")
             logger.error("  2. Course embeddings file is available")
             logger.error("  3. Required dependencies are installed")
             sys.exit(1)
         
         logger.info("✅ Course content searcher initialized successfully")
+        if args.reload_interval > 0:
+            searcher.start_watching(args.reload_interval)
         logger.info("🎯 Server ready to handle MCP requests")
         
         # Run the MCP server
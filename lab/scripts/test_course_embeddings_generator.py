@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Golden-File Tests for the Course Embeddings Generator
+
+Checks that every HTML parser backend of course_embeddings_generator.py turns the
+real index.html and pages/*.html into exactly the chunks recorded in
+golden/course_chunks.golden.json, that every embeddings file format reads back
+the chunks it was written with, and that concurrent embedding retries throttling
+and resumes from its checkpoint. No AWS calls are made.
+
+Run the tests:
+    python -m pytest test_course_embeddings_generator.py
+
+Regenerate the golden file after intentionally changing the pages or the chunking
+(always generated with the reference html.parser backend):
+    python test_course_embeddings_generator.py --update
+"""
+
+import io
+import time
+import threading
+import os
+import sys
+import json
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_FILE = os.path.join(SCRIPT_DIR, "golden", "course_chunks.golden.json")
+
+sys.path.insert(0, SCRIPT_DIR)
+with contextlib.redirect_stdout(io.StringIO()):
+    import course_embeddings_generator as generator
+
+def course_html_files():
+    """Relative paths of the HTML files the generator processes, in its order"""
+    files = ["index.html"]
+    pages_dir = os.path.join(generator.COURSE_DIR, "pages")
+    files += [f"pages/{name}" for name in sorted(os.listdir(pages_dir)) if name.endswith('.html')]
+    return files
+
+def extract_chunks(parser):
+    """Chunk every course file with the given backend, keyed by relative path"""
+    return {
+        path: generator.extract_text_from_html(os.path.join(generator.COURSE_DIR, path), parser)
+        for path in course_html_files()
+    }
+
+class TestCourseChunksGolden(unittest.TestCase):
+    """Compare each parser backend against the golden chunks"""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+            cls.golden = json.load(f)
+
+    def assert_matches_golden(self, parser):
+        chunks = extract_chunks(parser)
+        self.assertEqual(sorted(chunks), sorted(self.golden), "Processed file set differs from golden file")
+        for path, expected in self.golden.items():
+            with self.subTest(parser=parser, file=path):
+                self.assertEqual(chunks[path], expected)
+
+    def test_html_parser_matches_golden(self):
+        """The reference BeautifulSoup html.parser backend reproduces the golden file"""
+        self.assert_matches_golden("html.parser")
+
+    @unittest.skipIf(generator.lxml is None, "lxml not installed")
+    def test_lxml_matches_golden(self):
+        """The lxml backend produces identical chunks"""
+        self.assert_matches_golden("lxml")
+
+class TestEmbeddingFormats(unittest.TestCase):
+    """Round-trip embedded chunks through every output format"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = np.random.default_rng(0)
+        self.output_data = {
+            "metadata": {"chunk_count": 3, "embedding_dimension": 8},
+            "chunks": [
+                {"content": f"chunk {i}", "source": "index.html", "section_id": f"section_{i}",
+                 "title": f"Section {i}", "word_count": 2, "embedding": rng.standard_normal(8).tolist()}
+                for i in range(3)
+            ],
+        }
+
+    def round_trip(self, output_format, dtype="float32"):
+        output_file = os.path.join(self.tmp.name, f"embeddings.{output_format}")
+        if output_format == "npy":
+            output_file = os.path.join(self.tmp.name, "embeddings.meta.jsonl")
+        with mock.patch.object(generator, "NPY_OUTPUT_FILE", os.path.join(self.tmp.name, "embeddings.npy")):
+            generator.write_embeddings(self.output_data, output_file, output_format, dtype)
+        return list(generator.iter_embeddings(output_file))
+
+    def assert_round_trip(self, records, tolerance=0.0):
+        (first_type, metadata), *chunk_records = records
+        self.assertEqual(first_type, "metadata")
+        self.assertEqual(metadata["chunk_count"], 3)
+        self.assertEqual([record_type for record_type, _ in chunk_records], ["chunk"] * 3)
+        for (_, chunk), expected in zip(chunk_records, self.output_data["chunks"]):
+            self.assertEqual({k: v for k, v in chunk.items() if k != "embedding"},
+                             {k: v for k, v in expected.items() if k != "embedding"})
+            np.testing.assert_allclose(chunk["embedding"], expected["embedding"], atol=tolerance)
+
+    def test_json_round_trip(self):
+        self.assert_round_trip(self.round_trip("json"))
+
+    def test_jsonl_round_trip(self):
+        self.assert_round_trip(self.round_trip("jsonl"))
+
+    def test_npy_round_trip(self):
+        """The .npy sidecar is named in the metadata and memory-mapped back into the chunks"""
+        records = self.round_trip("npy")
+        self.assertEqual(records[0][1]["embeddings_file"], "embeddings.npy")
+        self.assertEqual(np.load(os.path.join(self.tmp.name, "embeddings.npy")).shape, (3, 8))
+        with open(os.path.join(self.tmp.name, "embeddings.meta.jsonl"), 'r', encoding='utf-8') as f:
+            self.assertNotIn('"embedding":', f.read())
+        self.assert_round_trip(records, tolerance=1e-6)
+
+    def test_npy_float16_round_trip(self):
+        records = self.round_trip("npy", "float16")
+        self.assertEqual(records[0][1]["embedding_dtype"], "float16")
+        self.assert_round_trip(records, tolerance=1e-2)
+
+    @unittest.skipIf(generator.faiss is None, "faiss not installed")
+    def test_search_index(self):
+        """The persisted index holds normalized vectors in chunk order, with slim chunk metadata"""
+        index_file = os.path.join(self.tmp.name, "index.faiss")
+        metadata_file = os.path.join(self.tmp.name, "index.meta.jsonl")
+        with mock.patch.multiple(generator, INDEX_FILE=index_file, INDEX_METADATA_FILE=metadata_file):
+            generator.write_search_index(self.output_data)
+        index = generator.faiss.read_index(index_file, generator.faiss.IO_FLAG_MMAP)
+        self.assertEqual(index.ntotal, 3)
+        query = np.array([self.output_data["chunks"][1]["embedding"]], dtype=np.float32)
+        generator.faiss.normalize_L2(query)
+        scores, indices = index.search(query, 1)
+        self.assertEqual(indices[0][0], 1)
+        self.assertAlmostEqual(float(scores[0][0]), 1.0, places=5)
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records[0]["metadata"]["index_type"], "IndexFlatIP")
+        self.assertEqual([record["chunk"]["section_id"] for record in records[1:]],
+                         ["section_0", "section_1", "section_2"])
+        self.assertNotIn("embedding", records[1]["chunk"])
+
+def update_golden():
+    """Regenerate the golden file from the html.parser backend"""
+    chunks = extract_chunks("html.parser")
+    os.makedirs(os.path.dirname(GOLDEN_FILE), exist_ok=True)
+    with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+        json.dump(chunks, f, indent=2, ensure_ascii=False)
+    print(f"Wrote chunks for {len(chunks)} files to {GOLDEN_FILE}")
+
+class ThrottlingError(Exception):
+    """Looks like a botocore ClientError with the given error code"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+class FlakyProvider(generator.EmbeddingProvider):
+    """Throttles the first `throttles` calls for each text and rejects texts starting with "bad" """
+
+    name = "flaky"
+
+    def __init__(self, throttles=0, latency=0.0):
+        self.throttles = throttles
+        self.latency = latency
+        self.calls = []
+        self.lock = threading.Lock()
+
+    @property
+    def model_id(self):
+        return "flaky-1"
+
+    def embed(self, text):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls.append(text)
+            attempts = self.calls.count(text)
+        if text.startswith("bad"):
+            raise ThrottlingError("ValidationException")
+        if attempts <= self.throttles:
+            raise ThrottlingError("ThrottlingException")
+        return [float(len(text)), 1.0]
+
+def make_chunks(texts):
+    return [{"content": text, "title": text, "word_count": 1} for text in texts]
+
+class TestConcurrentEmbedding(unittest.TestCase):
+    """embed_chunks embeds on a thread pool, retries throttling and resumes"""
+
+    def setUp(self):
+        patcher = mock.patch.object(generator, "RETRY_BASE_DELAY", 0.001)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.checkpoint = os.path.join(tmp.name, "checkpoint.jsonl")
+
+    def embed(self, texts, provider, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generator.embed_chunks(make_chunks(texts), provider, checkpoint_file=self.checkpoint, **kwargs)
+
+    def test_backoff_on_throttling(self):
+        delays = []
+        embedding, retries = generator.embed_with_retry(FlakyProvider(throttles=3), "text", sleep=delays.append)
+        self.assertEqual((embedding, retries), ([4.0, 1.0], 3))
+        self.assertEqual(len(delays), 3)
+        for attempt, delay in enumerate(delays):
+            self.assertLessEqual(delay, generator.RETRY_BASE_DELAY * 2 ** attempt)
+
+    def test_non_retryable_error_fails_at_once(self):
+        provider = FlakyProvider()
+        with self.assertRaises(ThrottlingError):
+            generator.embed_with_retry(provider, "bad text", sleep=lambda delay: None)
+        self.assertEqual(len(provider.calls), 1)
+
+    def test_errors_without_dict_response(self):
+        for response in (None, "503 Service Unavailable"):
+            error = ValueError("bad request")
+            error.response = response
+            self.assertFalse(generator.is_retryable(error))
+
+    def test_order_and_concurrency(self):
+        texts = [f"chunk {'x' * i}" for i in range(16)]
+        start = time.perf_counter()
+        embedded, failed = self.embed(texts, FlakyProvider(throttles=1, latency=0.05), workers=8)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(failed, [])
+        self.assertEqual([chunk['content'] for chunk in embedded], texts)
+        self.assertEqual([chunk['embedding'][0] for chunk in embedded], [float(len(t)) for t in texts])
+        # 32 calls of 50 ms each: ~1.6 s one at a time
+        self.assertLess(elapsed, 0.6)
+
+    def test_resume_from_checkpoint(self):
+        texts = ["alpha", "bad beta", "gamma", "bad delta"]
+        embedded, failed = self.embed(texts, FlakyProvider())
+        self.assertEqual([chunk['content'] for chunk in embedded], ["alpha", "gamma"])
+        self.assertEqual([chunk['content'] for chunk in failed], ["bad beta", "bad delta"])
+        
+        # The rerun only embeds the chunks the first run did not finish
+        provider = FlakyProvider()
+        provider.embed = lambda text, embed=provider.embed: embed(text.replace("bad ", ""))
+        embedded, failed = self.embed(texts, provider)
+        self.assertEqual(failed, [])
+        self.assertEqual([chunk['content'] for chunk in embedded], texts)
+        self.assertEqual(sorted(provider.calls), ["beta", "delta"])
+
+    def test_torn_checkpoint_line(self):
+        self.embed(["alpha"], FlakyProvider())
+        with open(self.checkpoint, 'a', encoding='utf-8') as f:
+            f.write('{"key": "trunc')
+        provider = FlakyProvider()
+        embedded, _ = self.embed(["alpha", "beta"], provider)
+        self.assertEqual(len(embedded), 2)
+        self.assertEqual(provider.calls, ["beta"])
+
+if __name__ == "__main__":
+    if "--update" in sys.argv:
+        update_golden()
+    else:
+        unittest.main()
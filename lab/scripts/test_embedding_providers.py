@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for the Embedding Providers
+
+Checks that the offline hashing provider is deterministic and normalized, that
+lexically similar texts score higher than unrelated ones, and that the provider
+recorded in the embeddings metadata is the one used to embed queries.
+
+Run the tests:
+    python -m pytest test_embedding_providers.py
+"""
+
+import io
+import os
+import sys
+import json
+import unittest
+
+import numpy as np
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+import embedding_providers as providers
+
+class TestHashingProvider(unittest.TestCase):
+    """Offline embeddings need no credentials and are the same on every run"""
+
+    def setUp(self):
+        self.provider = providers.HashingEmbeddingProvider()
+
+    def test_deterministic_and_normalized(self):
+        first = self.provider.embed("Retrieval augmented generation")
+        self.assertEqual(first, providers.HashingEmbeddingProvider().embed("Retrieval augmented generation"))
+        self.assertEqual(len(first), providers.HASHING_DIMENSION)
+        self.assertAlmostEqual(float(np.linalg.norm(first)), 1.0, places=5)
+
+    def test_lexical_similarity(self):
+        query = np.array(self.provider.embed("How do vector databases index embeddings?"))
+        related = np.array(self.provider.embed("Vector databases store and index embeddings for search"))
+        unrelated = np.array(self.provider.embed("Prompt engineering with few-shot examples"))
+        self.assertGreater(query @ related, query @ unrelated + 0.3)
+
+    def test_empty_text(self):
+        self.assertEqual(self.provider.embed("the of and"), [0.0] * providers.HASHING_DIMENSION)
+
+    def test_metadata(self):
+        self.assertEqual(providers.HashingEmbeddingProvider(256).metadata(),
+                         {"embedding_provider": "hashing", "embedding_model": "hashing-unigram-bigram-256",
+                          "embedding_normalized": True})
+
+class RecordingClient:
+    """Fake Bedrock client that records request bodies"""
+
+    def __init__(self):
+        self.bodies = []
+
+    def invoke_model(self, modelId, body):
+        self.bodies.append(json.loads(body))
+        return {"body": io.BytesIO(json.dumps({"embedding": [0.6, 0.8]}).encode())}
+
+class TestBedrockProvider(unittest.TestCase):
+    """Titan v2 options are sent with every request and recorded in metadata"""
+
+    def test_dimensions_and_normalize(self):
+        client = RecordingClient()
+        provider = providers.BedrockEmbeddingProvider(client=client, dimensions=256, normalize=True)
+        self.assertEqual(provider.embed("agents"), [0.6, 0.8])
+        self.assertEqual(client.bodies, [{"inputText": "agents", "dimensions": 256, "normalize": True}])
+        self.assertTrue(provider.metadata()["embedding_normalized"])
+
+    def test_default_request(self):
+        client = RecordingClient()
+        providers.BedrockEmbeddingProvider(client=client).embed("agents")
+        self.assertEqual(client.bodies, [{"inputText": "agents"}])
+
+    def test_unsupported_dimensions(self):
+        with self.assertRaises(ValueError):
+            providers.BedrockEmbeddingProvider(client=RecordingClient(), dimensions=300)
+
+    def test_cache_id_includes_options(self):
+        ids = {providers.BedrockEmbeddingProvider(client=RecordingClient(), dimensions=d, normalize=n).cache_id
+               for d in (256, 1024) for n in (False, True)}
+        self.assertEqual(len(ids), 4)
+
+class TestProviderFromMetadata(unittest.TestCase):
+    """Queries are embedded by the provider recorded with the course embeddings"""
+
+    def test_hashing_dimension_from_metadata(self):
+        provider = providers.provider_from_metadata({"embedding_provider": "hashing", "embedding_dimension": 256})
+        self.assertEqual(len(provider.embed("agents")), 256)
+
+    @unittest.skipIf(boto3 is None, "boto3 not installed")
+    def test_bedrock_model_from_metadata(self):
+        # Files written before providers existed were made with Bedrock
+        provider = providers.provider_from_metadata({"embedding_model": "amazon.titan-embed-text-v1",
+                                                     "embedding_dimension": 1536})
+        self.assertEqual(provider.name, "bedrock")
+        self.assertEqual(provider.model_id, "amazon.titan-embed-text-v1")
+        self.assertIsNone(provider.dimension)
+        
+        provider = providers.provider_from_metadata({"embedding_provider": "bedrock", "embedding_dimension": 256,
+                                                     "embedding_normalized": True})
+        self.assertEqual((provider.dimension, provider.normalized), (256, True))
+
+    def test_mismatched_override(self):
+        with self.assertRaises(ValueError):
+            providers.provider_from_metadata({"embedding_provider": "hashing"}, override="bedrock")
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            providers.create_provider("word2vec")
+
+if __name__ == "__main__":
+    unittest.main()
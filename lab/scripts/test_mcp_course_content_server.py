@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Tests for the MCP Course Content Server's Search Index
+
+Checks that every FAISS index type of mcp_course_content_server.py finds the same
+nearest neighbours as exact search on a small synthetic corpus, and that the
+efSearch/nprobe knobs only apply to the index types they belong to, that batch
+search returns the same results as one query at a time, that query embeddings
+are cached, and that regenerated embeddings are hot-reloaded. No AWS calls are made
+(a fake Bedrock client returns known embeddings, or the offline hashing provider is used).
+
+Run the tests:
+    python -m pytest test_mcp_course_content_server.py
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+import embedding_providers
+
+try:
+    with contextlib.redirect_stdout(io.StringIO()):
+        import mcp_course_content_server as server
+except ImportError:  # mcp, boto3 or faiss not installed
+    server = None
+
+def run(coroutine):
+    """Run an async MCP tool function to completion"""
+    return asyncio.run(coroutine)
+
+def clustered_corpus(num_vectors=4000, dimension=64, num_topics=20, seed=0):
+    """Small clustered float16 corpus, like the .npy sidecar the server memory-maps"""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((num_topics, dimension))
+    points = topics[rng.integers(num_topics, size=num_vectors)] + 0.3 * rng.standard_normal((num_vectors, dimension))
+    return points.astype(np.float16)
+
+@unittest.skipIf(server is None, "MCP server dependencies not installed")
+class TestSearchIndex(unittest.TestCase):
+    """Build each index type and compare it with exact search"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = clustered_corpus()
+        cls.queries = np.array(cls.corpus[:50], dtype=np.float32)
+        server.faiss.normalize_L2(cls.queries)
+        flat = server.build_index(cls.corpus, "flat")
+        _, cls.truth = flat.search(cls.queries, 5)
+
+    def recall(self, index, params=None):
+        _, found = index.search(self.queries, 5, params=params)
+        return np.mean([len(set(f) & set(t)) / 5 for f, t in zip(found, self.truth)])
+
+    def test_resolve_auto(self):
+        self.assertEqual(server.resolve_index_type("auto", 54), "flat")
+        self.assertEqual(server.resolve_index_type("auto", server.AUTO_FLAT_MAX_VECTORS), "hnsw")
+        self.assertEqual(server.resolve_index_type("auto", 1_000_000), "hnsw")
+        self.assertEqual(server.resolve_index_type("ivf", 54), "ivf")
+
+    def test_index_types(self):
+        """Every index type is built over all vectors and reports its own type"""
+        for index_type in ["flat", "hnsw", "ivf", "ivfpq"]:
+            with self.subTest(index_type=index_type):
+                index = server.build_index(self.corpus, index_type, block_size=1000)
+                self.assertEqual(server.index_type_of(index), index_type)
+                self.assertEqual(index.ntotal, len(self.corpus))
+
+    def test_hnsw_recall(self):
+        index = server.build_index(self.corpus, "hnsw")
+        self.assertGreaterEqual(self.recall(index, server.search_parameters(index, ef_search=128)), 0.95)
+
+    def test_ivf_nprobe(self):
+        """Visiting every list makes IVF search exact"""
+        index = server.build_index(self.corpus, "ivf")
+        self.assertEqual(self.recall(index, server.search_parameters(index, nprobe=index.nlist)), 1.0)
+
+    def test_search_parameters(self):
+        """Knobs are ignored by index types they do not apply to"""
+        flat = server.build_index(self.corpus, "flat")
+        hnsw = server.build_index(self.corpus, "hnsw")
+        ivf = server.build_index(self.corpus, "ivf")
+        self.assertIsNone(server.search_parameters(flat, ef_search=64, nprobe=8))
+        self.assertIsNone(server.search_parameters(hnsw, nprobe=8))
+        self.assertIsNone(server.search_parameters(ivf, ef_search=64))
+        self.assertEqual(server.search_parameters(hnsw, ef_search=64).efSearch, 64)
+        self.assertEqual(server.search_parameters(ivf, nprobe=8).nprobe, 8)
+
+    def test_unknown_index_type(self):
+        with self.assertRaises(ValueError):
+            server.build_index(self.corpus, "lsh")
+
+class FakeBedrockClient:
+    """Returns row i of the corpus as the embedding of the query "row i", and fails on "fail"."""
+
+    def __init__(self, corpus, latency=0.0):
+        self.corpus = corpus
+        self.latency = latency
+        self.calls = 0
+
+    def invoke_model(self, modelId, body):
+        self.calls += 1
+        time.sleep(self.latency)
+        text = json.loads(body)["inputText"]
+        if text == "fail":
+            raise RuntimeError("throttled")
+        embedding = self.corpus[int(text.split()[1])].astype(float).tolist()
+        return {"body": io.BytesIO(json.dumps({"embedding": embedding}).encode())}
+
+def fake_searcher(corpus, latency=0.0, index_type="flat"):
+    """An initialized searcher over corpus, with a fake Bedrock client; chunk i is on page i % 4"""
+    searcher = server.CourseContentSearcher(index_type)
+    searcher.embedding_provider = embedding_providers.BedrockEmbeddingProvider(
+        client=FakeBedrockClient(corpus, latency))
+    searcher.search_index = server.build_index(corpus, index_type)
+    searcher.content_chunks = [
+        {"content": f"chunk {i}", "title": f"Section {i}", "source": f"pages/page{i % 4}.html",
+         "section_id": f"section_{i // 4}"}
+        for i in range(len(corpus))
+    ]
+    searcher.filter_ids = server.build_filter_ids(searcher.content_chunks)
+    searcher.is_initialized = True
+    return searcher
+
+@unittest.skipIf(server is None, "MCP server dependencies not installed")
+class TestBatchSearch(unittest.TestCase):
+    """search_content_batch embeds every query and searches them in one call"""
+
+    def setUp(self):
+        self.searcher = fake_searcher(clustered_corpus(num_vectors=200))
+        patcher = mock.patch.object(server, "searcher", self.searcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch_matches_single_queries(self):
+        queries = [f"row {i}" for i in (0, 7, 42, 199)]
+        with mock.patch.object(self.searcher, "_search_vectors", wraps=self.searcher._search_vectors) as search:
+            batch = self.searcher.search_batch(queries, max_results=5)
+        search.assert_called_once()
+        self.assertEqual(self.searcher.embedding_provider.client.calls, len(queries))
+        for query, results in zip(queries, batch):
+            self.assertEqual(results, self.searcher.search(query, max_results=5))
+            self.assertEqual(results[0].title, f"Section {query.split()[1]}")
+
+    def test_tool_returns_json_per_query(self):
+        output = json.loads(run(server.search_content_batch(["row 3", "  ", "fail", "row 5"], max_results=2)))
+        entries = output["results"]
+        self.assertEqual([entry["query"] for entry in entries], ["row 3", "  ", "fail", "row 5"])
+        self.assertEqual(entries[0]["results"][0]["title"], "Section 3")
+        self.assertEqual(set(entries[0]["results"][0]), {"content", "title", "source", "relevance_score"})
+        self.assertLessEqual(len(entries[0]["results"]), 2)
+        self.assertIn("error", entries[1])
+        self.assertIn("error", entries[2])
+        self.assertEqual(entries[3]["results"][0]["title"], "Section 5")
+
+    def test_tool_limits_batch_size(self):
+        output = json.loads(run(server.search_content_batch(["row 1"] * (server.MAX_BATCH_QUERIES + 1))))
+        self.assertIn("error", output)
+        self.assertIn("error", json.loads(run(server.search_content_batch([]))))
+
+@unittest.skipIf(server is None, "MCP server dependencies not installed")
+class TestQueryEmbeddingCache(unittest.TestCase):
+    """Repeated queries reuse their embedding instead of calling Bedrock again"""
+
+    def setUp(self):
+        self.corpus = clustered_corpus(num_vectors=50)
+
+    def test_repeated_query_hits_cache(self):
+        searcher = fake_searcher(self.corpus)
+        first = searcher.search("row 4")
+        self.assertEqual(searcher.search("  row   4 "), first)
+        self.assertEqual(searcher.embedding_provider.client.calls, 1)
+        stats = searcher.query_cache.stats()
+        self.assertEqual((stats["hits"], stats["lookups"], stats["embedding_calls"]), (1, 2, 1))
+
+    def test_key_includes_model(self):
+        self.assertNotEqual(server.QueryEmbeddingCache.key("model-a", "row 1"),
+                            server.QueryEmbeddingCache.key("model-b", "row 1"))
+        self.assertEqual(server.QueryEmbeddingCache.key("model-a", "row\t1\n"),
+                         server.QueryEmbeddingCache.key("model-a", "row 1"))
+
+    def test_lru_eviction(self):
+        cache = server.QueryEmbeddingCache(max_entries=2, cache_file=None)
+        cache.put("a", [1.0], 1.0)
+        cache.put("b", [2.0], 1.0)
+        cache.get("a")
+        cache.put("c", [3.0], 1.0)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [1.0])
+        self.assertEqual(cache.get("c"), [3.0])
+
+    def test_disk_cache_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_file = os.path.join(tmp, "query-cache.jsonl")
+            cache = server.QueryEmbeddingCache(max_entries=2, cache_file=cache_file)
+            for key in ("a", "b", "c"):
+                cache.put(key, [float(ord(key))], 1.0)
+            
+            restarted = server.QueryEmbeddingCache(max_entries=2, cache_file=cache_file)
+            self.assertIsNone(restarted.get("a"))
+            self.assertEqual(restarted.get("c"), [99.0])
+            # The file is compacted to the entries that fit
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+    def test_failed_embedding_is_not_cached(self):
+        searcher = fake_searcher(self.corpus)
+        self.assertEqual(searcher.search("fail"), [])
+        self.assertEqual(searcher.search("fail"), [])
+        self.assertEqual(searcher.embedding_provider.client.calls, 2)
+
+    def test_concurrent_tool_calls_do_not_serialize(self):
+        """Two slow tool calls in flight together take about as long as one"""
+        searcher = fake_searcher(self.corpus, latency=0.2)
+
+        async def two_calls():
+            return await asyncio.gather(server.search_content("row 1"), server.search_content("row 2"))
+
+        with mock.patch.object(server, "searcher", searcher):
+            start = time.perf_counter()
+            outputs = run(two_calls())
+            elapsed = time.perf_counter() - start
+        self.assertIn("Section 1", outputs[0])
+        self.assertIn("Section 2", outputs[1])
+        self.assertLess(elapsed, 0.35)
+
+    def test_status_reports_cache(self):
+        searcher = fake_searcher(self.corpus)
+        searcher.search("row 1")
+        searcher.search("row 1")
+        with mock.patch.object(server, "searcher", searcher):
+            status = server.get_server_status()
+        self.assertIn("Query cache: 1/2 hits (50%)", status)
+        self.assertIn("Query embedding latency", status)
+        self.assertIn("amazon.titan-embed-text-v2:0 (bedrock, 64 dims)", status)
+
+@unittest.skipIf(server is None, "MCP server dependencies not installed")
+class TestOfflineProvider(unittest.TestCase):
+    """The hashing provider searches the course content without AWS"""
+
+    def test_lexical_search(self):
+        provider = embedding_providers.HashingEmbeddingProvider(dimension=256)
+        texts = ["Agents call tools in a loop", "FAISS builds vector indexes",
+                 "The Model Context Protocol connects clients and servers"]
+        searcher = server.CourseContentSearcher("flat")
+        searcher.embedding_provider = provider
+        searcher.search_index = server.build_index(np.array([provider.embed(t) for t in texts]), "flat")
+        searcher.content_chunks = [{"content": t, "title": t, "source": "index.html"} for t in texts]
+        searcher.is_initialized = True
+        
+        results = searcher.search("model context protocol servers", max_results=1)
+        self.assertEqual(results[0].title, texts[2])
+
+    def test_normalized_queries_are_not_renormalized(self):
+        provider = embedding_providers.HashingEmbeddingProvider(dimension=64)
+        searcher = fake_searcher(clustered_corpus(num_vectors=20))
+        searcher.embedding_provider = provider
+        with mock.patch.object(server.faiss, "normalize_L2") as normalize:
+            searcher._search_vectors([provider.embed("agents")], 3)
+        normalize.assert_not_called()
+
+    def test_query_dimension_must_match_index(self):
+        searcher = fake_searcher(clustered_corpus(num_vectors=20))
+        with self.assertRaises(ValueError):
+            searcher._search_vectors([[1.0] * 32], 3)
+
+@unittest.skipIf(server is None, "MCP server dependencies not installed")
+class TestFilteredSearch(unittest.TestCase):
+    """source/section_id filters restrict the search itself, not its results"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = clustered_corpus()
+        cls.normalized = np.array(cls.corpus, dtype=np.float32)
+        server.faiss.normalize_L2(cls.normalized)
+
+    def expected(self, query_row, rows, max_results):
+        """Exact top results among rows, above the relevance threshold"""
+        scores = self.normalized[rows] @ self.normalized[query_row]
+        order = np.argsort(-scores)[:max_results]
+        return [f"Section {rows[i]}" for i in order if scores[i] > 0.3]
+
+    def test_filter_by_source(self):
+        searcher = fake_searcher(self.corpus)
+        results = searcher.search("row 1", max_results=5, source="pages/page2.html")
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result.source == "pages/page2.html" for result in results))
+        self.assertEqual([result.title for result in results],
+                         self.expected(1, np.arange(2, len(self.corpus), 4), 5))
+
+    def test_selective_filter_on_hnsw(self):
+        """A filter keeping 1% of the chunks still fills max_results from them"""
+        searcher = fake_searcher(self.corpus, index_type="hnsw")
+        rows = np.arange(0, len(self.corpus), 100)
+        searcher.filter_ids["source"]["pages/rare.html"] = rows
+        for query_row in (0, 7, 1234):
+            with self.subTest(query_row=query_row):
+                results = searcher.search(f"row {query_row}", max_results=5, source="pages/rare.html")
+                expected = self.expected(query_row, rows, 5)
+                self.assertEqual(len(results), len(expected))
+                self.assertGreaterEqual(len(set(r.title for r in results) & set(expected)), len(expected) - 1)
+
+    def test_source_and_section(self):
+        searcher = fake_searcher(self.corpus)
+        results = searcher.search("row 8", source="pages/page0.html", section_id="section_2")
+        self.assertEqual([result.title for result in results], ["Section 8"])
+        self.assertEqual(searcher.search("row 8", source="pages/page1.html", section_id="section_0"), [])
+
+    def test_batch_filter(self):
+        searcher = fake_searcher(self.corpus)
+        batch = searcher.search_batch(["row 3", "row 4"], max_results=3, source="pages/page3.html")
+        for results in batch:
+            self.assertEqual(len(results), 3)
+            self.assertTrue(all(result.source == "pages/page3.html" for result in results))
+
+    def test_unknown_filter_values(self):
+        searcher = fake_searcher(clustered_corpus(num_vectors=8))
+        with mock.patch.object(server, "searcher", searcher):
+            output = run(server.search_content("row 1", source="pages/missing.html"))
+            self.assertIn("Unknown source: pages/missing.html", output)
+            self.assertIn("pages/page0.html", output)
+            batch = json.loads(run(server.search_content_batch(["row 1"], section_id="nope")))
+            self.assertEqual(batch, {"error": "Unknown section_id: nope"})
+
+def write_hashing_embeddings(path, texts):
+    """Write a JSON Lines embeddings file of texts embedded with the offline provider"""
+    provider = embedding_providers.HashingEmbeddingProvider(dimension=256)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"metadata": {**provider.metadata(), "chunk_count": len(texts),
+                                          "embedding_dimension": provider.dimension}}) + "\n")
+        for text in texts:
+            chunk = {"content": text, "title": text, "source": "index.html", "embedding": provider.embed(text)}
+            f.write(json.dumps({"chunk": chunk}) + "\n")
+
+def write_bedrock_embeddings(path, texts, dimension):
+    """Write a JSON Lines embeddings file as made by Titan v2 with the given dimension (random unit vectors)"""
+    vectors = np.random.default_rng(dimension).normal(size=(len(texts), dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"metadata": {"embedding_provider": "bedrock", "embedding_model": "amazon.titan-embed-text-v2:0",
+                                          "embedding_normalized": True, "chunk_count": len(texts),
+                                          "embedding_dimension": dimension}}) + "\n")
+        for text, vector in zip(texts, vectors):
+            chunk = {"content": text, "title": text, "source": "index.html", "embedding": vector.tolist()}
+            f.write(json.dumps({"chunk": chunk}) + "\n")
+
+@unittest.skipIf(server is None, "MCP server dependencies not installed")
+class TestHotReload(unittest.TestCase):
+    """Regenerated embeddings are swapped in without restarting the server"""
+
+    OLD = ["Agents call tools in a loop", "FAISS builds vector indexes"]
+    NEW = ["Agents call tools in a loop", "FAISS builds vector indexes", "Prompt caching saves tokens"]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.embeddings_file = os.path.join(tmp.name, "course_embeddings.jsonl")
+        patcher = mock.patch.multiple(
+            server,
+            EMBEDDINGS_FILE=os.path.join(tmp.name, "course_embeddings.json"),
+            EMBEDDINGS_JSONL_FILE=self.embeddings_file,
+            EMBEDDINGS_METADATA_FILE=os.path.join(tmp.name, "course_embeddings.meta.jsonl"),
+            INDEX_FILE=os.path.join(tmp.name, "course_index.faiss"),
+            INDEX_METADATA_FILE=os.path.join(tmp.name, "course_index.meta.jsonl"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        write_hashing_embeddings(self.embeddings_file, self.OLD)
+        self.searcher = server.CourseContentSearcher("flat")
+        self.assertTrue(self.searcher.initialize())
+
+    def titles(self, query):
+        return [result.title for result in self.searcher.search(query, max_results=3)]
+
+    def test_reload_on_change(self):
+        self.assertFalse(self.searcher.reload_if_changed())
+        self.assertNotIn(self.NEW[2], self.titles("prompt caching tokens"))
+        
+        write_hashing_embeddings(self.embeddings_file, self.NEW)
+        self.assertTrue(self.searcher.reload_if_changed())
+        self.assertEqual(self.titles("prompt caching tokens")[0], self.NEW[2])
+        self.assertEqual(self.searcher.index_source, "rebuilt")
+        self.assertEqual(self.searcher.reload_count, 1)
+        # The rebuilt index's own saved files do not trigger another reload
+        self.assertFalse(self.searcher.reload_if_changed())
+        
+        with mock.patch.object(server, "searcher", self.searcher):
+            self.assertIn("Hot reloads: 1 (0 failed)", server.get_server_status())
+
+    def test_in_flight_search_keeps_old_index(self):
+        snapshot = self.searcher._snapshot()
+        query = snapshot[2].embed("prompt caching tokens")
+        write_hashing_embeddings(self.embeddings_file, self.NEW)
+        self.assertTrue(self.searcher.reload_if_changed())
+        
+        old_results = self.searcher._search_vectors([query], 3, snapshot=snapshot)[0]
+        self.assertTrue(all(result.title in self.OLD for result in old_results))
+        self.assertEqual(len(self.searcher.content_chunks), len(self.NEW))
+
+    def test_failed_reload_keeps_serving(self):
+        with open(self.embeddings_file, 'w', encoding='utf-8') as f:
+            f.write("not json\n")
+        self.assertFalse(self.searcher.reload_if_changed())
+        self.assertEqual(self.titles("FAISS vector indexes")[0], self.OLD[1])
+        # The broken file is not retried until it changes again
+        self.assertFalse(self.searcher.reload_if_changed())
+        self.assertEqual(self.searcher.reload_failures, 1)
+
+    def test_corrupt_persisted_index_is_rebuilt(self):
+        with open(server.INDEX_FILE, 'wb') as f:
+            f.write(b"not a faiss index")
+        searcher = server.CourseContentSearcher("flat")
+        self.assertTrue(searcher.initialize())
+        self.assertEqual(searcher.index_source, "rebuilt")
+
+    def test_provider_dimension_must_match_index(self):
+        with open(self.embeddings_file, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        metadata = json.loads(lines[0])
+        metadata["metadata"]["embedding_dimension"] = 512
+        lines[0] = json.dumps(metadata) + "\n"
+        with open(self.embeddings_file, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.remove(server.INDEX_FILE)
+        self.assertFalse(server.CourseContentSearcher("flat").initialize())
+
+    def test_reload_with_new_bedrock_dimension(self):
+        """Regenerating with another --dimensions gets a new query provider; unchanged options reuse it"""
+        write_bedrock_embeddings(self.embeddings_file, self.OLD, 1024)
+        with mock.patch("boto3.client"):
+            searcher = server.CourseContentSearcher("flat")
+            self.assertTrue(searcher.initialize())
+            self.assertEqual(searcher.embedding_provider.dimension, 1024)
+            
+            write_bedrock_embeddings(self.embeddings_file, self.NEW, 256)
+            self.assertTrue(searcher.reload_if_changed())
+            provider = searcher.embedding_provider
+            self.assertEqual((provider.dimension, searcher.search_index.d), (256, 256))
+            
+            write_bedrock_embeddings(self.embeddings_file, self.OLD, 256)
+            self.assertTrue(searcher.reload_if_changed())
+            self.assertIs(searcher.embedding_provider, provider)
+        self.assertEqual(searcher.reload_failures, 0)
+
+    def test_watcher_thread(self):
+        thread = self.searcher.start_watching(0.02)
+        self.addCleanup(thread.join)
+        self.addCleanup(self.searcher.stop_watching.set)
+        write_hashing_embeddings(self.embeddings_file, self.NEW)
+        deadline = time.monotonic() + 5
+        while self.searcher.reload_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.titles("prompt caching tokens")[0], self.NEW[2])
+
+if __name__ == "__main__":
+    unittest.main()